@@ -1,50 +1,43 @@
 #adapted from BCI2kReader: https://github.com/neurotechcenter/BCI2kReader
 
 import sys
-import io
-
-def GetLine(stream, e = b'\n'):
-    line = []
-    c = stream.read(1)
-    while (c != b'' and c != e):
-        line.append(c)
-        c = stream.read(1)
-    return str(b''.join(line), 'utf-8')
-
-def GetParamToken(stream):
-    c = stream.read(1)
-    while (c == b' '):
-        c = stream.read(1)
-    t = []
-    while (c != b'' and c != b' '):
-        t.append(c)
-        c = stream.read(1)
-    return str(b''.join(t), 'utf-8')
+import re
 
+_escapes = re.compile(r'%(?:%|[0-9A-Fa-f]{2})')
+
+def _unescapeMatch(m):
+    e = m.group()
+    return '%' if e == '%%' else chr(int(e[1:], 16))
 
 def unescape(s):
     # unfortunately there are two slight difference between the BCI2000 standard and urllib.unquote
     if s in ['%', '%0', '%00']: return ''  # here's one (empty string)
-    out = ''
-    s = list(s)
-    while len(s):
-        c = s.pop(0)
+    if '%' not in s: return s
+    if '%' not in _escapes.sub('', s):  # every '%' is a well-formed escape
+        return _escapes.sub(_unescapeMatch, s)
+    # malformed escapes, same rules one character at a time
+    out = []
+    i = 0
+    n = len(s)
+    while i < n:
+        c = s[i]
+        i += 1
         if c == '%':
-            c = ''.join(s[:2])
+            c = s[i:i + 2]
             if c.startswith('%'):  # here's the other ('%%' maps to '%')
-                out += '%'
-                s = s[1:]
+                out.append('%')
+                i += 1
             else:
                 try:
                     c = int(c, 16)
                 except:
                     pass
                 else:
-                    out += chr(c)
-                    s = s[2:]
+                    out.append(chr(c))
+                    i += 2
         else:
-            out += c
-    return out
+            out.append(c)
+    return ''.join(out)
 
 def Warn(msg):
     #MUTE WARNINGS
@@ -59,10 +52,60 @@ def Warn(msg):
 class DatFileError(Exception): pass
 
 def ParseParam(stream):
-    #stream = io.BytesIO(bytes(param, 'utf-8'))
-    category = unescape(GetParamToken(stream))
-    datatype = unescape(GetParamToken(stream))
-    name = unescape(GetParamToken(stream)).rstrip('=')
+    """parameter record of the line in a byte stream, see ParseParamBytes"""
+    data = stream.read()
+    stream.close()
+    return ParseParamBytes(data)
+
+
+class ParamTokens:
+    """tokens and rest of line of a decoded parameter line, by index"""
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def token(self):
+        text, i = self.text, self.pos
+        n = len(text)
+        while i < n and text[i] == ' ':
+            i += 1
+        j = text.find(' ', i)
+        if j < 0:
+            self.pos = n
+            return text[i:]
+        self.pos = j + 1
+        return text[i:j]
+
+    def tokens(self, count):
+        if count <= 0:
+            return []
+        text, i = self.text, self.pos
+        n = len(text)
+        while i < n and text[i] == ' ':
+            i += 1
+        parts = text[i:].split(' ', count)
+        if len(parts) > count and '' not in parts[:count]:  # single spaces, split at once
+            self.pos = n - len(parts[count])
+            return parts[:count]
+        self.pos = i
+        return [self.token() for i in range(count)]
+
+    def line(self, e='\n'):
+        text, i = self.text, self.pos
+        j = text.find(e, i)
+        if j < 0:
+            self.pos = len(text)
+            return text[i:]
+        self.pos = j + 1
+        return text[i:j]
+
+
+def ParseParamBytes(data):
+    """parameter record of a parameter line, splitting the whole line once"""
+    tokens = ParamTokens(str(data, 'utf-8'))
+    category = unescape(tokens.token())
+    datatype = unescape(tokens.token())
+    name = unescape(tokens.token()).rstrip('=')
     rec = {
         'name': name, 'comment': '', 'category': category, 'type': datatype,
         'defaultVal': '', 'minVal': '', 'maxVal': '',
@@ -72,7 +115,7 @@ def ParseParam(stream):
     if datatype in ('int', 'float'):
         datatypestr = datatype
         datatype = {'float': float, 'int': int}.get(datatype)
-        val = unescape(GetParamToken(stream))
+        val = unescape(tokens.token())
         unscaled, units, scaled = DecodeUnits(val, datatype)
         if isinstance(unscaled, (str, type(None))): Warn(
             'failed to interpret "%s" as type %s in parameter "%s"' % (val, datatypestr, name))
@@ -83,7 +126,7 @@ def ParseParam(stream):
         })
 
     elif datatype in ('string', 'variant'):
-        val = unescape(GetParamToken(stream))
+        val = unescape(tokens.token())
         rec.update({
             'valstr': val,
             'val': val,
@@ -91,31 +134,23 @@ def ParseParam(stream):
 
     elif datatype.endswith('list'):
         valtype = datatype[:-4]
-        valtypestr = valtype
         valtype = {'float': float, 'int': int, '': str, 'string': str, 'variant': str}.get(valtype, valtype)
         if isinstance(valtype, str): raise DatFileError('Unknown list type "%s"' % datatype)
-        numel, labels, labelstr = ParseDim(stream)
-        val = []
-        for i in range(0, numel):
-            t = GetParamToken(stream)
-            if not len(t): Warn('not enough values in parameter "%s"' % name)
-            val.append(unescape(t))
+        numel, labels, labelstr = ParseDimTokens(tokens)
+        val = tokens.tokens(numel)
+        if numel and not len(val[-1]): Warn('not enough values in parameter "%s"' % name)
+        val = [unescape(t) for t in val]
 
         valstr = ' '.join([labelstr] + val)
         if valtype == str:
             unscaled = val
             units = [''] * len(val)
         else:
-            eachstr = val
-            val = [DecodeUnits(x, valtype) for x in eachstr]
+            val = [DecodeUnits(x, valtype) for x in val]
             if len(val):
                 unscaled, units, scaled = list(zip(*val))[:3]
             else:
                 unscaled, units, scaled = [], [], []
-            #silence error, it is commonly caused by "auto" parameter
-            # for u, v, s in zip(unscaled, val, eachstr):
-            #     if isinstance(u, (str, type(None))): Warn(
-            #         'failed to interpret "%s" as type %s in parameter "%s"' % (s, valtypestr, name))
         rec.update({
             'valstr': valstr,
             'valtype': valtype,
@@ -128,21 +163,15 @@ def ParseParam(stream):
         valtype = datatype[:-6]
         valtype = {'float': float, 'int': int, '': str, 'string': str, 'variant': str}.get(valtype, valtype)
         if isinstance(valtype, str): raise DatFileError('Unknown matrix type "%s"' % valtype)
-        nrows, rowlabels, rowlabelstr = ParseDim(stream)
-        ncols, collabels, collabelstr = ParseDim(stream)
+        nrows, rowlabels, rowlabelstr = ParseDimTokens(tokens)
+        ncols, collabels, collabelstr = ParseDimTokens(tokens)
 
-        values = []
-        for i in range(0, nrows * ncols):
-            t = GetParamToken(stream)
-            if not len(t): Warn('not enough values in parameter "%s"' % name)
-            values.append(unescape(t))
+        values = tokens.tokens(nrows * ncols)
+        if nrows * ncols and not len(values[-1]): Warn('not enough values in parameter "%s"' % name)
+        values = [unescape(t) for t in values]
 
         valstr = ' '.join(filter(len, [rowlabelstr, collabelstr] + values))
-        val = []
-        for i in range(nrows):
-            val.append([])
-            for j in range(ncols):
-                val[-1].append(values.pop(0))
+        val = [values[i * ncols:(i + 1) * ncols] for i in range(nrows)]
         rec.update({
             'valstr': valstr,
             'valtype': valtype,
@@ -153,19 +182,19 @@ def ParseParam(stream):
 
     else:
         Warn("unsupported parameter type %r" % datatype)
-        val = unescape(GetParamToken(stream))
+        val = unescape(tokens.token())
         rec.update({
             'valstr': val,
             'val': val,
         })
 
     vals = []
-    t = GetParamToken(stream)
+    t = tokens.token()
     while len(t):
         if t.find('//') == 0:
             break
         vals.append(unescape(t))
-        t = GetParamToken(stream)
+        t = tokens.token()
 
     if len(vals): rec['defaultVal'] = vals.pop(0)
     if len(vals): rec['minVal'] = vals.pop(0)
@@ -174,32 +203,22 @@ def ParseParam(stream):
 
     t = t.split('//')
     t = t[-1]
-    comment = ' '.join([t, GetLine(stream)])
+    comment = ' '.join([t, tokens.line()])
     rec['comment'] = comment.strip()
 
     if scaled is None:
         rec['scaled'] = rec['val']
     else:
         rec['scaled'] = scaled
-    stream.close()
     return rec
 
 
-def ParseDim(stream):
-    extent = 0
-    labels = []
-    labelstr = ''
-
-    t = GetParamToken(stream)
+def ParseDimTokens(tokens):
+    t = tokens.token()
     if t.startswith('{'):
-        line = GetLine(stream, b'}')
+        line = tokens.line('}')
         labelstr = '{ ' + line + ' }'
-        stream2 = io.BytesIO(bytes(line, 'utf-8'))
-        while True:
-            t2 = GetParamToken(stream2)
-            if t2 == '': break
-            labels.append(unescape(t2))
-        stream2.close()
+        labels = [unescape(t2) for t2 in line.split(' ') if t2]
         extent = len(labels)
     else:
         extent = unescape(t)
@@ -3,7 +3,6 @@ import numpy as np
 import pyqtgraph as pg
 from pyqtgraph.dockarea import *
 import pyqtgraph.opengl as gl
-import scipy.io
 
 from base.SharedVisualization import Window, MyDockArea, TextOutput, Group
 from PyQt5.QtCore import QObject, QThread, pyqtSignal
@@ -23,6 +22,7 @@ class BrainWorker(QObject):
     #load brainmat
     print("Loading 3d brain")
     self.lock.acquire()
+    import scipy.io #slow to import, only needed here
     self.brainmat = scipy.io.loadmat(self.filename)
     mdl = self.brainmat['surfaceModel']
     verts = mdl['Model'][0][0]['vert'][0][0]
@@ -118,7 +118,8 @@ class BrainWindow(Group):
         print("LOAD BRAIN")
         self.loaded = self.myParent.loadBrain()
   
-  def __init__(self, area):
+  def __init__(self, area, dock=None):
+    self.dock = dock #built into this dock if given
     super().__init__(area)
   def publish(self):
     super().publish()
@@ -165,8 +166,11 @@ class BrainWindow(Group):
     self.viewWidget.addItem(self.insrtTxt)
 
     #add dock
-    self.dock = Dock("Brain", widget=self.layout)
-    self.area.addDock(self.dock)
+    if self.dock is None:
+      self.dock = Dock("Brain", widget=self.layout)
+      self.area.addDock(self.dock)
+    else:
+      self.dock.addWidget(self.layout)
 
 
   def loadBrain(self):
@@ -221,7 +225,7 @@ class BrainWindow(Group):
 
   def loadSettings(self):
     super().loadSettings()
-    self._scale = self.settings.value("scale", 50)
+    self._scale = self.settings.value("scale", 50, type=int)
     self.scaleSlider.setValue(self._scale)
     self._theme = eval(self.settings.value("theme", "False").lower().capitalize())
     self.themeBut.setChecked(self._theme)
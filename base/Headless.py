@@ -0,0 +1,105 @@
+import importlib
+import os
+import signal
+import sys
+import time
+from PyQt5.QtCore import QCoreApplication, QObject, QSettings, QTimer, Qt
+
+from base.ResultWriter import ResultWriter
+from dataThreads.streamBase.AcquisitionHub import AcquisitionHub
+from dataThreads.streamBase.BlockDelivery import DirectDelivery
+
+CorePath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "filters", "compute")
+
+def available():
+  """filters that have a ComputeCore, and so can run headless"""
+  return sorted(f[:-len('Core.py')] + 'Filter' for f in os.listdir(CorePath) if f.endswith('Core.py'))
+
+def loadCore(filterName):
+  """ComputeCore class of a filter, CCEPFilter -> filters.compute.CCEPCore.CCEPCore"""
+  name = filterName[:-len('Filter')] if filterName.endswith('Filter') else filterName
+  module = importlib.import_module(f"filters.compute.{name}Core")
+  return module.__dict__[name + 'Core']
+
+#
+# A filter's ComputeCore on a data stream, without windows (see main.py --headless).
+# Blocks are computed in the acquisition thread as they arrive, so a recording plays as fast
+# as the core keeps up, and results are written to disk as they come. Recordings end the run
+# when they end, live streams run until interrupted
+#
+class Headless(QObject):
+  def __init__(self, core, bciPath, stream, writer, choices={}):
+    super().__init__()
+    self.core = core
+    self.writer = writer
+    self.blocks = 0
+    self.done = False
+    self.start = time.perf_counter()
+    self.hub = AcquisitionHub(self.logPrint)
+
+    #streams read what they would ask the user from their settings, put back once they have
+    settings = QSettings("BCI2000", stream[1])
+    previous = {k: settings.value(k) for k in choices}
+    for k, v in choices.items():
+      settings.setValue(k, v)
+    try:
+      self.connection = self.hub.open(bciPath, stream, core.filterName, core.sharedStates)
+    finally:
+      for k, v in previous.items():
+        settings.setValue(k, v) if v is not None else settings.remove(k)
+
+    #all in the acquisition thread
+    self.delivery = DirectDelivery(self.connection.acqThr)
+    self.delivery.propertiesSignal.connect(self.configure, Qt.DirectConnection)
+    self.delivery.parameterSignal.connect(core.parameters.update, Qt.DirectConnection)
+    self.delivery.stateSignal.connect(core.receiveStates, Qt.DirectConnection)
+    self.delivery.dataSignal.connect(self.process, Qt.DirectConnection)
+    core.printSignal.connect(self.logPrint, Qt.DirectConnection)
+    #in this thread, once the last block is written
+    self.connection.acqThr.ended.connect(self.finish)
+    self.connection.subscribe(self.delivery, core.sharedStates)
+
+  def logPrint(self, msg):
+    print(">>" + msg, flush=True)
+
+  def configure(self, el, chNames):
+    self.core.configure(el, chNames)
+    self.writer.configure(self.core.chNames)
+    self.logPrint(f"Computing {self.core.filterName} on {self.core.channels} channels")
+
+  def process(self, data):
+    try:
+      result = self.core.process(data)
+      if result is not None:
+        self.writer.write(result)
+    finally:
+      self.blocks += 1
+      #data is a pooled snapshot, hand it back to the acquisition thread
+      self.connection.acqThr.releaseBlock(data)
+
+  def finish(self):
+    """stop the stream and close the results, then quit"""
+    if self.done:
+      return
+    self.done = True
+    self.hub.stop()
+    self.writer.close(self.core.finish())
+    elapsed = time.perf_counter() - self.start
+    self.logPrint(f"{self.blocks} blocks, {self.core.trials} trials in {elapsed:.2f} s, results in {self.writer.folder}")
+    QCoreApplication.quit()
+
+def run(filterName, bciPath, stream, out, choices={}, epochs=False):
+  """compute a filter's results on a data stream until it ends or Ctrl+C, returns the exit code"""
+  app = QCoreApplication(sys.argv)
+  core = loadCore(filterName)()
+  core.keepEpochs = epochs
+  meta = {'filter': core.filterName, 'stream': stream[1], 'bciPath': bciPath,
+          'started': time.strftime('%Y-%m-%dT%H:%M:%S'), **choices}
+  runner = Headless(core, bciPath, stream, ResultWriter(out, meta), choices)
+
+  #Python handles Ctrl+C between Qt events only, wake it up now and then
+  signal.signal(signal.SIGINT, lambda *args: runner.finish())
+  timer = QTimer()
+  timer.timeout.connect(lambda: None)
+  timer.start(200)
+  return app.exec_()
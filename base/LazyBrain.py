@@ -0,0 +1,46 @@
+import pyqtgraph as pg
+from pyqtgraph.dockarea import *
+from PyQt5.QtCore import pyqtSignal
+
+from base.SharedVisualization import Group
+
+#stands in for the 3d brain window until a brain is loaded, so OpenGL and scipy.io
+#are only imported when needed. Forwards the filter connections to the real window once built
+class LazyBrain(Group):
+  emitElectrodeNames = pyqtSignal(object) #dict
+  def __init__(self, area):
+    self.brain = None
+    self.timing = None #BlockTiming of the stream the shown filter plots
+    super().__init__(area)
+  def publish(self):
+    super().publish()
+    self.loadBut = pg.QtWidgets.QPushButton("Load brain")
+    self.loadBut.clicked.connect(self.loadBrain)
+    self.dock = Dock("Brain", widget=self.loadBut)
+    self.area.addDock(self.dock)
+
+  def loadBrain(self):
+    """build the 3d window in the Brain dock and ask for the brain file"""
+    if self.brain is None:
+      from base.Brain import BrainWindow
+      self.loadBut.hide()
+      self.brain = BrainWindow(self.win, self.dock)
+      self.brain.emitElectrodeNames.connect(self.emitElectrodeNames)
+      if hasattr(self, 'chNames'):
+        self.brain.setConfig(self.chNames)
+    self.brain.loadBrain()
+
+  def saveSettings(self):
+    if self.brain is not None:
+      self.brain.saveSettings()
+
+  ###--slots--###
+  def setConfig(self, chNames):
+    self.chNames = chNames
+    if self.brain is not None:
+      self.brain.setConfig(chNames)
+  def plot(self, data):
+    if self.brain is not None:
+      self.brain.plot(data)
+      if self.timing is not None:
+        self.timing.record('Brain plot end', self.timing.current)
@@ -0,0 +1,144 @@
+import csv
+import pyqtgraph as pg
+from pyqtgraph.dockarea import *
+
+from base.SharedVisualization import Group
+from dataThreads.streamBase.BlockDelivery import DeliveryPolicy
+
+#
+# Latency of blocks from their arrival to the screen, by stage, for every open data stream
+# (see BlockTiming), the counters each data thread reports in stats(), and how each running
+# filter takes its blocks (see BlockDelivery), which can be changed here
+#
+class PerformanceWindow(Group):
+  budget = 0.1 #seconds the display may be behind, p95
+  columns = ["Stream", "Stage", "Blocks", "Blocks/s", "Mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)"]
+
+  def __init__(self, win, relativeTo=None):
+    self.relativeTo = relativeTo #dock to share tabs with
+    super().__init__(win)
+  def publish(self):
+    super().publish()
+    self.layout = pg.LayoutWidget()
+    self.behind = pg.QtWidgets.QLabel("No data yet")
+    self.table = pg.QtWidgets.QTableWidget(0, len(self.columns))
+    self.table.setHorizontalHeaderLabels(self.columns)
+    self.table.verticalHeader().setVisible(False)
+    self.table.setEditTriggers(pg.QtWidgets.QAbstractItemView.NoEditTriggers)
+    self.counters = pg.QtWidgets.QTableWidget(0, 3)
+    self.counters.setHorizontalHeaderLabels(["Stream", "Counter", "Value"])
+    self.counters.verticalHeader().setVisible(False)
+    self.counters.setEditTriggers(pg.QtWidgets.QAbstractItemView.NoEditTriggers)
+    self.deliveries = pg.QtWidgets.QTableWidget(0, 3)
+    self.deliveries.setHorizontalHeaderLabels(["Filter", "Delivery", "Dropped"])
+    self.deliveries.verticalHeader().setVisible(False)
+    self.deliveries.setEditTriggers(pg.QtWidgets.QAbstractItemView.NoEditTriggers)
+    self.deliveryFilters = [] #filters in the rows of deliveries
+    resetBut = pg.QtWidgets.QPushButton("Reset")
+    resetBut.clicked.connect(self.reset)
+    exportBut = pg.QtWidgets.QPushButton("Export CSV...")
+    exportBut.clicked.connect(self.export)
+
+    self.layout.addWidget(self.behind, row=0, col=0, colspan=2)
+    self.layout.addWidget(self.table, row=1, col=0, colspan=2)
+    self.layout.addWidget(self.counters, row=2, col=0, colspan=2)
+    self.layout.addWidget(self.deliveries, row=3, col=0, colspan=2)
+    self.layout.addWidget(resetBut, row=4, col=0)
+    self.layout.addWidget(exportBut, row=4, col=1)
+
+    self.dock = Dock("Performance", widget=self.layout)
+    if self.relativeTo is None:
+      self.area.addDock(self.dock)
+    else:
+      self.area.addDock(self.dock, position='above', relativeTo=self.relativeTo)
+
+    self.timer = pg.QtCore.QTimer()
+    self.timer.timeout.connect(self.refresh)
+    self.timer.start(1000)
+
+  def streams(self):
+    """name and data thread of every open data stream"""
+    hub = getattr(self.win, 'hub', None)
+    if hub is None:
+      return []
+    return [(f"{type(conn.comm).__name__} ({conn.name})", conn.acqThr) for conn in list(hub.connections.values())]
+
+  def rows(self):
+    """latency rows as in columns, seconds"""
+    rows = []
+    for name, acqThr in self.streams():
+      for stage, s in acqThr.timing.summary().items():
+        rows.append([name, stage, s['count'], s['rate'], s['mean'], s['p50'], s['p95'], s['p99'], s['max']])
+    return rows
+
+  def stats(self):
+    rows = []
+    for name, acqThr in self.streams():
+      for counter, value in acqThr.stats().items():
+        rows.append([name, counter, value])
+    return rows
+
+  def refresh(self):
+    if not self.dock.isVisible():
+      return
+    rows = self.rows()
+    self.table.setRowCount(len(rows))
+    for r, row in enumerate(rows):
+      cells = row[:3] + [f"{row[3]:.1f}"] + [f"{v * 1e3:.2f}" for v in row[4:]]
+      for c, v in enumerate(cells):
+        self.table.setItem(r, c, pg.QtWidgets.QTableWidgetItem(str(v)))
+    counters = self.stats()
+    self.counters.setRowCount(len(counters))
+    for r, row in enumerate(counters):
+      value = f"{row[2]:.2f}" if isinstance(row[2], float) else str(row[2])
+      for c, v in enumerate(row[:2] + [value]):
+        self.counters.setItem(r, c, pg.QtWidgets.QTableWidgetItem(v))
+
+    self.refreshDeliveries()
+
+    #the last stage of each stream is how far behind the display is
+    ends = [row for row in rows if row[1].endswith("plot end")]
+    if ends:
+      worst = max(row[6] for row in ends)
+      within = "within" if worst <= self.budget else "OVER"
+      self.behind.setText(f"Display behind the data by {worst * 1e3:.1f} ms (p95), {within} the {self.budget * 1e3:.0f} ms budget")
+
+  def refreshDeliveries(self):
+    """a row per running filter, its delivery policy can be chosen there"""
+    filters = list(getattr(self.win, 'mods', {}).items())
+    if [f for _, f in filters] != self.deliveryFilters:
+      self.deliveryFilters = [f for _, f in filters]
+      self.deliveries.setRowCount(len(filters))
+      for r, (name, filt) in enumerate(filters):
+        self.deliveries.setItem(r, 0, pg.QtWidgets.QTableWidgetItem(name))
+        policy = pg.QtWidgets.QComboBox()
+        policy.addItems([p.name for p in DeliveryPolicy])
+        policy.setCurrentText(filt.delivery.policy.name)
+        policy.currentTextChanged.connect(lambda name, filt=filt: setattr(filt.delivery, 'policy', DeliveryPolicy[name]))
+        self.deliveries.setCellWidget(r, 1, policy)
+    for r, filt in enumerate(self.deliveryFilters):
+      self.deliveries.setItem(r, 2, pg.QtWidgets.QTableWidgetItem(str(filt.delivery.dropped)))
+
+  def reset(self):
+    for name, acqThr in self.streams():
+      acqThr.timing.reset()
+    self.refresh()
+
+  def export(self):
+    path, _ = pg.QtWidgets.QFileDialog.getSaveFileName(self.win, "Export Performance", "", "CSV (*.csv)")
+    if path == "":
+      return
+    self.write(path)
+    self.logPrint(f"Performance exported to {path}")
+
+  def write(self, path):
+    """latency by stage in ms, then the data thread counters"""
+    with open(path, 'w', newline='') as f:
+      writer = csv.writer(f)
+      writer.writerow(self.columns)
+      for row in self.rows():
+        writer.writerow(row[:3] + [f"{row[3]:.3f}"] + [f"{v * 1e3:.3f}" for v in row[4:]])
+      writer.writerow([])
+      writer.writerow(["Stream", "Counter", "Value"])
+      for row in self.stats():
+        writer.writerow(row)
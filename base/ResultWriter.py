@@ -0,0 +1,101 @@
+import csv
+import datetime
+import json
+import os
+import struct
+import numpy as np
+
+HeaderLength = 256 #bytes of a .npy header, room for any shape
+
+def npyHeader(dtype, shape):
+  """header of a version 1.0 .npy file, padded to HeaderLength so it can be rewritten once the shape is known"""
+  d = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': tuple(shape)}
+  text = repr(d).encode('latin1')
+  text += b' ' * (HeaderLength - 10 - len(text) - 1) + b'\n'
+  return b'\x93NUMPY\x01\x00' + struct.pack('<H', HeaderLength - 10) + text
+
+#
+# Writes the results of a ComputeCore to a folder as they come (see main.py --headless).
+# Scalars and text of each trial go to trials.csv, per-channel vectors to <name>.csv with a row
+# per trial, and other arrays to <name>.npy, trials x array, grown in place.
+# What the core gives once the stream ends is saved as <name>.npy, and the run described in metadata.json
+#
+class ResultWriter():
+  def __init__(self, folder, meta={}):
+    os.makedirs(folder, exist_ok=True)
+    self.folder = folder
+    self.meta = dict(meta)
+    self.chNames = []
+    self.trials = None #[file, csv writer, columns]
+    self.tables = {} #name -> [file, csv writer]
+    self.arrays = {} #name -> [file, dtype, shape of one trial, trials]
+    self.written = 0
+
+  def path(self, name):
+    return os.path.join(self.folder, name)
+
+  def configure(self, chNames):
+    self.chNames = list(chNames)
+
+  def write(self, result):
+    trial = result['trial']
+    scalars = {}
+    for name, value in result.items():
+      if isinstance(value, str) or np.ndim(value) == 0:
+        scalars[name] = value
+      elif np.ndim(value) == 1 and len(value) == len(self.chNames):
+        self.writeRow(name, trial, value)
+      else:
+        self.appendArray(name, np.asarray(value))
+    self.writeTrial(scalars)
+    self.written += 1
+
+  def writeTrial(self, scalars):
+    if self.trials is None:
+      f = open(self.path('trials.csv'), 'w', newline='')
+      columns = list(scalars)
+      writer = csv.writer(f)
+      writer.writerow(columns)
+      self.trials = [f, writer, columns]
+    f, writer, columns = self.trials
+    writer.writerow([scalars.get(c, "") for c in columns])
+
+  def writeRow(self, name, trial, values):
+    if name not in self.tables:
+      f = open(self.path(name + '.csv'), 'w', newline='')
+      writer = csv.writer(f)
+      writer.writerow(['trial'] + self.chNames)
+      self.tables[name] = [f, writer]
+    self.tables[name][1].writerow([trial] + [f'{v:.6g}' for v in values])
+
+  def appendArray(self, name, value):
+    if name not in self.arrays:
+      f = open(self.path(name + '.npy'), 'wb')
+      f.write(npyHeader(value.dtype, (0,) + value.shape))
+      self.arrays[name] = [f, value.dtype, value.shape, 0]
+    entry = self.arrays[name]
+    f, dtype, shape, count = entry
+    if value.shape != shape:
+      print(f"{name}: expected {shape}, received {value.shape}, not written")
+      return
+    np.ascontiguousarray(value, dtype=dtype).tofile(f)
+    entry[3] = count + 1
+
+  def close(self, final={}):
+    """close the files, saving the results of the whole run"""
+    if self.trials is not None:
+      self.trials[0].close()
+    for f, writer in self.tables.values():
+      f.close()
+    for f, dtype, shape, count in self.arrays.values():
+      f.seek(0)
+      f.write(npyHeader(dtype, (count,) + shape))
+      f.close()
+    for name, value in final.items():
+      np.save(self.path(name + '.npy'), np.asarray(value))
+
+    meta = dict(self.meta)
+    meta.update({'finished': datetime.datetime.now().isoformat(timespec='seconds'), 'trials': self.written,
+                 'channels': self.chNames, 'files': sorted(set(os.listdir(self.folder)) | {'metadata.json'})})
+    with open(self.path('metadata.json'), 'w') as f:
+      json.dump(meta, f, indent=1)
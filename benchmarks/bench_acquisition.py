@@ -0,0 +1,124 @@
+#block-arrival to emit latency of BCI2000DataThread, polling loop vs event-driven loop vs acquisition process,
+#idle and while another thread holds the GIL the way rendering does
+#run from the repository root: python -m benchmarks.bench_acquisition
+import io
+import socket
+import threading
+import time
+import numpy as np
+from multiprocessing import resource_tracker
+from PyQt5.QtCore import Qt
+
+from dataThreads.BCI2000 import BCI2000DataThread, writeBciSharedSignalMessage, writeBciSignalPropertiesMessage
+from dataThreads.BCI2000Process import ProcessDataThread
+from dataThreads.streamBase.LatencyHistogram import LatencyHistogram
+from dataThreads.streamBase.SharedSegments import SegmentCache
+
+class Receiver():
+  """collects emit times of data blocks"""
+  def __init__(self, acqThr):
+    self.acqThr = acqThr
+    self.times = []
+    self.written = [] #when the acquisition process wrote each block to the ring
+    self.received = threading.Event()
+    self.configured = threading.Event()
+  def properties(self, elements, chNames):
+    self.configured.set()
+  def data(self, block):
+    self.times.append(time.perf_counter())
+    self.written.append(getattr(self.acqThr, 'lastWritten', self.times[-1]))
+    self.acqThr.releaseBlock(block)
+    self.received.set()
+
+def gilLoad(stop):
+  """calls that hold the GIL for several ms at a time, like plot updates do"""
+  while not stop.is_set():
+    sum(range(1000000))
+
+def makeAcq(mode):
+  if mode == 'process':
+    return ProcessDataThread()
+  acq = BCI2000DataThread()
+  acq.eventDriven = mode == 'event-driven'
+  return acq
+
+def timeLoop(mode, load=False, blocks=500, channels=64, elements=40, interval=0.002):
+  """latency from sending each block to the data thread emitting it, and to the acquisition process reading it"""
+  owner = SegmentCache()
+  sig = owner.create(None, channels * elements * 8)
+  states = owner.create(None, 2 * elements * 8)
+
+  acq = makeAcq(mode)
+  acq.initalize(('127.0.0.1', 0))
+  address = acq.s.getsockname()
+  receiver = Receiver(acq)
+  acq.dataSignal.connect(receiver.data, Qt.DirectConnection)
+  acq.propertiesSignal.connect(receiver.properties, Qt.DirectConnection)
+  t = threading.Thread(target=acq.run)
+  t.start()
+
+  conn = socket.create_connection(address)
+  header = io.BytesIO()
+  writeBciSignalPropertiesMessage(header, 'Signal', 'Signal', [f'Ch{c + 1}' for c in range(channels)], elements)
+  conn.sendall(header.getvalue())
+  receiver.configured.wait(30) #the acquisition process takes a moment to start
+
+  stopLoad = threading.Event()
+  loader = threading.Thread(target=gilLoad, args=(stopLoad,))
+  if load:
+    loader.start()
+  latency = LatencyHistogram()
+  read = LatencyHistogram()
+  for b in range(blocks):
+    np.ndarray((channels, elements), buffer=sig.buf)[:] = b
+    msg = io.BytesIO()
+    writeBciSharedSignalMessage(msg, 'States', states.name, 2, elements)
+    writeBciSharedSignalMessage(msg, 'Signal', sig.name, channels, elements)
+    receiver.received.clear()
+    sent = time.perf_counter()
+    conn.sendall(msg.getvalue())
+    receiver.received.wait(1)
+    latency.record(receiver.times[-1] - sent)
+    read.record(receiver.written[-1] - sent)
+    time.sleep(interval)
+  stopLoad.set()
+  if load:
+    loader.join()
+
+  #idle cost: cpu time spent by this process while no data arrives
+  cpu = time.process_time()
+  time.sleep(1)
+  idleCpu = time.process_time() - cpu
+
+  acq.stop()
+  conn.close()
+  t.join()
+  if mode == 'process':
+    #the acquisition process shares our resource tracker, attaching there unregistered the segments
+    for seg in [sig, states]:
+      resource_tracker.register(seg._name, 'shared_memory')
+  owner.clear()
+  return latency.summary(), acq.latency.summary(), read.summary(), idleCpu
+
+def run():
+  results = {}
+  for mode in ['polling', 'event-driven', 'process']:
+    for load in [False, True]:
+      name = mode + (' loaded' if load else '')
+      summary, internal, read, idleCpu = timeLoop(mode, load)
+      for k in ['mean', 'p50', 'p95', 'p99', 'max']:
+        results[f'{name} send->emit {k} (ms)'] = summary[k] * 1e3
+      if mode == 'process':
+        for k in ['p50', 'p95', 'max']:
+          results[f'{name} send->ring {k} (ms)'] = read[k] * 1e3
+        results[f'{name} ring->emit p95 (ms)'] = internal['p95'] * 1e3
+      else:
+        for k in ['p50', 'p95']:
+          results[f'{name} readable->emit {k} (ms)'] = internal[k] * 1e3
+      if not load:
+        results[f'{name} idle cpu (ms/s)'] = idleCpu * 1e3
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>40}: {v:9.3f}')
@@ -0,0 +1,87 @@
+#3d brain: BrainWorker.run loading a synthetic VERA file, and BrainWindow.plot scaling electrodes per block
+#run from the repository root: QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_brain
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pyqtgraph as pg
+import scipy.io
+from pyqtgraph.dockarea import DockArea
+
+from base.Brain import BrainWindow, BrainWorker
+from base.SharedVisualization import TextOutput
+
+def struct(rows, **fields):
+  """MATLAB struct array of rows x 1, fields given as lists of values"""
+  out = np.empty((rows, 1), dtype=[(name, 'O') for name in fields])
+  for name, values in fields.items():
+    for i, v in enumerate(values):
+      out[i, 0][name] = v
+  return out
+
+def syntheticVera(path, vertices=100000, leads=8, perLead=16, labels=40):
+  """VERA brain file with a random surface, labels, and leads of electrodes named LA1, LA2, ..."""
+  rng = np.random.default_rng(0)
+  verts = rng.normal(0, 50, (vertices, 3))
+  faces = rng.integers(1, vertices + 1, (2 * vertices, 3)) #1-based, as MATLAB
+  ids = np.arange(labels) * 10
+  model = struct(1, vert=[verts], tri=[faces.astype(np.float64)])
+  annotationLabel = struct(labels, Identifier=list(ids), PreferredColor=[rng.random(3) for _ in range(labels)])
+  surfaceModel = struct(1, Model=[model], Annotation=[rng.choice(ids, (vertices, 1))], AnnotationLabel=[annotationLabel])
+
+  names = [f'L{chr(65 + l)}{e + 1}' for l in range(leads) for e in range(perLead)]
+  nameCells = np.empty((len(names), 1), dtype='O')
+  nameCells[:, 0] = names
+  definition = struct(leads, NElectrodes=[perLead] * leads)
+  electrodes = struct(1, Definition=[definition], Location=[rng.normal(0, 40, (len(names), 3))], Name=[nameCells])
+  #BCI2000 channel names are the electrode names here
+  key = struct(len(names), EEGNames=names, VERANames=names)
+  scipy.io.savemat(path, {'surfaceModel': surfaceModel, 'electrodes': electrodes, 'electrodeNamesKey': key})
+  return names
+
+def timeWorker(path):
+  """seconds BrainWorker.run takes, and the electrodes it made"""
+  worker = BrainWorker(path, 1, threading.Lock())
+  start = time.perf_counter()
+  worker.run()
+  return time.perf_counter() - start, worker
+
+def timePlot(worker, names, blocks=200):
+  """ms per BrainWindow.plot call with every channel on an electrode"""
+  win = pg.QtWidgets.QMainWindow()
+  win.area = DockArea()
+  win.output = TextOutput()
+  win.setCentralWidget(win.area)
+  brain = BrainWindow(win)
+  brain.radius = 1
+  brain.w = worker #as if loaded through loadBrain
+  brain.loadLock.acquire()
+  brain.configLock.acquire()
+  brain.setConfig(names)
+  brain.readyForConfig()
+  rng = np.random.default_rng(0)
+  data = [rng.random(len(names)) * 100 for _ in range(blocks)]
+  times = []
+  for d in data:
+    start = time.perf_counter()
+    brain.plot(d)
+    times.append(time.perf_counter() - start)
+  return np.median(times), len(brain.activeEls)
+
+def run():
+  pg.mkQApp("bench_brain")
+  results = {}
+  with tempfile.TemporaryDirectory() as folder:
+    path = os.path.join(folder, 'brain.mat')
+    names = syntheticVera(path)
+    results['vera file (MB)'] = os.path.getsize(path) / 1e6
+    seconds, worker = timeWorker(path)
+    results['BrainWorker.run (ms)'] = seconds * 1e3
+    plot, active = timePlot(worker, names)
+    results[f'BrainWindow.plot {active} electrodes (ms)'] = plot * 1e3
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>40}: {v:10.3f}')
@@ -0,0 +1,81 @@
+#CCEP trials computed channel by channel, as CCEPCalc did before the core held whole trials,
+#against CCEPCore computing every channel at once. Both see the same trials, their AUCs must agree.
+#Then the cost of a trigger early and late in a session, averaging every trial so far
+#run from the repository root: python -m benchmarks.bench_ccep
+import time
+import numpy as np
+
+from benchmarks.bench_filters import ccepCore, setFilters, trial
+from filters.compute.CCEPCore import trapezoid
+
+Channels = [64, 256, 512]
+
+class PerChannel():
+  """one channel's trials and AUC, the way CCEPCalc computed them, sharing the core's settings"""
+  def __init__(self, core):
+    self.p = core
+    self.database = []
+
+  def computeData(self, newData):
+    data = np.subtract(newData, np.median(newData[:self.p.baseSamples]))
+    data = self.p.filterData(data)
+    self.database.append(data.copy())
+    data = np.mean(self.database, axis=0)
+    ccepData = data[self.p.baseSamples+self.p.trigSamples:]
+    self.auc = trapezoid(abs(ccepData - np.mean(ccepData)))/1e3
+
+def timeBoth(channels, trials=20):
+  """ms per trigger channel by channel and vectorized, and the largest AUC difference relative to the AUC"""
+  rng = np.random.default_rng(0)
+  core = ccepCore(channels)
+  setFilters(core)
+  reference = [PerChannel(core) for _ in range(channels)]
+  perChannel, vectorized, difference = [], [], 0.0
+  for t in range(trials):
+    data = trial(rng, channels, core.elements)
+    start = time.perf_counter()
+    for i, ch in enumerate(reference):
+      ch.computeData(data[i])
+    perChannel.append(time.perf_counter() - start)
+
+    core.numTrigs = 1
+    start = time.perf_counter()
+    core.process(data)
+    vectorized.append(time.perf_counter() - start)
+
+    aucs = np.array([ch.auc for ch in reference])
+    difference = max(difference, np.max(np.abs(core.auc - aucs) / aucs))
+  return np.median(perChannel[1:]), np.median(vectorized[1:]), difference
+
+def timeGrowth(channels=64, trials=400, window=20):
+  """ms per trigger over the first and the last window of trials, with the average of every trial so far"""
+  rng = np.random.default_rng(0)
+  core = ccepCore(channels)
+  setFilters(core)
+  data = [trial(rng, channels, core.elements) for _ in range(window)]
+  times = []
+  for t in range(trials):
+    core.numTrigs = 1
+    start = time.perf_counter()
+    core.process(data[t % window])
+    times.append(time.perf_counter() - start)
+  return np.median(times[1:window]), np.median(times[-window:])
+
+def run():
+  results = {}
+  worst = 0.0
+  for channels in Channels:
+    perChannel, vectorized, difference = timeBoth(channels)
+    results[f'per channel {channels} ch (ms/trigger)'] = perChannel * 1e3
+    results[f'vectorized {channels} ch (ms/trigger)'] = vectorized * 1e3
+    results[f'speedup {channels} ch (x)'] = perChannel / vectorized
+    worst = max(worst, difference)
+  results['largest relative AUC difference'] = worst
+  early, late = timeGrowth()
+  results['64 ch, trials 1-20 (ms/trigger)'] = early * 1e3
+  results['64 ch, trials 381-400 (ms/trigger)'] = late * 1e3
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>40}: {v:10.3g}')
@@ -0,0 +1,68 @@
+#CCEP filtering of stored trials: notch, low pass and high pass as three filtfilt passes of (b, a)
+#designs, as before FilterBank, against one sosfiltfilt pass of their cascade. Both filter trials of
+#known responses with line noise, offsets and drift added, so their errors can be told apart.
+#Then designing the cascade against taking it from the cache
+#run from the repository root: python -m benchmarks.bench_filterbank
+import time
+import numpy as np
+from scipy.signal import butter, filtfilt
+
+from filters.compute.FilterBank import FilterBank
+
+Sr = 2000.0
+Filters = {'Notch': ('bandstop', 60), 'Low Pass': ('lowpass', 70), 'High Pass': ('highpass', 1)}
+
+def separate(data):
+  """three filtfilt passes, as CCEPCore filtered before"""
+  for btype, cutOff in Filters.values():
+    f = np.array([cutOff - 5, cutOff + 5]) if btype == 'bandstop' else cutOff
+    b, a = butter(2, f * 2 / Sr, btype=btype)
+    data = filtfilt(b, a, data, axis=-1)
+  return data
+
+def trials(rng, trials, channels, elements, baseSamples=200):
+  """baseline-corrected trials, and the responses in them"""
+  t = np.arange(elements) / Sr
+  shape = (trials, channels, 1)
+  clean = 30 * np.sin(2 * np.pi * rng.uniform(5, 40, shape) * t + rng.uniform(0, 2 * np.pi, shape))
+  data = clean + rng.normal(0, 50, shape) + rng.normal(0, 20, shape) * t + 40 * np.sin(2 * np.pi * 60 * t + rng.uniform(0, 2 * np.pi, shape))
+  data -= np.median(data[..., :baseSamples], axis=-1, keepdims=True)
+  return data, clean
+
+def error(filtered, clean):
+  """µV rms from the responses, offsets aside as the AUC does"""
+  return np.sqrt(np.mean(((filtered - filtered.mean(-1, keepdims=True)) - (clean - clean.mean(-1, keepdims=True)))**2))
+
+def timed(f, *args, repeats=3):
+  times = []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    out = f(*args)
+    times.append(time.perf_counter() - start)
+  return np.median(times), out
+
+def run(count=50, channels=64, elements=1200):
+  data, clean = trials(np.random.default_rng(0), count, channels, elements)
+  bank = FilterBank({name: btype for name, (btype, _) in Filters.items()})
+  for name, (_, cutOff) in Filters.items():
+    bank.set(name, cutOff)
+
+  results = {}
+  start = time.perf_counter()
+  sos = bank.cascade(Sr)
+  results['design cascade (ms)'] = (time.perf_counter() - start) * 1e3
+  start = time.perf_counter()
+  bank.cascade(Sr)
+  results['cached cascade (ms)'] = (time.perf_counter() - start) * 1e3
+
+  seconds, old = timed(separate, data)
+  results[f'3 filtfilt passes, {count} trials {channels} ch (ms)'] = seconds * 1e3
+  results['3 filtfilt passes error (uV rms)'] = error(old, clean)
+  seconds, new = timed(FilterBank.apply, sos, data)
+  results[f'1 sosfiltfilt cascade, {count} trials {channels} ch (ms)'] = seconds * 1e3
+  results['1 sosfiltfilt cascade error (uV rms)'] = error(new, clean)
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>52}: {v:10.3f}')
@@ -0,0 +1,99 @@
+#filter processing at growing channel counts: CCEPCore.process per trigger, alone and chunking a block
+#of several stimuli, CCEPCore.setFilter re-filtering the stored trials, and PAC's PolarPlot.plot and BinsPlot.plotBins per block
+#run from the repository root: QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_filters
+import time
+import numpy as np
+import pyqtgraph as pg
+
+from filters.compute.CCEPCore import CCEPCore
+from filters.PACFilter import BinsPlot, PolarPlot
+
+CCEPChannels = [64, 256, 1024]
+PACChannels = [16, 64, 256]
+
+def parameter(name, value):
+  """a float parameter record, as ParseParam gives"""
+  return {'name': name, 'type': 'float', 'val': value, 'scaled': value, 'valstr': str(value)}
+
+def ccepCore(channels, sr=2000.0, baselineMs=100.0, ccepMs=500.0):
+  core = CCEPCore()
+  for name, value in [('SamplingRate', sr), ('BaselineEpochLength', baselineMs), ('CCEPEpochLength', ccepMs)]:
+    core.parameters.update(parameter(name, value))
+  core.configure(0, [f'ch{i}' for i in range(channels)])
+  core.avgPlots = True
+  return core
+
+def trial(rng, channels, elements):
+  return rng.normal(0, 50, (channels, elements))
+
+def setFilters(core, notch=60, lowPass=70, highPass=1):
+  for name, value in [('Notch', notch), ('Low Pass', lowPass), ('High Pass', highPass)]:
+    core.setFilter(name, value)
+
+def timeCCEP(channels, trials=20):
+  """ms per trigger, per chunked block, and per filter change"""
+  rng = np.random.default_rng(0)
+  core = ccepCore(channels)
+  setFilters(core)
+
+  #one trigger: every channel's epoch, averaged with the trials before
+  compute = []
+  for t in range(trials):
+    data = trial(rng, channels, core.elements)
+    core.numTrigs = 1
+    start = time.perf_counter()
+    core.process(data)
+    compute.append(time.perf_counter() - start)
+
+  #a block holding several stimuli, chunked at detected peaks
+  peaks = np.arange(1, 5) * core.elements + core.baseSamples
+  block = trial(rng, channels, 5 * core.elements)
+  core.numTrigs = 1
+  start = time.perf_counter()
+  core.process(block, peaks)
+  chunk = time.perf_counter() - start
+
+  #changing the notch re-filters every stored trial
+  start = time.perf_counter()
+  core.setFilter('Notch', 50)
+  refilter = time.perf_counter() - start
+  return np.median(compute[1:]), chunk, refilter, len(next(iter(core.chTable.values())).database)
+
+def timePAC(channels, elements=40, blocks=50):
+  """ms per block for PolarPlot.plot and BinsPlot.plotBins over every channel"""
+  rng = np.random.default_rng(0)
+  elWidth = np.pi / elements
+  phis = np.linspace(-np.pi + elWidth, np.pi - elWidth, elements)
+  polar = [PolarPlot(phis, title=f'ch{i}') for i in range(channels)]
+  bins = [BinsPlot(phis, {'bottom': pg.AxisItem(orientation='bottom')}, data=np.zeros(elements), title=f'ch{i}')
+          for i in range(channels)]
+  data = [rng.normal(0, 1, (channels, elements)) for _ in range(blocks)]
+  polarTimes, binsTimes = [], []
+  for block in data:
+    start = time.perf_counter()
+    for i, p in enumerate(polar):
+      p.plot(block[i, :])
+    polarTimes.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for i, p in enumerate(bins):
+      p.plotBins(block[i, :])
+    binsTimes.append(time.perf_counter() - start)
+  return np.median(polarTimes), np.median(binsTimes)
+
+def run():
+  pg.mkQApp("bench_filters")
+  results = {}
+  for channels in CCEPChannels:
+    compute, chunk, refilter, stored = timeCCEP(channels)
+    results[f'ccep computeData {channels} ch (ms/trigger)'] = compute * 1e3
+    results[f'ccep chunkData {channels} ch, 4 stimuli (ms)'] = chunk * 1e3
+    results[f'ccep filterChanged {channels} ch, {stored} trials (ms)'] = refilter * 1e3
+  for channels in PACChannels:
+    polar, bins = timePAC(channels)
+    results[f'pac PolarPlot.plot {channels} ch (ms/block)'] = polar * 1e3
+    results[f'pac BinsPlot.plotBins {channels} ch (ms/block)'] = bins * 1e3
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>52}: {v:10.3f}')
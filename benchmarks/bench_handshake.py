@@ -0,0 +1,113 @@
+#time-to-first-sample of the BCI2000 handshake, against the scripted operator in tools/fakeBCI2000
+#run from the repository root: QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_handshake
+import os
+import sys
+import time
+import pyqtgraph as pg
+from PyQt5.QtCore import Qt
+from pyqtgraph.dockarea import DockArea
+
+from base.SharedVisualization import TextOutput
+from dataThreads.BCI2000 import BCI2000Worker
+from dataThreads.streamBase.AcquisitionHub import AcquisitionHub
+from filters.filterBase.MasterFilter import MasterFilter
+
+FakePath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools', 'fakeBCI2000')
+sys.path.append(os.path.join(FakePath, 'prog')) #same module BCI2000Instance loads
+import BCI2000Remote as fake
+
+SharedStates = ["CCEPTriggered", "StimulatingChannel"]
+
+#scripted operators: fast, slow to publish parameters, and flaky
+Scripts = {
+  'fast':  {},
+  'slow':  {'parameterDelay': 0.2, 'roundTrip': 0.005},
+  'flaky': {'failures': {'GetParameter': 2}, 'roundTrip': 0.005},
+}
+
+#minimal filter, records when blocks reach plot
+class HandshakeFilter(MasterFilter):
+  sharedStates = SharedStates
+  def __init__(self, win):
+    self.blocks = []
+    super().__init__(win, FakePath, ('dataThreads', 'BCI2000'))
+  def plot(self, data):
+    self.blocks.append(time.perf_counter())
+  def receiveStates(self, state):
+    pass
+  def logPrint(self, msg):
+    pass
+
+def timeWorker(script):
+  """seconds from BCI2000Worker.run until it emits the share address, and operator round trips"""
+  fake.operator.reset(**script)
+  worker = BCI2000Worker(FakePath, 'HandshakeFilter', SharedStates)
+  emitted = []
+  worker.initSignal.connect(lambda addy: emitted.append(time.perf_counter()), Qt.DirectConnection)
+  calls = fake.operator.calls
+  start = time.perf_counter()
+  worker.run()
+  if not emitted:
+    return float('nan'), fake.operator.calls - calls
+  return emitted[0] - start, fake.operator.calls - calls
+
+def waitFor(app, condition, timeout=15.0):
+  """process events until condition() holds, returns the time it did or None"""
+  deadline = time.perf_counter() + timeout
+  while time.perf_counter() < deadline:
+    app.processEvents()
+    if condition():
+      return time.perf_counter()
+    time.sleep(0.0005)
+  return None
+
+def timeFilter(app, script, startupDelay=0.3):
+  """seconds to the first plotted block on filter start, after BCI2000 restarts, and after switching filters"""
+  fake.operator.reset(autoStart=True, source={'channels': 16, 'elements': 20, 'rate': 1000.0}, **script)
+  win = pg.QtWidgets.QMainWindow()
+  win.area = DockArea()
+  win.output = TextOutput()
+  win.hub = AcquisitionHub(print)
+  start = time.perf_counter()
+  filt = HandshakeFilter(win)
+  first = waitFor(app, lambda: len(filt.blocks) > 0)
+  results = [first - start if first else float('nan')]
+
+  #restart BCI2000, the stream ends and resetConnection brings it back
+  fake.operator.script['startupDelay'] = startupDelay
+  restart = time.perf_counter()
+  fake.operator.restart()
+  n = len(filt.blocks)
+  again = waitFor(app, lambda: len(filt.blocks) > n)
+  results.append(again - restart if again else float('nan'))
+
+  #switch away, which closes the stream, and back while BCI2000 restarts
+  filt.stop()
+  assert not win.hub.connections
+  switch = time.perf_counter()
+  filt = HandshakeFilter(win)
+  fake.operator.restart()
+  back = waitFor(app, lambda: len(filt.blocks) > 0)
+  results.append(back - switch if back else float('nan'))
+
+  fake.operator.stopSource()
+  filt.stop()
+  filt.hub.stop()
+  return results
+
+def run(repeats=3):
+  app = pg.mkQApp("bench_handshake")
+  results = {}
+  for name, script in Scripts.items():
+    times, calls = zip(*[timeWorker(script) for _ in range(repeats)])
+    results[f'worker handshake {name} (ms)'] = min(times) * 1e3
+    results[f'worker handshake {name} round trips'] = min(calls)
+  first, reconnect, switch = timeFilter(app, {})
+  results['filter first block (ms)'] = first * 1e3
+  results['filter first block after restart (ms)'] = reconnect * 1e3
+  results['filter first block after switching back (ms)'] = switch * 1e3
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>44}: {v:10.1f}')
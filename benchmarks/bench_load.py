@@ -0,0 +1,65 @@
+#signal writer speed and acquisition throughput at high channel counts, using tools.MockSource
+#run from the repository root: python -m benchmarks.bench_load
+import io
+import struct
+import threading
+import time
+import numpy as np
+from PyQt5.QtCore import Qt
+
+from dataThreads.BCI2000 import BCI2000DataThread, writeBciSignalMessage
+from tools.MockSource import MockSource
+
+def writeBciSignalMessageLoop(stream, data):
+  """previous per-sample writer, kept as the reference"""
+  stream.write(b'\xff' + bytes('Signal', 'utf-8') + b'\x00' + b'\x02')
+  for ch in range(0, data.shape[0]):
+    for el in range(0, data.shape[1]):
+      stream.write(struct.pack('<f', data[ch, el]))
+
+def timeWriter(write, data, seconds=0.5):
+  """blocks/sec written to memory"""
+  n = 0
+  start = time.perf_counter()
+  while time.perf_counter() - start < seconds:
+    write(io.BytesIO(), data)
+    n += 1
+  return n / (time.perf_counter() - start)
+
+def timeAcquisition(channels, elements=40, rate=1e9, blocks=2000):
+  """blocks/sec BCI2000DataThread emits with a source that sends as fast as it can"""
+  acq = BCI2000DataThread()
+  acq.initalize(('127.0.0.1', 0))
+  received = []
+  def data(block):
+    received.append(1)
+    acq.releaseBlock(block)
+  acq.dataSignal.connect(data, Qt.DirectConnection)
+  t = threading.Thread(target=acq.run)
+  t.start()
+
+  source = MockSource(acq.s.getsockname(), channels, elements, rate)
+  start = time.perf_counter()
+  source.run(blocks)
+  while len(received) < blocks and time.perf_counter() - start < 30:
+    time.sleep(0.001)
+  elapsed = time.perf_counter() - start
+  acq.stop()
+  t.join()
+  source.close()
+  return len(received) / elapsed
+
+def run():
+  results = {}
+  data = np.random.randn(256, 40)
+  results['signal writer loop 256ch blocks/s'] = timeWriter(writeBciSignalMessageLoop, data)
+  results['signal writer vectorized 256ch blocks/s'] = timeWriter(writeBciSignalMessage, data)
+  for channels in [256, 512, 1024]:
+    bps = timeAcquisition(channels)
+    results[f'acquisition {channels}ch blocks/s'] = bps
+    results[f'acquisition {channels}ch MB/s'] = bps * channels * 40 * 8 / 1e6
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>40}: {v:12.1f}')
@@ -0,0 +1,286 @@
+#parameter parsing at SetConfig: the previous byte-by-byte parser against the tokenizing ParseParamBytes
+#run from the repository root: python -m benchmarks.bench_params
+import io
+import random
+import time
+
+from base.BCI2kReaderMod import DatFileError, DecodeUnits, ParseParam, ParseParamBytes, Warn, unescape
+
+def unescapeReference(s):
+  """previous unescape, kept as the reference"""
+  if s in ['%', '%0', '%00']: return ''
+  out = ''
+  s = list(s)
+  while len(s):
+    c = s.pop(0)
+    if c == '%':
+      c = ''.join(s[:2])
+      if c.startswith('%'):
+        out += '%'
+        s = s[1:]
+      else:
+        try:
+          c = int(c, 16)
+        except:
+          pass
+        else:
+          out += chr(c)
+          s = s[2:]
+    else:
+      out += c
+  return out
+
+def getLine(stream, e = b'\n'):
+  line = []
+  c = stream.read(1)
+  while (c != b'' and c != e):
+    line.append(c)
+    c = stream.read(1)
+  return str(b''.join(line), 'utf-8')
+
+def getParamToken(stream):
+  c = stream.read(1)
+  while (c == b' '):
+    c = stream.read(1)
+  t = []
+  while (c != b'' and c != b' '):
+    t.append(c)
+    c = stream.read(1)
+  return str(b''.join(t), 'utf-8')
+
+def parseParamReference(stream):
+  """previous byte-by-byte ParseParam, kept as the reference"""
+  category = unescapeReference(getParamToken(stream))
+  datatype = unescapeReference(getParamToken(stream))
+  name = unescapeReference(getParamToken(stream)).rstrip('=')
+  rec = {
+    'name': name, 'comment': '', 'category': category, 'type': datatype,
+    'defaultVal': '', 'minVal': '', 'maxVal': '',
+  }
+
+  scaled = None
+  if datatype in ('int', 'float'):
+    datatypestr = datatype
+    datatype = {'float': float, 'int': int}.get(datatype)
+    val = unescapeReference(getParamToken(stream))
+    unscaled, units, scaled = DecodeUnits(val, datatype)
+    if isinstance(unscaled, (str, type(None))): Warn(
+      'failed to interpret "%s" as type %s in parameter "%s"' % (val, datatypestr, name))
+    rec.update({
+      'valstr': val,
+      'val': unscaled,
+      'units': units,
+    })
+
+  elif datatype in ('string', 'variant'):
+    val = unescapeReference(getParamToken(stream))
+    rec.update({
+      'valstr': val,
+      'val': val,
+    })
+
+  elif datatype.endswith('list'):
+    valtype = datatype[:-4]
+    valtypestr = valtype
+    valtype = {'float': float, 'int': int, '': str, 'string': str, 'variant': str}.get(valtype, valtype)
+    if isinstance(valtype, str): raise DatFileError('Unknown list type "%s"' % datatype)
+    numel, labels, labelstr = parseDim(stream)
+    val = []
+    for i in range(0, numel):
+      t = getParamToken(stream)
+      if not len(t): Warn('not enough values in parameter "%s"' % name)
+      val.append(unescapeReference(t))
+
+    valstr = ' '.join([labelstr] + val)
+    if valtype == str:
+      unscaled = val
+      units = [''] * len(val)
+    else:
+      eachstr = val
+      val = [DecodeUnits(x, valtype) for x in eachstr]
+      if len(val):
+        unscaled, units, scaled = list(zip(*val))[:3]
+      else:
+        unscaled, units, scaled = [], [], []
+      #silence error, it is commonly caused by "auto" parameter
+      # for u, v, s in zip(unscaled, val, eachstr):
+      #     if isinstance(u, (str, type(None))): Warn(
+      #         'failed to interpret "%s" as type %s in parameter "%s"' % (s, valtypestr, name))
+    rec.update({
+      'valstr': valstr,
+      'valtype': valtype,
+      'len': numel,
+      'val': unscaled,
+      'units': units,
+    })
+
+  elif datatype.endswith('matrix'):
+    valtype = datatype[:-6]
+    valtype = {'float': float, 'int': int, '': str, 'string': str, 'variant': str}.get(valtype, valtype)
+    if isinstance(valtype, str): raise DatFileError('Unknown matrix type "%s"' % valtype)
+    nrows, rowlabels, rowlabelstr = parseDim(stream)
+    ncols, collabels, collabelstr = parseDim(stream)
+
+    values = []
+    for i in range(0, nrows * ncols):
+      t = getParamToken(stream)
+      if not len(t): Warn('not enough values in parameter "%s"' % name)
+      values.append(unescapeReference(t))
+
+    valstr = ' '.join(filter(len, [rowlabelstr, collabelstr] + values))
+    val = []
+    for i in range(nrows):
+      val.append([])
+      for j in range(ncols):
+        val[-1].append(values.pop(0))
+    rec.update({
+      'valstr': valstr,
+      'valtype': valtype,
+      'val': val,
+      'shape': (nrows, ncols),
+      'dimlabels': (rowlabels, collabels),
+    })
+
+  else:
+    Warn("unsupported parameter type %r" % datatype)
+    val = unescapeReference(getParamToken(stream))
+    rec.update({
+      'valstr': val,
+      'val': val,
+    })
+
+  vals = []
+  t = getParamToken(stream)
+  while len(t):
+    if t.find('//') == 0:
+      break
+    vals.append(unescapeReference(t))
+    t = getParamToken(stream)
+
+  if len(vals): rec['defaultVal'] = vals.pop(0)
+  if len(vals): rec['minVal'] = vals.pop(0)
+  if len(vals): rec['maxVal'] = vals.pop(0)
+  if len(vals): Warn('%d extra value(s) in parameter %s' % (len(vals), name))
+
+  t = t.split('//')
+  t = t[-1]
+  comment = ' '.join([t, getLine(stream)])
+  rec['comment'] = comment.strip()
+
+  if scaled is None:
+    rec['scaled'] = rec['val']
+  else:
+    rec['scaled'] = scaled
+  stream.close()
+  return rec
+
+def parseDim(stream):
+  extent = 0
+  labels = []
+  labelstr = ''
+
+  t = getParamToken(stream)
+  if t.startswith('{'):
+    line = getLine(stream, b'}')
+    labelstr = '{ ' + line + ' }'
+    stream2 = io.BytesIO(bytes(line, 'utf-8'))
+    while True:
+      t2 = getParamToken(stream2)
+      if t2 == '': break
+      labels.append(unescapeReference(t2))
+    stream2.close()
+    extent = len(labels)
+  else:
+    extent = unescapeReference(t)
+    labelstr = extent
+    extent = int(extent)
+    labels = [str(x) for x in range(1, extent + 1)]
+  return extent, labels, labelstr
+
+def parameterCorpus(channels=256, stimuli=200):
+  """parameter lines as the operator sends them at SetConfig for a large montage"""
+  names = [f'LA{c + 1}' for c in range(channels)]
+  lines = [
+    'System:Core%20Connections string SignalSourceIP= 127.0.0.1 127.0.0.1 % % // the SignalSource module\'s IP',
+    f'Source:Signal%20Properties int SourceCh= {channels} 16 1 % // number of digitized and stored channels',
+    'Source:Signal%20Properties int SampleBlockSize= 40 32 1 % // number of samples transmitted at a time',
+    'Source:Signal%20Properties float SamplingRate= 2000Hz 256Hz 0.0% % // sample rate',
+    f'Source:Signal%20Properties list ChannelNames= {channels} {" ".join(names)} // list of channel names',
+    f'Source:Signal%20Properties floatlist SourceChOffset= {channels} {" ".join(["0"] * channels)} 0 % % // Offset for channels in A/D units',
+    f'Source:Signal%20Properties floatlist SourceChGain= {channels} {" ".join(["0.1muV"] * channels)} 0.033 % % // gain for each channel (A/D units -> muV)',
+    f'Source:Online%20Processing list TransmitChList= {channels} {" ".join(str(c + 1) for c in range(channels))} // list of transmitted channels',
+    'Storage:Documentation string SubjectName= Subject%20Name%20%28with%20%25%29 Name % % // subject alias',
+    'Application:Sequencing float StimulusDuration= 40ms 40ms 0 % // stimulus duration',
+    'Filtering:CCEP float CCEPEpochLength= 500ms 100ms % % // epoch after the trigger',
+    'Filtering:CCEP float BaselineEpochLength= 50ms 10ms % % // baseline before the trigger',
+    'Filtering:CCEP matrix Expressions= 2 1 CCEPTriggered StimulatingChannel // expressions to evaluate',
+  ]
+  #stimulus table with labelled rows and columns
+  rows = ['caption', 'icon', 'audio', 'EarlyOffsetExpression']
+  cols = " ".join(f'stim{s + 1}' for s in range(stimuli))
+  values = " ".join(f'Stimulus%20{s + 1} images%5Cstim{s + 1}.bmp % %' for s in range(stimuli))
+  lines.append(f'Application:Stimuli matrix Stimuli= {{ {" ".join(rows)} }} {{ {cols} }} {values} // captions and icons')
+  #identity spatial filter
+  spatial = " ".join('1' if r == c else '0' for r in range(64) for c in range(64))
+  lines.append(f'Filtering:SpatialFilter matrix SpatialFilter= 64 64 {spatial} 0 % % // columns represent input channels')
+  #the rest of a typical SetConfig, short scalars
+  for p in range(400):
+    lines.append(f'Application:Misc int Param{p}= {p} 0 0 % // parameter number {p}')
+  #oddities the byte reader tolerates: extra spaces, braces without spaces, too few values, no comment
+  lines += [
+    'Filtering:Odd  intlist   Gaps=  3 1  2   3 0 % %  //  two  spaces',
+    'Filtering:Odd matrix Braced= {a b} {c d %25x} 1 2 3 4 // braces',
+    'Filtering:Odd floatlist Short= 5 1 2',
+    'Filtering:Odd string Comment= a%2Fb%zz%4 //no%20space\nnext line',
+    'Filtering:Odd variant Unicode= \u00e9t\u00e9 % % %',
+  ]
+  return [bytes(line, 'utf-8') for line in lines]
+
+def escapeCorpus(count=2000, length=40):
+  """strings with well-formed and malformed escapes"""
+  rng = random.Random(1)
+  alphabet = 'ab09%%%fFGz '
+  return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, length))) for _ in range(count)]
+
+def checkEqual(lines):
+  """ParseParamBytes and unescape must reproduce the previous results exactly"""
+  for line in lines:
+    a = parseParamReference(io.BytesIO(line))
+    b = ParseParamBytes(line)
+    if a != b:
+      raise AssertionError(f'ParseParamBytes differs on {line[:60]!r}')
+  for s in escapeCorpus():
+    if unescape(s) != unescapeReference(s):
+      raise AssertionError(f'unescape differs on {s!r}')
+
+def timeCorpus(parse, lines, repeats=3):
+  """seconds to parse the corpus once, best of repeats"""
+  best = float('inf')
+  for _ in range(repeats):
+    start = time.perf_counter()
+    for line in lines:
+      parse(line)
+    best = min(best, time.perf_counter() - start)
+  return best
+
+def run():
+  lines = parameterCorpus()
+  checkEqual(lines)
+  long = 'Stimulus%20caption%20' * 500
+  matrix = next(l for l in lines if l.startswith(b'Filtering:SpatialFilter'))
+  results = {
+    'parameters in corpus': len(lines),
+    'previous ParseParam corpus (ms)': timeCorpus(lambda l: parseParamReference(io.BytesIO(l)), lines) * 1e3,
+    'ParseParam corpus (ms)': timeCorpus(lambda l: ParseParam(io.BytesIO(l)), lines) * 1e3,
+    'ParseParamBytes corpus (ms)': timeCorpus(ParseParamBytes, lines) * 1e3,
+    'previous ParseParam 64x64 matrix (ms)': timeCorpus(lambda l: parseParamReference(io.BytesIO(l)), [matrix]) * 1e3,
+    'ParseParamBytes 64x64 matrix (ms)': timeCorpus(ParseParamBytes, [matrix]) * 1e3,
+    'unescape reference 10k chars (ms)': timeCorpus(unescapeReference, [long]) * 1e3,
+    'unescape 10k chars (ms)': timeCorpus(unescape, [long]) * 1e3,
+  }
+  results['speedup'] = results['previous ParseParam corpus (ms)'] / results['ParseParamBytes corpus (ms)']
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>36}: {v:10.2f}')
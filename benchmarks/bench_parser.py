@@ -0,0 +1,62 @@
+#micro-benchmark of the BCI2000 wire-protocol parser
+#run from the repository root: python -m benchmarks.bench_parser
+import io
+import socket
+import threading
+import time
+
+from dataThreads.BCI2000 import BciMessageReader, receiveBciMessage, writeBciSharedSignalMessage, writeBciSysCommandMessage
+
+def recordedStream(blocks, channels=64, elements=40):
+  """bytes of a typical session: one signal and one state message per block"""
+  stream = io.BytesIO()
+  for b in range(blocks):
+    writeBciSharedSignalMessage(stream, 'States', 'vbci_states', 2, elements)
+    writeBciSharedSignalMessage(stream, 'Signal', 'vbci_signal', channels, elements)
+    if b % 100 == 0:
+      writeBciSysCommandMessage(stream, 'EndOfData')
+  return stream.getvalue()
+
+def _send(sock, data):
+  sock.sendall(data)
+  sock.shutdown(socket.SHUT_WR)
+
+def _parseAll(receive):
+  count = 0
+  try:
+    while True:
+      receive()
+      count += 1
+  except EOFError:
+    return count
+
+def timeParser(data, buffered):
+  """messages/sec for parsing data received over a local socket"""
+  a, b = socket.socketpair()
+  sender = threading.Thread(target=_send, args=(a, data))
+  start = time.perf_counter()
+  sender.start()
+  if buffered:
+    reader = BciMessageReader(b)
+    count = _parseAll(reader.receive)
+  else:
+    stream = b.makefile('rb')
+    count = _parseAll(lambda: receiveBciMessage(stream))
+  elapsed = time.perf_counter() - start
+  sender.join()
+  a.close()
+  b.close()
+  return count / elapsed
+
+def run(blocks=20000):
+  data = recordedStream(blocks)
+  return {
+    'receiveBciMessage msgs/s': timeParser(data, buffered=False),
+    'BciMessageReader msgs/s':  timeParser(data, buffered=True),
+  }
+
+if __name__ == '__main__':
+  results = run()
+  for k, v in results.items():
+    print(f'{k:>28}: {v:12.0f}')
+  print(f'{"speedup":>28}: {results["BciMessageReader msgs/s"] / results["receiveBciMessage msgs/s"]:12.1f}x')
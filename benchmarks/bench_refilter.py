@@ -0,0 +1,55 @@
+#CCEP filter changes on a full trial store: CCEPCore.setFilter re-filtering in the caller's thread,
+#against a RefilterWorker on a thread pool, and how long the caller is held up by each
+#run from the repository root: python -m benchmarks.bench_refilter
+import os
+import time
+import numpy as np
+
+from benchmarks.bench_filters import ccepCore, setFilters
+
+Sizes = [(64, 100), (256, 100)] #channels, trials
+
+def filledCore(channels, trials):
+  rng = np.random.default_rng(0)
+  core = ccepCore(channels)
+  setFilters(core)
+  for t in range(trials):
+    core.numTrigs = 1
+    core.process(rng.normal(0, 50, (channels, core.elements)))
+  return core
+
+def timeRefilter(core):
+  """seconds for a filter change: synchronous, then held up and total with a worker"""
+  start = time.perf_counter()
+  core.setFilter('Notch', 50)
+  sync = time.perf_counter() - start
+  expected = core.database.filled().copy()
+
+  start = time.perf_counter()
+  core.setFilter('Notch', 60, refilter=False)
+  worker = core.refilterJob()
+  heldUp = time.perf_counter() - start
+  worker.run() #in a QThread in the GUI
+  start = time.perf_counter()
+  core.setFilter('Notch', 50, refilter=False)
+  worker = core.refilterJob()
+  worker.run()
+  total = time.perf_counter() - start
+  swap = time.perf_counter()
+  core.applyRefilter(worker)
+  heldUp += time.perf_counter() - swap
+  assert np.allclose(core.database.filled(), expected)
+  return sync, heldUp, total
+
+def run():
+  results = {'workers': os.cpu_count() or 1}
+  for channels, trials in Sizes:
+    sync, heldUp, total = timeRefilter(filledCore(channels, trials))
+    results[f'setFilter {channels} ch, {trials} trials (ms)'] = sync * 1e3
+    results[f'RefilterWorker {channels} ch, {trials} trials (ms)'] = total * 1e3
+    results[f'caller held up {channels} ch, {trials} trials (ms)'] = heldUp * 1e3
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>44}: {v:10.3f}')
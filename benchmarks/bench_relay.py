@@ -0,0 +1,105 @@
+#loopback test of tools/Relay.py and the Remote data stream: MockSource -> relay -> Remote, for each compression
+#checks the samples that arrive and reports bytes on the wire, compression and lag
+#run from the repository root: python -m benchmarks.bench_relay
+import socket
+import threading
+import time
+import numpy as np
+from PyQt5.QtCore import Qt
+
+from dataThreads.Remote import RemoteDataThread
+from dataThreads.streamBase.RelayProtocol import availableCodecs
+from tools.MockSource import MockSource
+from tools.Relay import Relay
+
+Variants = [('none', False), ('zlib', False), ('zlib', True), ('lz4', False), ('lz4', True)]
+
+class Receiver():
+  """keeps a copy of every block, as filters would see them"""
+  def __init__(self, acqThr):
+    self.acqThr = acqThr
+    self.blocks = []
+    self.parameters = []
+    self.configured = threading.Event()
+  def properties(self, elements, chNames):
+    self.configured.set()
+  def parameter(self, p):
+    self.parameters.append(p)
+  def data(self, block):
+    self.blocks.append(block.copy())
+    self.acqThr.releaseBlock(block)
+
+def freePort():
+  with socket.socket() as s:
+    s.bind(('127.0.0.1', 0))
+    return s.getsockname()[1]
+
+def expected(source, b):
+  """block b as MockSource fills it"""
+  t = source.phase + b * source.elements
+  return np.sin(source.freqs * t) * 100
+
+def same(block, want, float32):
+  if float32:
+    return np.allclose(block, want.astype(np.float32), rtol=1e-6)
+  return np.array_equal(block, want)
+
+def runVariant(codec, float32, blocks=400, channels=128, elements=40, rate=8000.0):
+  """stream blocks through the relay, returns a dict of results"""
+  relay = Relay(('127.0.0.1', 0), freePort(), log=lambda msg: None)
+  server = threading.Thread(target=relay.serve, daemon=True)
+  server.start()
+
+  client = RemoteDataThread('BenchFilter', ['CCEPTriggered', 'StimulatingChannel'], float32, codec)
+  client.pingEvery = 0.2
+  client.initalize(relay.address())
+  receiver = Receiver(client)
+  client.propertiesSignal.connect(receiver.properties, Qt.DirectConnection)
+  client.parameterSignal.connect(receiver.parameter, Qt.DirectConnection)
+  client.dataSignal.connect(receiver.data, Qt.DirectConnection)
+  t = threading.Thread(target=client.run)
+  t.start()
+
+  #the relay shares to its first port, where the source connects as BCI2000 would
+  source = MockSource(('127.0.0.1', relay.sharePort), channels, elements, rate)
+  start = time.perf_counter()
+  source.run(blocks)
+  deadline = time.perf_counter() + 5
+  while len(receiver.blocks) < blocks and time.perf_counter() < deadline:
+    time.sleep(0.01)
+  seconds = time.perf_counter() - start
+  wire = client.reader.received
+
+  client.stop()
+  relay.stop()
+  t.join()
+  server.join()
+  source.close()
+
+  #samples arrive exactly, or rounded to float32. Like BCI2000, MockSource reuses its shared memory,
+  #a block the relay read late holds a later block of the source
+  errors = overwritten = 0
+  for b, block in enumerate(receiver.blocks):
+    matches = [same(block, expected(source, k), float32) for k in range(b, b + 4)]
+    if not matches[0]:
+      overwritten += any(matches)
+      errors += not any(matches)
+  raw = blocks * channels * elements * 8
+  return {'blocks': len(receiver.blocks), 'mismatched': errors, 'overwritten at source': overwritten,
+          'parameters': len(receiver.parameters),
+          'kB/s': wire / seconds / 1e3, 'ratio': raw / wire,
+          'lag p50 (ms)': client.lag.percentile(50) * 1e3, 'lag p95 (ms)': client.lag.percentile(95) * 1e3}
+
+def run():
+  results = {}
+  for codec, float32 in Variants:
+    if codec not in availableCodecs():
+      continue
+    name = codec + (' float32' if float32 else '')
+    for k, v in runVariant(codec, float32).items():
+      results[f'{name} {k}'] = v
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>36}: {v:10.2f}')
@@ -0,0 +1,96 @@
+#startup time of the visualizer: imports of main.py (python -X importtime), time to the first window,
+#and time until the filter saved in the settings runs. Each measurement is a fresh interpreter
+#with its own settings folder, talking to the scripted operator in tools/fakeBCI2000
+#run from the repository root: python -m benchmarks.bench_startup
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+Root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FakePath = os.path.join(Root, 'tools', 'fakeBCI2000')
+
+#heavy modules that should not be imported before they are needed
+Deferred = ['pyqtgraph.opengl', 'OpenGL.GL', 'scipy.io', 'scipy.signal', 'scipy.stats']
+
+#prints the time the window is shown and the time the saved filter runs, in seconds since launch
+WindowScript = '''
+import sys, time
+import pyqtgraph as pg
+app = pg.mkQApp("bench_startup")
+settings = pg.QtCore.QSettings("BCI2000", "MainWindow")
+settings.setValue("bciPath", sys.argv[1])
+settings.setValue("stream", "BCI2000")
+settings.setValue("filters", [sys.argv[2]])
+settings.sync()
+import main
+w = main.MainWindow()
+w.show()
+app.processEvents()
+print("window", time.perf_counter(), flush=True)
+deadline = time.perf_counter() + 30
+while time.perf_counter() < deadline:
+  app.processEvents()
+  if sys.argv[2] in getattr(w, "mods", {}) or getattr(w, "mod", None) is not None:
+    print("filter", time.perf_counter(), flush=True)
+    break
+  time.sleep(0.001)
+print("modules", " ".join(m for m in sys.modules if m.startswith(("scipy.", "pyqtgraph.opengl", "OpenGL"))), flush=True)
+w.hub.stop() if hasattr(w, "hub") else None
+import os
+os._exit(0)
+'''
+
+def environment(configDir):
+  env = dict(os.environ)
+  env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+  env['XDG_CONFIG_HOME'] = configDir #settings of this run only
+  env['PYTHONPATH'] = Root
+  return env
+
+def importProfile():
+  """cumulative import time in seconds by module, from python -X importtime -c 'import main'"""
+  with tempfile.TemporaryDirectory() as configDir:
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=Root,
+                         env=environment(configDir), capture_output=True, text=True).stderr
+  times = {}
+  for line in out.splitlines():
+    if not line.startswith('import time:') or 'cumulative' in line:
+      continue
+    selfTime, cumulative, name = [p.strip() for p in line[len('import time:'):].split('|')]
+    times[name] = int(cumulative) * 1e-6
+  return times
+
+def timeWindow(filterName='DataIOFilter'):
+  """seconds from launch to the window being shown and to the saved filter running, and heavy modules loaded"""
+  with tempfile.TemporaryDirectory() as configDir:
+    launch = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', WindowScript, FakePath, filterName], cwd=Root,
+                            env=environment(configDir), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    marks = {}
+    for line in proc.stdout:
+      kind, _, value = line.strip().partition(' ')
+      marks[kind] = value
+    proc.wait()
+  #perf_counter is system wide here, so the child's marks compare with our launch time
+  window = float(marks['window']) - launch if 'window' in marks else float('nan')
+  running = float(marks['filter']) - launch if 'filter' in marks else float('nan')
+  return window, running, marks.get('modules', '').split()
+
+def run(repeats=3):
+  results = {}
+  profiles = [importProfile() for _ in range(repeats)]
+  results['import main (ms)'] = min(p['main'] for p in profiles) * 1e3
+  for name in ['pyqtgraph', 'base.Brain'] + Deferred:
+    results[f'  {name} (ms)'] = min(p.get(name, 0.0) for p in profiles) * 1e3
+  windows = [timeWindow() for _ in range(repeats)]
+  results['launch to window (ms)'] = min(w[0] for w in windows) * 1e3
+  results['launch to saved filter running (ms)'] = min(w[1] for w in windows) * 1e3
+  loaded = set(windows[0][2])
+  results['deferred modules loaded with DataIOFilter'] = sum(m in loaded for m in Deferred)
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>44}: {v:9.1f}')
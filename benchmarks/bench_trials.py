@@ -0,0 +1,55 @@
+#CCEP trial storage through a long session: appending to TrialStore before and after its memory cap,
+#reading the last trials, and averaging every trial from the store against a Python list of arrays
+#run from the repository root: python -m benchmarks.bench_trials
+import time
+import numpy as np
+
+from filters.compute.TrialStore import TrialStore
+
+def timeAppends(store, trials):
+  """median µs per append"""
+  times = []
+  for t in trials:
+    start = time.perf_counter()
+    store.append(t)
+    times.append(time.perf_counter() - start)
+  return np.median(times) * 1e6
+
+def timeMean(trials, repeats=5):
+  """ms to average stored trials, from a list and from a store"""
+  store = TrialStore(*trials[0].shape, maxBytes=2 * len(trials) * trials[0].nbytes)
+  for t in trials:
+    store.append(t)
+  fromList, fromStore = [], []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    np.mean(trials, axis=0)
+    fromList.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    np.mean(store.filled(), axis=0)
+    fromStore.append(time.perf_counter() - start)
+  return np.median(fromList) * 1e3, np.median(fromStore) * 1e3
+
+def run(channels=64, samples=1200, capMB=128, session=2000):
+  rng = np.random.default_rng(0)
+  pool = [rng.normal(0, 50, (channels, samples)) for _ in range(32)] #stand for new trials
+  store = TrialStore(channels, samples, maxBytes=capMB * 2**20)
+  results = {'trial (MB)': pool[0].nbytes / 2**20, 'trials under the cap': store.maxTrials}
+
+  results['append before the cap (µs/trial)'] = timeAppends(store, [pool[i % 32] for i in range(store.maxTrials)])
+  results['append past the cap (µs/trial)'] = timeAppends(store, [pool[i % 32] for i in range(session - store.maxTrials)])
+  results[f'store after {session} trials (MB)'] = store.nbytes / 2**20
+  start = time.perf_counter()
+  for _ in range(1000):
+    store.last(10)
+  results['last 10 trials (µs)'] = (time.perf_counter() - start) * 1e3
+
+  for n in [50, 200]:
+    fromList, fromStore = timeMean([pool[i % 32].copy() for i in range(n)])
+    results[f'average of {n} trials, list (ms)'] = fromList
+    results[f'average of {n} trials, store (ms)'] = fromStore
+  return results
+
+if __name__ == '__main__':
+  for k, v in run().items():
+    print(f'{k:>40}: {v:10.3f}')
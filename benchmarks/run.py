@@ -0,0 +1,106 @@
+#runs the benchmarks without a display and saves their results as JSON, to compare between commits
+#run from the repository root:
+#  python -m benchmarks.run                          every benchmark, saved to benchmarks/results/<commit>.json
+#  python -m benchmarks.run filters brain            only bench_filters and bench_brain
+#  python -m benchmarks.run --compare old.json       print the change against earlier results
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+Root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+Folder = os.path.join(Root, 'benchmarks')
+
+def available():
+  """benchmark names, bench_<name>.py in this folder"""
+  return sorted(f[len('bench_'):-len('.py')] for f in os.listdir(Folder) if f.startswith('bench_') and f.endswith('.py'))
+
+def commit():
+  try:
+    out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Root, capture_output=True, text=True)
+    dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=Root, capture_output=True, text=True)
+    return out.stdout.strip() + ('-dirty' if dirty.stdout.strip() else '') if out.returncode == 0 else 'unknown'
+  except OSError:
+    return 'unknown'
+
+def runOne(name, verbose=False, timeout=1800):
+  """results of one benchmark, run in its own interpreter with its own settings. None if it failed"""
+  with tempfile.TemporaryDirectory() as folder:
+    out = os.path.join(folder, 'results.json')
+    env = dict(os.environ)
+    env['QT_QPA_PLATFORM'] = 'offscreen'
+    env['XDG_CONFIG_HOME'] = folder #settings written by the benchmark stay out of the user's
+    env['PYTHONPATH'] = Root
+    try:
+      subprocess.run([sys.executable, '-m', 'benchmarks.run', '--child', name, out], cwd=Root, env=env, timeout=timeout,
+                     stdout=None if verbose else subprocess.DEVNULL)
+    except subprocess.TimeoutExpired:
+      print(f'{name}: timed out after {timeout} s')
+      return None
+    if not os.path.exists(out):
+      return None
+    with open(out) as f:
+      return json.load(f)
+
+def child(name, out):
+  import importlib
+  module = importlib.import_module('benchmarks.bench_' + name)
+  results = module.run()
+  with open(out, 'w') as f:
+    json.dump({k: float(v) for k, v in results.items()}, f)
+
+def compare(old, new):
+  """print metrics of both runs side by side"""
+  print(f"\n{'':>60}  {old['commit']:>12} {new['commit']:>12}  change")
+  for name, results in new['results'].items():
+    before = old['results'].get(name) or {}
+    for k, v in results.items():
+      if k in before:
+        change = f'{v / before[k]:6.2f}x' if before[k] else ''
+        print(f'{name + ": " + k:>60}  {before[k]:12.3f} {v:12.3f}  {change}')
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Run the benchmarks headless and save the results")
+  parser.add_argument('names', nargs='*', help=f"benchmarks to run, all by default: {', '.join(available())}")
+  parser.add_argument('--out', help="results file, benchmarks/results/<commit>.json by default")
+  parser.add_argument('--compare', help="earlier results file to compare with")
+  parser.add_argument('--verbose', action='store_true', help="show what the benchmarks print")
+  parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS) #name, results file
+  args = parser.parse_args()
+  if args.child:
+    child(*args.child)
+    sys.exit(0)
+
+  names = args.names or available()
+  unknown = [n for n in names if n not in available()]
+  if unknown:
+    parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+  run = {'commit': commit(), 'date': datetime.datetime.now().isoformat(timespec='seconds'),
+         'python': platform.python_version(), 'machine': f'{platform.system()} {platform.machine()} {platform.node()}',
+         'results': {}, 'seconds': {}, 'failed': []}
+  for name in names:
+    start = time.perf_counter()
+    results = runOne(name, args.verbose)
+    run['seconds'][name] = time.perf_counter() - start
+    if results is None:
+      print(f'{name}: failed')
+      run['failed'].append(name)
+      continue
+    run['results'][name] = results
+    for k, v in results.items():
+      print(f'{name + ": " + k:>60}: {v:12.3f}')
+
+  out = args.out or os.path.join(Folder, 'results', run['commit'] + '.json')
+  os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+  with open(out, 'w') as f:
+    json.dump(run, f, indent=1)
+  print(f'Saved to {out}')
+  if args.compare:
+    with open(args.compare) as f:
+      compare(json.load(f), run)
+  sys.exit(1 if run['failed'] else 0)
@@ -1,7 +1,15 @@
 from abc import abstractmethod
-from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtCore import QCoreApplication, QObject, pyqtSignal
+from PyQt5.QtWidgets import QApplication
 import numpy as np
 
+from dataThreads.streamBase.BlockTiming import BlockTiming
+
+#True if data streams may ask the user, False in a headless run (main.py --headless),
+#where they use the choices saved in their settings instead
+def interactive():
+  return isinstance(QCoreApplication.instance(), QApplication)
+
 class AbstractDataThread(QObject):
   #QThread signal/slots 
   propertiesSignal = pyqtSignal(int, list) #num of elements, ch names
@@ -10,6 +18,11 @@ class AbstractDataThread(QObject):
   parameterSignal  = pyqtSignal(object)
   printSignal      = pyqtSignal(str)
   disconnected     = pyqtSignal()
+  ended            = pyqtSignal() #no more blocks will come, e.g. end of a recording
+
+  def __init__(self):
+    super().__init__()
+    self.timing = BlockTiming() #latency of blocks by stage, see the Performance dock
 
   @abstractmethod
   def stop(self):
@@ -22,6 +35,24 @@ class AbstractDataThread(QObject):
   @abstractmethod
   def run(self):
     pass
+
+  #called by consumers once they are done with an array from dataSignal
+  def releaseBlock(self, data):
+    pass
+
+  #called when count more consumers will each release an array from dataSignal
+  def retainBlock(self, data, count):
+    pass
+
+  #counters for monitoring the stream, name -> value
+  def stats(self):
+    return {}
+
+  #emit a data block, timed from arrival (perf_counter) when its bytes came in
+  def emitBlock(self, data, arrival):
+    self.timing.stamp(data, arrival)
+    self.dataSignal.emit(data)
+    self.timing.record('Emitted', arrival)
   
 class AbstractWorker(QObject):
   initSignal = pyqtSignal(str) #address, e.g., "localhost:1890"
@@ -36,6 +67,10 @@ class AbstractWorker(QObject):
     pass
 
 class AbstractCommunication():
+  #True if each filter gets its own stream (BCI2000 shares every filter's signal separately),
+  #False if one stream serves every filter (see AcquisitionHub)
+  sharePerFilter = False
+
   def __init__(self):
     pass
 
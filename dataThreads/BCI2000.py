@@ -1,24 +1,28 @@
 import socket
+import selectors
+import time
 from select import select
-from multiprocessing import shared_memory
 import numpy as np
 import sys
 import os
 import importlib
 import io
-import struct
 import traceback
 import platform
 from enum import Enum
 from PyQt5.QtCore import QThread
 
-from base.BCI2kReaderMod import ParseParam
+from base.BCI2kReaderMod import ParseParamBytes
 from dataThreads.AbstractClasses import *
+from dataThreads.streamBase.SnapshotPool import SnapshotPool
+from dataThreads.streamBase.SharedSegments import SegmentCache
 #
 # Data acquisition thread from BCI2000's shared memory
 # Acquires signals and states, their properties, and parameters
 #
 class BCI2000(AbstractCommunication):
+  sharePerFilter = True #Share<Filter> parameters
+
   def __init__(self, bciPath, file, sharedStates):
     self._acqThr = BCI2000DataThread()
     self._worker = BCI2000Worker(bciPath, file, sharedStates)
@@ -44,6 +48,9 @@ def BCI2000Instance(bciPath):
     sys.exit("Could not access BCI2000Remote.py! Make sure BCI2000/prog is in your path")
 
 class BCI2000Worker(AbstractWorker):
+  defaultAddress = 'localhost:1897' #where BCI2000 shares data unless the hub assigns another port
+  parameterTimeout = 10.0 #seconds to wait for BCI2000 to take the sharing parameters
+  maxFailures = 3 #failed GetParameter calls tolerated before giving up
   def __init__(self, bciPath, className, sharedStates):
     super().__init__()
     self.bciPath = bciPath
@@ -55,82 +62,134 @@ class BCI2000Worker(AbstractWorker):
     self.oldSystemState = ""
     self._isRunning = True
     self.startedDataThread = False
+    self.address = self.defaultAddress #share address, kept across reconnects so the data thread stays valid
+    self.reconnect = False #connect to the operator again before the next handshake
+    self.phaseTimes = {} #seconds spent in each phase of the last handshake
   def stop(self):
     self._isRunning = False
   def startRemote(self):
     self.bci = BCI2000Instance(self.bciPath)
     self.bci.Disconnect()
     self.bci.Connect()
+  def backoff(self, attempt):
+    """exponential backoff, 5 ms doubling up to 200 ms"""
+    QThread.msleep(min(5 << attempt, 200))
+
   def run(self):
-    notConnected = True
-    while notConnected:
+    start = time.perf_counter()
+    if self.reconnect:
+      self.reconnect = False
+      self.startRemote()
+    if not self.waitForOperator():
+      return
+    connected = time.perf_counter()
+
+    #suppress error messages first, bc for some reason
+    #getting an empty parameter gives an error
+    self.bci.Execute('SET LogLevel 1; SET AbortOnError 0')
+    try:
+      p = self.populateParameters()
+    finally:
+      #bring error messages back
+      self.bci.Execute('SET LogLevel 1; SET AbortOnError 1')
+    if p is None:
+      return
+    self.address = p
+    done = time.perf_counter()
+    self.phaseTimes = {'operator': connected - start, 'parameters': done - connected, 'total': done - start}
+    self.logPrint.emit(f"Connected to BCI2000 in {self.phaseTimes['total'] * 1e3:.0f} ms "
+                       f"(operator {self.phaseTimes['operator'] * 1e3:.0f} ms, parameters {self.phaseTimes['parameters'] * 1e3:.0f} ms)")
+
+    #we are ready to start data thread!
+    if not self.startedDataThread:
+      self.initSignal.emit(p)
+      self.startedDataThread = True
+
+  def waitForOperator(self):
+    """wait until BCI2000 is connected or resting, returns False if stopped meanwhile"""
+    while self._isRunning:
       self.bci.Execute("WAIT FOR CONNECTED|RESTING 0.5")
-      notConnected = self.bci.Result == 'false'
+      if self.bci.Result != 'false':
+        return True
       st = self.bci.GetSystemState()
-      if st == "Suspended":
-        self.logPrint.emit("Press Set Config twice to connect...")
-      elif st == "Running":
-        self.logPrint.emit("Stop the run to connect...")
-      if not self._isRunning: return
-
-    #access sharing parameter
-    ready = False
-    p = ""
-    while True:
+      if st != self.oldSystemState: #say it once, not every half second
+        if st == "Suspended":
+          self.logPrint.emit("Press Set Config twice to connect...")
+        elif st == "Running":
+          self.logPrint.emit("Stop the run to connect...")
+        self.oldSystemState = st
+    return False
+
+  def populateParameters(self):
+    """point Share<Filter> at this worker's address and fill empty shared states in one batch,
+    then wait for BCI2000 to take them. Returns the share address, or None if they cannot be set"""
+    share = f'Share{self.className}'
+    commands = {share: f'SET PARAMETER {share} {self.address}'}
+    errors = {share: f'Parameter {share} does not exist! Cannot acquire data'}
+    if self.sharedStateList:
+      sts = " ".join(self.sharedStateList)
+      commands[share + 'States'] = f'SET PARAMETER % list {share}States= {len(self.sharedStateList)} {sts}'
+      errors[share + 'States'] = f'Parameter {share}States is not properly populated! Cannot acquire data'
+
+    deadline = time.perf_counter() + self.parameterTimeout
+    attempt = 0
+    polls = 0 #reads that found parameters not yet set
+    failures = 0
+    while self._isRunning:
+      values = {}
       try:
-        p = self.bci.GetParameter(f'Share{self.className}')
-        if p == "":
-          #populate parameter
-          self.bci.Execute(f'SET PARAMETER Share{self.className} localhost:1897')
-          QThread.msleep(50) #sleep for 50ms before accessing new parameter
-        else:
-          ready = True
-          break
+        for name in commands:
+          values[name] = self.bci.GetParameter(name)
       except:
-        self.logPrint.emit(f'Parameter Share{self.className} does not exist! Cannot acquire data')
-        break
-
-    #access shared states parameter
-    #p = self.bci.GetParameter(f'Share{self.className}')
-    if ready:
-      if self.sharedStateList:
-        sts = " ".join(self.sharedStateList)
-        while True:
-          try:
-            #suppress error messages first, bc for some reason
-            #getting an empty parameter gives an error
-            self.bci.Execute('SET LogLevel 1')
-            self.bci.Execute('SET AbortOnError 0')
-            #silently check parameter
-            stP = self.bci.GetParameter(f'Share{self.className}States')
-            if stP == f"Parameter Share{self.className}States is empty" or stP == "":
-              self.bci.Execute(f'SET PARAMETER % list Share{self.className}States= {len(self.sharedStateList)} {sts}')
-              QThread.msleep(50)
-            else:
-              #we are ready to start data thread!
-              if not self.startedDataThread:
-                self.initSignal.emit(p)
-                self.startedDataThread = True
-              break
-          except:
-            self.logPrint.emit(f'Parameter Share{self.className}States is not properly populated! Cannot acquire data')
-            break
-      else:
-        #we are ready to start data thread!
-        if not self.startedDataThread:
-          self.initSignal.emit(p)
-          self.startedDataThread = True
-
-    #bring error messages back
-    self.bci.Execute('SET LogLevel 1')
-    self.bci.Execute('SET AbortOnError 1')
+        failures += 1
+        if failures > self.maxFailures:
+          self.logPrint.emit(errors[name])
+          return None
+        self.backoff(attempt)
+        attempt += 1
+        continue
+      #an address preset by a batch file may be taken by another filter, always share at ours
+      pending = [n for n, v in values.items() if v == "" or v == f"Parameter {n} is empty"]
+      if share not in pending and values[share] != self.address:
+        pending.append(share)
+      if not pending:
+        return self.address
+      if time.perf_counter() > deadline:
+        self.logPrint.emit(errors[pending[0]])
+        return None
+      #populate parameters, now and then again in case BCI2000 dropped them
+      if polls % 8 == 0:
+        self.bci.Execute("; ".join(commands[n] for n in pending))
+      polls += 1
+      self.backoff(attempt)
+      attempt += 1
+    return None
 
 class BCI2000DataThread(AbstractDataThread):
   def __init__(self):
     super(BCI2000DataThread, self).__init__()
     self._isRunning = True
+    self.pool = SnapshotPool() #blocks are emitted as snapshots, never as shared memory views
+    self.segments = SegmentCache() #shared memory opened for BCI2000's signals
+    self.eventDriven = True #react to sockets with selectors instead of polling
+    self.wakeRead = self.wakeWrite = None #self-pipe interrupting the selector on stop(), open while run() is
+    self.latency = self.timing.histogram('Emitted') #block readable -> emitted
+  def releaseBlock(self, data):
+    self.pool.release(data)
+  def retainBlock(self, data, count):
+    self.pool.retain(data, count)
+  def stats(self):
+    return {'Snapshot pool exhausted': self.pool.exhausted,
+            'Open segments': self.segments.openSegments(),
+            'Mapped bytes': self.segments.mappedBytes(),
+            'Emit latency p95 (ms)': self.latency.percentile(95) * 1e3}
   def stop(self):
     self._isRunning = False
+    try:
+      if self.wakeWrite is not None:
+        self.wakeWrite.send(b'\x00')
+    except OSError:
+      pass
 
   def waitForRead(self, sock):
     """polling wait for data on the socket so we may react to a keyboard interrupt"""
@@ -144,35 +203,122 @@ class BCI2000DataThread(AbstractDataThread):
         quit()
 
   def initalize(self, address):
+    """listen for BCI2000 at address, raises OSError if it cannot be bound"""
+    self.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
       # With the help of bind() function 
       # binding host and port
-      self.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
       self.s.bind((address[0], int(address[1])))
-        
-    except socket.error as message:
-      # if any error occurs then with the 
-      # help of sys.exit() exit from the program
-      print('Bind failed. Error Code : '
-          + str(message[0]) + ' Message '
-          + message[1])
-      sys.exit()
+    except OSError:
+      self.s.close()
+      raise
     self.s.listen(1)
     self.s.settimeout(0.1)        
     
   def receiveSignal(self, msg):
-    if msg.shm not in self.memInfo:
-      memObj = shared_memory.SharedMemory(msg.shm)
-      self.memInfo[msg.shm] = memObj
-    else:
-      memObj = self.memInfo[msg.shm]
+    """zero-copy view of a signal in shared memory.
+    BCI2000 stores GenericSignal values as doubles there, whatever type the messages announce"""
+    memObj = self.segments.get(msg.shm)
+    return np.ndarray((msg.channels, msg.elements), dtype=np.double, buffer=memObj.buf)
 
-    signal = np.ndarray((msg.channels, msg.elements),dtype=np.double, buffer=memObj.buf)
-    return signal
+  def releaseSegments(self):
+    """close shared memory mappings, BCI2000 creates new segments when it restarts"""
+    self.segments.clear()
 
   def run(self):
+    self.wakeRead, self.wakeWrite = socket.socketpair()
+    try:
+      if self.eventDriven:
+        self.acquireEvents()
+      else:
+        self.acquire()
+    finally:
+      #both loops leave their sockets here
+      self.releaseSegments()
+      self.s.close()
+      self.wakeRead.close()
+      self.wakeWrite.close()
+
+  def handleMessage(self, msg, arrival):
+    """emit a parsed message, arrival is when its bytes became readable"""
+    if msg.kind == 'SignalProperties' and msg.sourceID == 'Signal':
+      print("SIGNAL PROPERTIES")
+      self.pool.configure((len(msg.chNames), msg.elements), np.double)
+      self.propertiesSignal.emit(msg.elements, msg.chNames)
+
+    elif msg.kind == 'SignalProperties' and msg.sourceID == 'States':
+      pass
+
+    elif msg.kind == 'Signal' and msg.sourceID == 'Signal':
+      self.timing.record('Parsed', arrival)
+      with self.segments.use(msg.shm):
+        self.emitBlock(self.pool.snapshot(self.receiveSignal(msg)), arrival)
+
+    elif msg.kind == 'Parameter':
+      self.parameterSignal.emit(msg.param)
+
+    elif msg.kind == 'Signal' and msg.sourceID == 'States':
+      with self.segments.use(msg.shm):
+        #round incoming signal to nearest int
+        self.stateSignal.emit(np.rint(self.receiveSignal(msg)).astype(np.int64))
+
+    elif msg.kind == 'SysCommand' and msg.command == 'EndOfData':
+      pass
+
+    elif msg.kind == 'SysCommand' and msg.command == 'EndOfTransmission':
+      print('end of transmission')
+      self.releaseSegments()
+
+    else:
+      raise RuntimeError('Unexpected BCI2000 message')
+
+  def acquireEvents(self):
+    """wait on the listening socket, the connection and the wake-up socket without polling"""
+    sel = selectors.DefaultSelector()
+    sel.register(self.wakeRead, selectors.EVENT_READ)
+    sel.register(self.s, selectors.EVENT_READ)
+    address = self.s.getsockname()
+    self.printSignal.emit("Waiting for BCI2000 at %s:%s" %(address[0], address[1]))
+    conn = None
+    try:
+      while self._isRunning:
+        events = sel.select()
+        arrival = time.perf_counter()
+        for key, _ in events:
+          if key.fileobj is self.wakeRead:
+            self.wakeRead.recv(64) #stop() was called, loop condition exits
+          elif key.fileobj is self.s:
+            conn, addr = self.s.accept()
+            conn.setblocking(True)
+            self.printSignal.emit(f"Connected by {addr}")
+            reader = BciMessageReader(conn)
+            #one BCI2000 connection at a time
+            sel.unregister(self.s)
+            sel.register(conn, selectors.EVENT_READ)
+          else:
+            try:
+              self.handleMessage(reader.receive(), arrival)
+              while reader.buffered() and self._isRunning:
+                self.handleMessage(reader.receive(), arrival)
+            except EOFError:
+              sel.unregister(conn)
+              conn.close()
+              conn = None
+              self.releaseSegments()
+              self.disconnected.emit()
+              sel.register(self.s, selectors.EVENT_READ)
+              self.printSignal.emit("Waiting for BCI2000 at %s:%s" %(address[0], address[1]))
+    except Exception:
+      traceback.print_exc()
+    finally:
+      if conn is not None:
+        conn.close()
+      sel.close()
+      print('stopping acq thread')
+
+  def acquire(self):
+    """original polling loop, kept for comparison with acquireEvents"""
     while self._isRunning:
-      self.memInfo = {}
       #listen for connection on specified port
       try:
         address = self.s.getsockname()
@@ -180,47 +326,23 @@ class BCI2000DataThread(AbstractDataThread):
         self.waitForRead(self.s)
         conn, addr = self.s.accept()
         self.printSignal.emit(f"Connected by {addr}")
-        stream = conn.makefile('rb')
+        reader = BciMessageReader(conn)
         while self._isRunning: #go until we receive an EOFError exception
-          QThread.usleep(1) #use sleep to not get stuck waiting for read
-          self.waitForRead(conn)
-          msg = receiveBciMessage(stream)
-          
-          if msg.kind == 'SignalProperties' and msg.sourceID == 'Signal':
-            print("SIGNAL PROPERTIES")
-            self.propertiesSignal.emit(msg.elements, msg.chNames)
-
-          elif msg.kind == 'SignalProperties' and msg.sourceID == 'States':
-            pass
-          
-          elif msg.kind == 'Signal' and msg.sourceID == 'Signal':
-            self.dataSignal.emit(self.receiveSignal(msg))
-
-          elif msg.kind == 'Parameter':
-            self.parameterSignal.emit(msg.param)
-            continue
-
-          elif msg.kind == 'Signal' and msg.sourceID == 'States':
-            #round incoming signal to nearest int
-            self.stateSignal.emit(np.rint(self.receiveSignal(msg)).astype(np.int64))
-            pass
-
-          elif msg.kind == 'SysCommand' and msg.command == 'EndOfData':
-            continue
-
-          elif msg.kind == 'SysCommand' and msg.command == 'EndOfTransmission':
-            print('end of transmission')
-            continue
-
-          else:
-            raise RuntimeError('Unexpected BCI2000 message')
+          if not reader.buffered():
+            #only wait on the socket once every buffered message is parsed
+            QThread.usleep(1) #use sleep to not get stuck waiting for read
+            self.waitForRead(conn)
+            arrival = time.perf_counter()
+          self.handleMessage(reader.receive(), arrival)
+        conn.close() #stopped
 
       except EOFError:
+        conn.close()
+        self.releaseSegments()
         self.disconnected.emit()
         QThread.sleep(1) #wait for update if we are disconnected from BCI2000
         if not self._isRunning:
           print('stopping acq thread')
-          conn.close()
           self.s.close()
           return
         continue
@@ -249,6 +371,9 @@ def readLine(stream, terminator = b'\n'):
     c = stream.read(1)
   return str(b''.join(chars), 'utf-8')
 
+#BCI2000 signal types, in the order of their wire codes
+SignalTypes = ('int16', 'float24', 'float32', 'int32')
+
 class BciDescSupp(Enum):
   """BCI2000 descriptor and supplement for relevant messages"""
   Parameter = b'\x02\x00'
@@ -280,7 +405,7 @@ def writeBciLengthField(stream, fieldSize, value):
   else:
     b = n.to_bytes(fieldSize, 'little')
     stream.write(b)
-    b = value.to_string()
+    b = bytes(str(value), 'utf-8')
     stream.write(b)
     stream.write(b'\x00')
 
@@ -368,7 +493,10 @@ def parseBciSignalData(stream):
   signal.channels = readBciLengthField(stream, 2)
   signal.elements = readBciLengthField(stream, 2)
   signal.shm = readLine(stream, b'\x00')
+  return decodeBciSignalType(signal)
 
+def decodeBciSignalType(signal):
+  """check that signal data lives in shared memory and name its type"""
   if signal.channels != 0 and signal.elements != 0:
     if signal.type & 64 == 0:
       raise RuntimeError('Signal data not located in shared memory')
@@ -392,7 +520,7 @@ def parseBciParameter(stream):
   """parse a raw parameter message into an object"""
   param = Object()
   param.kind = 'Parameter'
-  param.param = ParseParam(stream) #uses BCI2kReader function
+  param.param = ParseParamBytes(stream.read()) #uses BCI2kReader function
   #param = Object()
 
   return param
@@ -419,6 +547,168 @@ def receiveBciMessage(stream):
   else:
     raise RuntimeError('Unexpected BCI2000 message type')
 
+###___BUFFERED PARSER___###
+def _readField(data, pos, terminator):
+  """read a string from a bytes object up to terminator, return it and the position after it"""
+  end = data.find(terminator, pos)
+  if end < 0:
+    end = len(data)
+  return str(data[pos:end], 'utf-8'), end + 1
+
+def _readSourceIdentifier(data, pos):
+  """read a BCI2000 source identifier from a bytes object"""
+  if data[pos] != 0xff:
+    return str(data[pos]), pos + 1
+  return _readField(data, pos + 1, b'\x00')
+
+def _readLengthField(data, pos, fieldSize):
+  """read a little-endian length field from a bytes object"""
+  n = int.from_bytes(data[pos:pos + fieldSize], 'little')
+  pos += fieldSize
+  if n == (1 << (fieldSize * 8)) - 1:
+    s, pos = _readField(data, pos, b'\x00')
+    n = int(s)
+  return n, pos
+
+def _parseIndexList(tokens):
+  """same as readBciIndexList, on an iterator of space separated tokens"""
+  s = next(tokens, '')
+  if s == '{':
+    v = []
+    s = next(tokens, '}')
+    while s != '}':
+      v.append(s.replace('%20', ' '))
+      s = next(tokens, '}')
+    return v
+  return range(1, int(s)+1)
+
+def _parsePhysicalUnit(tokens):
+  """same as readBciPhysicalUnit, on an iterator of space separated tokens"""
+  pu = Object()
+  pu.offset = float(next(tokens))
+  pu.gain = float(next(tokens))
+  pu.unit = next(tokens, '')
+  pu.rawMin = float(next(tokens))
+  pu.rawMax = float(next(tokens))
+  return pu
+
+def parseBciSignalPropertiesBytes(data):
+  """parse a signal properties payload held in a bytes object"""
+  sp = Object()
+  sp.kind = 'SignalProperties'
+  sp.sourceID, pos = _readSourceIdentifier(data, 0)
+  tokens = (str(t, 'utf-8') for t in data[pos:].split(b' '))
+  sp.name = next(tokens, '')
+  sp.chNames = _parseIndexList(tokens)
+  sp.elements = len(_parseIndexList(tokens))
+  sp.type = next(tokens, '')
+  sp.channelUnit = _parsePhysicalUnit(tokens)
+  sp.elementUnit = _parsePhysicalUnit(tokens)
+  return sp
+
+def parseBciSignalDataBytes(data):
+  """parse a signal data payload held in a bytes object"""
+  signal = Object()
+  signal.kind = 'Signal'
+  signal.sourceID, pos = _readSourceIdentifier(data, 0)
+  signal.type = data[pos]
+  signal.channels, pos = _readLengthField(data, pos + 1, 2)
+  signal.elements, pos = _readLengthField(data, pos, 2)
+  signal.shm, pos = _readField(data, pos, b'\x00')
+  return decodeBciSignalType(signal)
+
+def parseBciSysCommandBytes(data):
+  """parse a syscommand payload held in a bytes object"""
+  syscmd = Object()
+  syscmd.kind = 'SysCommand'
+  syscmd.command, _ = _readField(data, 0, b'\x00')
+  return syscmd
+
+SignalDataDescSupp = BciDescSupp.SignalData.value
+
+def parseBciMessage(descsupp, data):
+  """parse a framed BCI2000 payload into an object"""
+  data = bytes(data)
+  if descsupp == BciDescSupp.SignalData.value:
+    return parseBciSignalDataBytes(data)
+  elif descsupp == BciDescSupp.SignalProperties.value:
+    return parseBciSignalPropertiesBytes(data)
+  elif descsupp == BciDescSupp.Parameter.value:
+    return parseBciParameter(io.BytesIO(data))
+  elif descsupp == BciDescSupp.SysCommand.value:
+    return parseBciSysCommandBytes(data)
+  else:
+    raise RuntimeError('Unexpected BCI2000 message type')
+
+class BciMessageReader():
+  """
+  Buffered replacement for receiveBciMessage on a socket.
+  Bytes are received into one reusable buffer and messages are framed
+  with memoryview slices, so there is no per-byte read call.
+  """
+  def __init__(self, conn, bufferSize=1 << 16):
+    self.conn = conn
+    self.buf = bytearray(bufferSize)
+    self.view = memoryview(self.buf)
+    self.start = 0 #first byte not yet parsed
+    self.end = 0   #end of received bytes
+    #signal data payloads repeat every block (same source, shape and segment), parse each once
+    self.signalHeaders = {}
+
+  def buffered(self):
+    """number of received bytes that have not been parsed yet"""
+    return self.end - self.start
+
+  def _fill(self, n):
+    """block until at least n unparsed bytes are in the buffer"""
+    while self.end - self.start < n:
+      if self.start + n > len(self.buf):
+        #move pending bytes to the front, grow if the message does not fit
+        pending = self.buf[self.start:self.end]
+        if n > len(self.buf):
+          self.view.release()
+          self.buf = bytearray(max(n, 2 * len(self.buf)))
+          self.view = memoryview(self.buf)
+        self.buf[:len(pending)] = pending
+        self.start = 0
+        self.end = len(pending)
+      count = self.conn.recv_into(self.view[self.end:])
+      if count == 0:
+        raise EOFError()
+      self.end += count
+
+  def receive(self):
+    """read and parse a single BCI2000 message"""
+    self._fill(4) #descriptor, supplement and 2 byte length field
+    s = self.start
+    descsupp = bytes(self.view[s:s + 2])
+    length = self.buf[s + 2] | (self.buf[s + 3] << 8)
+    header = 4
+    if length == 0xffff:
+      #length did not fit the field, it follows as a string
+      term = self.buf.find(b'\x00', s + 4, self.end)
+      while term < 0:
+        self._fill(self.end - self.start + 1)
+        s = self.start
+        term = self.buf.find(b'\x00', s + 4, self.end)
+      length = int(self.buf[s + 4:term])
+      header = term + 1 - s
+    self._fill(header + length)
+    s = self.start
+    if descsupp == SignalDataDescSupp:
+      payload = bytes(self.view[s + header:s + header + length])
+      msg = self.signalHeaders.get(payload)
+      if msg is None:
+        msg = parseBciSignalDataBytes(payload)
+        if len(self.signalHeaders) < 64:
+          self.signalHeaders[payload] = msg
+    else:
+      msg = parseBciMessage(descsupp, self.view[s + header:s + header + length])
+    self.start = s + header + length
+    if self.start == self.end:
+      self.start = self.end = 0
+    return msg
+
 def writeBciMessage(stream, descSupp, payload):
   """write a signal BCI2000 message to a stream"""
   stream.write(descSupp)
@@ -441,11 +731,32 @@ def writeBciSignalMessage(stream, data):
   stream2.write(b'\xff' + bytes('Signal', 'utf-8') + b'\x00' + b'\x02')
   writeBciLengthField(stream2, 2, data.shape[0])
   writeBciLengthField(stream2, 2, data.shape[1])
-  for ch in range(0, data.shape[0]):
-    for el in range(0, data.shape[1]):
-      stream2.write(struct.pack('<f', data[ch, el]))
+  #channel by channel float32 samples, serialized in one go
+  stream2.write(np.ascontiguousarray(data, dtype='<f4').data)
   writeBciMessage(stream, BciDescSupp.SignalData.value, stream2.getvalue())
   stream2.close()
+
+def writeBciSharedSignalMessage(stream, sourceID, shmName, channels, elements, sigType='float32'):
+  """write a signal message whose samples are located in shared memory"""
+  stream2 = io.BytesIO()
+  sigCode = SignalTypes.index(sigType) | 64 #shared memory flag
+  stream2.write(b'\xff' + bytes(sourceID, 'utf-8') + b'\x00' + bytes([sigCode]))
+  writeBciLengthField(stream2, 2, channels)
+  writeBciLengthField(stream2, 2, elements)
+  if platform.system() == 'Windows':
+    shmName = '/' + shmName #parseBciSignalData strips the leading path
+  stream2.write(bytes(shmName, 'utf-8') + b'\x00')
+  writeBciMessage(stream, BciDescSupp.SignalData.value, stream2.getvalue())
+
+def writeBciSignalPropertiesMessage(stream, sourceID, name, chNames, elements, sigType='float32'):
+  """write a signal properties message, units are left at their defaults"""
+  labels = ' '.join(ch.replace(' ', '%20') for ch in chNames)
+  props = f'{name} {{ {labels} }} {elements} {sigType} 0 1 muV -100 100 0 1 s 0 1'
+  writeBciMessage(stream, BciDescSupp.SignalProperties.value, b'\xff' + bytes(sourceID, 'utf-8') + b'\x00' + bytes(props, 'utf-8'))
+
+def writeBciParameterMessage(stream, paramLine):
+  """write a single BCI2000 parameter line to a stream"""
+  writeBciMessage(stream, BciDescSupp.Parameter.value, bytes(paramLine, 'utf-8') + b'\r\n')
     
 
 
@@ -0,0 +1,219 @@
+import multiprocessing
+import socket
+import threading
+import time
+import traceback
+from multiprocessing import shared_memory
+from PyQt5.QtCore import Qt
+
+from dataThreads.AbstractClasses import *
+from dataThreads.BCI2000 import BCI2000DataThread, BCI2000Worker
+from dataThreads.streamBase.LatencyHistogram import LatencyHistogram
+from dataThreads.streamBase.SharedRing import SharedRing
+from dataThreads.streamBase.SnapshotPool import SnapshotPool
+#
+# BCI2000 signal sharing read in a separate process, so rendering in the GUI process
+# cannot hold up the socket. The child runs BCI2000DataThread as is and writes blocks into a
+# shared memory ring; only parameters, states and block sequence numbers go through a pipe.
+# Filters see the same AbstractDataThread signals as with the BCI2000 stream.
+#
+class BCI2000Process(AbstractCommunication):
+  sharePerFilter = True #Share<Filter> parameters
+
+  def __init__(self, bciPath, file, sharedStates):
+    self._acqThr = ProcessDataThread()
+    self._worker = BCI2000Worker(bciPath, file, sharedStates)
+
+  @property
+  def worker(self):
+    return self._worker
+  @property
+  def acqThr(self):
+    return self._acqThr
+
+  def evaluate(self, state):
+    return int(self.worker.bci.GetStateVariable(state).value)
+
+class ProcessDataThread(AbstractDataThread):
+  slots = 32 #blocks the ring holds, the GUI process may fall this far behind
+  def __init__(self):
+    super().__init__()
+    self._isRunning = True
+    self.pool = SnapshotPool()
+    self.ring = None
+    self.ringNames = [] #every ring the child announced, unlinked here if it dies without closing them
+    self.process = None
+    self.overruns = 0 #blocks overwritten in the ring before they were read
+    self.latency = LatencyHistogram() #written by the child -> emitted here
+    self.childStats = {}
+    self.lastWritten = 0.0 #when the child wrote the block being emitted, perf_counter
+  def releaseBlock(self, data):
+    self.pool.release(data)
+  def retainBlock(self, data, count):
+    self.pool.retain(data, count)
+  def stats(self):
+    stats = dict(self.childStats)
+    stats['Ring overruns'] = self.overruns
+    stats['Ring to emit p95 (ms)'] = self.latency.percentile(95) * 1e3
+    return stats
+  def stop(self):
+    self._isRunning = False
+
+  def initalize(self, address):
+    #bound here so errors show up as with BCI2000DataThread, the child inherits the socket
+    self.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+      self.s.bind((address[0], int(address[1])))
+    except OSError:
+      self.s.close()
+      raise
+    self.s.listen(1)
+    self.s.settimeout(0.1)
+
+  def run(self):
+    #spawn, forking a process with Qt in it is not safe
+    ctx = multiprocessing.get_context('spawn')
+    receiver, sender = ctx.Pipe(duplex=False)
+    stopEvent = ctx.Event()
+    self.process = ctx.Process(target=acquisitionProcess, name="BCI2000 acquisition", daemon=True,
+                               args=(self.s, sender, stopEvent, self.slots))
+    self.process.start()
+    sender.close()
+    self.s.close()
+    try:
+      while self._isRunning:
+        if not receiver.poll(0.1):
+          if not self.process.is_alive():
+            self.printSignal.emit("Acquisition process exited")
+            break
+          continue
+        self.handleMessage(receiver.recv())
+    except EOFError:
+      self.printSignal.emit("Acquisition process exited")
+    except Exception:
+      traceback.print_exc()
+    finally:
+      stopEvent.set()
+      self.process.join(2)
+      if self.process.is_alive():
+        self.process.terminate()
+        self.process.join()
+      receiver.close()
+      self.closeRing()
+      for name in self.ringNames:
+        unlinkRing(name)
+      print('stopping acq process')
+
+  def handleMessage(self, msg):
+    kind = msg[0]
+    if kind == 'block':
+      _, seq, written, arrival = msg
+      buf = self.pool.acquire()
+      if self.ring.read(seq, buf):
+        self.lastWritten = written
+        self.emitBlock(buf, arrival or written) #arrival is the child's socket, perf_counter is system wide
+        self.latency.record(time.perf_counter() - written)
+      else:
+        self.overruns += 1
+        self.pool.release(buf)
+    elif kind == 'states':
+      self.stateSignal.emit(msg[1])
+    elif kind == 'parameter':
+      self.parameterSignal.emit(msg[1])
+    elif kind == 'properties':
+      _, elements, chNames, ring = msg
+      self.closeRing()
+      self.ring = SharedRing.attach(*ring)
+      self.ringNames.append(ring[0])
+      self.pool.configure(self.ring.shape, self.ring.dtype)
+      self.propertiesSignal.emit(elements, chNames)
+    elif kind == 'print':
+      self.printSignal.emit(msg[1])
+    elif kind == 'disconnected':
+      self.disconnected.emit()
+    elif kind == 'stats':
+      self.childStats = msg[1]
+
+  def closeRing(self):
+    if self.ring is not None:
+      self.ring.close()
+      self.ring = None
+
+def unlinkRing(name):
+  try:
+    memory = shared_memory.SharedMemory(name)
+  except FileNotFoundError:
+    return #closed by the child
+  memory.close()
+  memory.unlink()
+
+###____________________###
+###___CHILD PROCESS____###
+###____________________###
+class RingWriter():
+  """forwards the signals of the child's BCI2000DataThread to the GUI process"""
+  statsEvery = 50 #blocks between stats messages
+
+  def __init__(self, acq, pipe, slots):
+    self.acq = acq
+    self.pipe = pipe
+    self.slots = slots
+    self.ring = None
+    self.previous = None #kept one generation, the GUI process may still be attaching to it
+    self.blocks = 0
+
+  def properties(self, elements, chNames):
+    shape = (len(chNames), elements)
+    if self.ring is None or self.ring.shape != shape or self.ring.dtype != self.acq.pool.dtype:
+      if self.previous is not None:
+        self.previous.close()
+      self.previous = self.ring
+      self.ring = SharedRing.create(shape, self.acq.pool.dtype, self.slots)
+    self.pipe.send(('properties', elements, chNames, self.ring.describe()))
+
+  def data(self, block):
+    seq = self.ring.write(block)
+    arrival = self.acq.timing.arrival(block)
+    self.acq.releaseBlock(block)
+    self.pipe.send(('block', seq, time.perf_counter(), arrival))
+    self.blocks += 1
+    if self.blocks % self.statsEvery == 0:
+      self.pipe.send(('stats', self.acq.stats()))
+
+  def states(self, states):
+    self.pipe.send(('states', states))
+
+  def parameter(self, p):
+    self.pipe.send(('parameter', p))
+
+  def log(self, msg):
+    self.pipe.send(('print', msg))
+
+  def disconnected(self):
+    self.pipe.send(('disconnected',))
+
+  def close(self):
+    for ring in [self.previous, self.ring]:
+      if ring is not None:
+        ring.close()
+
+def acquisitionProcess(sock, pipe, stopEvent, slots):
+  """entry point of the acquisition process"""
+  acq = BCI2000DataThread()
+  acq.s = sock
+  writer = RingWriter(acq, pipe, slots)
+  #no event loop here, every signal is handled as it is emitted
+  acq.propertiesSignal.connect(writer.properties, Qt.DirectConnection)
+  acq.dataSignal.connect(writer.data, Qt.DirectConnection)
+  acq.stateSignal.connect(writer.states, Qt.DirectConnection)
+  acq.parameterSignal.connect(writer.parameter, Qt.DirectConnection)
+  acq.printSignal.connect(writer.log, Qt.DirectConnection)
+  acq.disconnected.connect(writer.disconnected, Qt.DirectConnection)
+  threading.Thread(target=lambda: (stopEvent.wait(), acq.stop()), daemon=True).start()
+  try:
+    acq.run()
+  except (BrokenPipeError, EOFError):
+    pass #GUI process went away
+  finally:
+    writer.close()
+    pipe.close()
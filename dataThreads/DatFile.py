@@ -0,0 +1,209 @@
+import os
+import time
+import traceback
+import numpy as np
+import pyqtgraph as pg
+
+from base.BCI2kReaderMod import ParseParamBytes
+from dataThreads.AbstractClasses import *
+from dataThreads.streamBase.Playback import PlaybackDataThread, PlaybackWorker, choosePlayback
+from dataThreads.streamBase.SnapshotPool import SnapshotPool
+#
+# Plays a BCI2000 .dat file back as if it came from a live session.
+# Samples and states are memory-mapped, only the blocks being played are read from disk
+#
+class DatFile(AbstractCommunication):
+  def __init__(self, bciPath, file, sharedStates):
+    path, speed = choosePlayback("DatFile", "Choose BCI2000 data file", "BCI2000 data (*.dat)")
+    settings = pg.QtCore.QSettings("BCI2000", "DatFile")
+    start = float(settings.value("start", 0.0)) if path != "" else 0.0
+    if path != "" and interactive():
+      start, ok = pg.QtWidgets.QInputDialog.getDouble(None, "Choose BCI2000 data file", "Start at (s)", start, 0.0, 1e7, 1)
+      start = start if ok else 0.0
+      settings.setValue("start", start)
+    self._acqThr = DatFileDataThread(path, sharedStates, speed, start)
+    self._worker = PlaybackWorker()
+
+  @property
+  def worker(self):
+    return self._worker
+  @property
+  def acqThr(self):
+    return self._acqThr
+
+  def evaluate(self, state):
+    return self.acqThr.stateValue(state)
+
+#sample formats of the DataFormat header field
+DataFormats = {'int16': '<i2', 'int32': '<i4', 'float32': '<f4'}
+
+class DatFileHeader():
+  """fields, state vector layout and parameters of a .dat file header"""
+  def __init__(self, path):
+    with open(path, 'rb') as f:
+      first = f.readline()
+      fields = first.decode('utf-8').split()
+      values = {fields[i].rstrip('='): fields[i + 1] for i in range(0, len(fields) - 1, 2)}
+      self.headerLen = int(values['HeaderLen'])
+      self.channels = int(values['SourceCh'])
+      self.statevectorLen = int(values['StatevectorLen'])
+      self.dataFormat = values.get('DataFormat', 'int16')
+      if self.dataFormat not in DataFormats:
+        raise ValueError(f"Unsupported DataFormat {self.dataFormat}")
+      rest = f.read(self.headerLen - len(first))
+
+    self.states = {} #name -> (length, byte location, bit location)
+    self.parameters = [] #parsed records, in file order
+    section = None
+    for line in rest.split(b'\n'):
+      line = line.rstrip(b'\r\x00 ')
+      if line == b'':
+        continue
+      if line.startswith(b'['):
+        section = line.strip(b'[] ').decode('utf-8')
+      elif section == 'State Vector Definition':
+        name, length, value, byteLoc, bitLoc = line.decode('utf-8').split()[:5]
+        self.states[name] = (int(length), int(byteLoc), int(bitLoc))
+      elif section == 'Parameter Definition':
+        self.parameters.append(ParseParamBytes(line))
+
+  def parameter(self, name, key='scaled', default=None):
+    for p in self.parameters:
+      if p['name'] == name:
+        return p[key]
+    return default
+
+class DatFileDataThread(PlaybackDataThread):
+  def __init__(self, path, sharedStates, speed=1.0, start=0.0):
+    super().__init__(speed)
+    self.path = path
+    self.sharedStates = list(sharedStates or [])
+    self.stateFields = None
+    self.start = start
+    self.seekTo = None #seconds, set from other threads
+    self.position = start #seconds played
+    self.duration = 0.0 #seconds in the file, once opened
+    self.lastStates = None
+    self.pool = SnapshotPool()
+
+  def releaseBlock(self, data):
+    self.pool.release(data)
+
+  def retainBlock(self, data, count):
+    self.pool.retain(data, count)
+
+  def seek(self, seconds):
+    """continue playback from this time in the recording"""
+    self.seekTo = max(seconds, 0.0)
+    self.wake.set()
+
+  def addStates(self, states):
+    """also decode these states, appended so rows already emitted keep their place"""
+    names = self.sharedStates + [s for s in states if s not in self.sharedStates]
+    if self.stateFields is not None:
+      self.stateFields = self.stateFields + [self.header.states.get(s) for s in names[len(self.stateFields):]]
+    self.sharedStates = names
+
+  def stateValue(self, state):
+    """last value of a shared state, 0 if unknown"""
+    if self.lastStates is None or state not in self.sharedStates:
+      return 0
+    return int(self.lastStates[self.sharedStates.index(state)][-1])
+
+  def open(self):
+    """parse the header and map the samples, returns the header"""
+    header = self.header = DatFileHeader(self.path)
+    record = np.dtype([('signal', DataFormats[header.dataFormat], (header.channels,)),
+                       ('states', np.uint8, (header.statevectorLen,))])
+    samples = (os.path.getsize(self.path) - header.headerLen) // record.itemsize
+    self.samples = np.memmap(self.path, dtype=record, mode='r', offset=header.headerLen, shape=(samples,))
+    #calibration to muV, as BCI2000 shares the signal
+    self.offset = np.zeros((header.channels, 1))
+    self.gain = np.ones((header.channels, 1))
+    for name, target in [('SourceChOffset', self.offset), ('SourceChGain', self.gain)]:
+      values = header.parameter(name)
+      if values is not None and len(values) == header.channels:
+        target[:, 0] = np.array(values, dtype=float)
+    #bit fields of the shared states, states missing from the file read as 0
+    self.stateFields = [header.states.get(s) for s in self.sharedStates]
+    return header
+
+  def readStates(self, vectors):
+    """shared state values of a block of state vectors, (states, samples) int64"""
+    fields = self.stateFields #addStates may extend it meanwhile
+    out = np.zeros((len(fields), vectors.shape[0]), dtype=np.int64)
+    for i, field in enumerate(fields):
+      if field is None:
+        continue
+      length, byteLoc, bitLoc = field
+      nBytes = (bitLoc + length + 7) // 8
+      value = np.zeros(vectors.shape[0], dtype=np.uint64)
+      for k in range(nBytes):
+        value |= vectors[:, byteLoc + k].astype(np.uint64) << np.uint64(8 * k)
+      out[i] = (value >> np.uint64(bitLoc)) & np.uint64((1 << length) - 1)
+    return out
+
+  def readSignal(self, raw):
+    """calibrated (channels, samples) block from (samples, channels) raw values"""
+    buf = self.pool.acquire()
+    np.subtract(raw.T, self.offset, out=buf)
+    buf *= self.gain
+    return buf
+
+  def run(self):
+    if self.path == "":
+      self.printSignal.emit("No BCI2000 data file chosen")
+      self.ended.emit()
+      return
+    try:
+      header = self.open()
+    except Exception:
+      traceback.print_exc()
+      self.printSignal.emit(f"Could not read {self.path}")
+      self.ended.emit()
+      return
+    elements = int(header.parameter('SampleBlockSize', 'val', 1))
+    sr = float(header.parameter('SamplingRate', default=256))
+    chNames = header.parameter('ChannelNames', 'val', [])
+    if len(chNames) != header.channels:
+      chNames = [str(c + 1) for c in range(header.channels)]
+    blocks = self.samples.shape[0] // elements
+    self.duration = blocks * elements / sr
+    self.printSignal.emit(f"Playing {self.path}: {header.channels} channels, {blocks * elements / sr:.1f} s")
+
+    #configuration first, as BCI2000 sends it at SetConfig
+    for p in header.parameters:
+      self.parameterSignal.emit(p)
+    self.pool.configure((header.channels, elements), np.double)
+    self.propertiesSignal.emit(elements, chNames)
+
+    b = int(self.start * sr) // elements
+    played = 0
+    wallStart = time.perf_counter()
+    self.restartClock(b * elements / sr)
+    try:
+      while b < blocks:
+        if self.seekTo is not None:
+          b = min(int(self.seekTo * sr) // elements, blocks - 1)
+          self.seekTo = None
+          self.wake.clear()
+          self.restartClock(b * elements / sr)
+        if not self.waitUntil(b * elements / sr):
+          return
+        if self.seekTo is not None:
+          continue
+        block = self.samples[b * elements:(b + 1) * elements]
+        self.lastStates = self.readStates(block['states'])
+        self.stateSignal.emit(self.lastStates)
+        due = self.dueTime(b * elements / sr)
+        self.emitBlock(self.readSignal(block['signal']), due)
+        b += 1
+        played += 1
+        self.position = b * elements / sr
+    except Exception:
+      traceback.print_exc()
+    finally:
+      elapsed = time.perf_counter() - wallStart
+      self.printSignal.emit(f"Played {played} blocks in {elapsed:.2f} s ({played / max(elapsed, 1e-9):.0f} blocks/s)")
+      self.samples = None
+      self.ended.emit()
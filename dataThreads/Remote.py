@@ -0,0 +1,217 @@
+import socket
+import threading
+import time
+import traceback
+import pyqtgraph as pg
+
+from dataThreads.AbstractClasses import *
+from dataThreads.streamBase.LatencyHistogram import LatencyHistogram
+from dataThreads.streamBase.RelayProtocol import (ClockSync, FrameReader, Kind, STAMP, availableCodecs, blockHeader,
+                                                  decodeBlock, decodeJson, decodeParameter, encodeJson, frame)
+from dataThreads.streamBase.SnapshotPool import SnapshotPool
+#
+# BCI2000 on another machine, through tools/Relay.py running next to it.
+# The relay takes care of the operator and shared memory, blocks arrive over TCP,
+# optionally as float32 and compressed
+#
+class Remote(AbstractCommunication):
+  sharePerFilter = True #the relay sets up a share point per filter
+
+  def __init__(self, bciPath, file, sharedStates):
+    relay, float32, codec = chooseRelay()
+    self._acqThr = RemoteDataThread(file, sharedStates, float32, codec)
+    self._worker = RemoteWorker(relay)
+
+  @property
+  def worker(self):
+    return self._worker
+  @property
+  def acqThr(self):
+    return self._acqThr
+
+  def evaluate(self, state):
+    return self.acqThr.stateValue(state)
+
+#compression choices offered to the user: codec, float32
+Compression = {'None': ('none', False), 'zlib': ('zlib', False), 'zlib, float32': ('zlib', True),
+               'lz4': ('lz4', False), 'lz4, float32': ('lz4', True)}
+
+def chooseRelay():
+  """ask for the relay address and compression, remembering the last choice. Returns address, float32, codec"""
+  title = "Remote BCI2000"
+  settings = pg.QtCore.QSettings("BCI2000", "Remote")
+  names = [n for n, (codec, f) in Compression.items() if codec in availableCodecs()]
+  last = settings.value("compression", "zlib")
+  if not interactive():
+    codec, float32 = Compression[last if last in names else names[0]]
+    return settings.value("relay", "localhost:1900"), float32, codec
+  relay, ok = pg.QtWidgets.QInputDialog.getText(None, title, "Relay address (host:port)", text=settings.value("relay", "localhost:1900"))
+  if not ok or relay == "":
+    relay = settings.value("relay", "localhost:1900")
+  name, ok = pg.QtWidgets.QInputDialog.getItem(None, title, "Compression", names, names.index(last) if last in names else 0, False)
+  if not ok:
+    name = last if last in names else names[0]
+  settings.setValue("relay", relay)
+  settings.setValue("compression", name)
+  codec, float32 = Compression[name]
+  return relay, float32, codec
+
+#starts the data thread with the relay address, the relay talks to the operator
+class RemoteWorker(AbstractWorker):
+  def __init__(self, relay):
+    super().__init__()
+    self.relay = relay
+  def run(self):
+    self.initSignal.emit(self.relay)
+  def stop(self):
+    pass
+
+class RemoteDataThread(AbstractDataThread):
+  pingEvery = 2.0 #seconds between clock synchronizations
+  reportEvery = 10.0 #seconds between throughput messages in the log
+  retryEvery = 1.0 #seconds between attempts to reach the relay
+
+  def __init__(self, className, sharedStates, float32=False, codec='zlib'):
+    super().__init__()
+    self.className = className
+    self.sharedStates = list(sharedStates or [])
+    self.float32 = float32
+    self.codec = codec
+    self.address = None
+    self._isRunning = True
+    self.wake = threading.Event() #interrupts waiting on stop()
+    self.conn = None
+    self.reader = None #frames of the current connection
+    self.sendLock = threading.Lock() #pings and hello
+    self.pool = SnapshotPool()
+    self.clock = ClockSync()
+    self.lag = LatencyHistogram() #block arrived at the relay -> emitted here
+    self.lastStates = None
+    #throughput, over the last report interval
+    self.wireBytes = 0
+    self.rawBytes = 0
+    self.rates = {'Relay bytes/s': 0.0, 'Decoded bytes/s': 0.0}
+
+  def releaseBlock(self, data):
+    self.pool.release(data)
+  def retainBlock(self, data, count):
+    self.pool.retain(data, count)
+  def stats(self):
+    stats = dict(self.rates)
+    stats['Lag p95 (ms)'] = self.lag.percentile(95) * 1e3
+    stats['Clock round trip (ms)'] = self.clock.roundTrip * 1e3
+    return stats
+
+  def stop(self):
+    self._isRunning = False
+    self.wake.set()
+    conn = self.conn
+    if conn is not None:
+      try:
+        conn.shutdown(socket.SHUT_RDWR) #wakes the blocking receive
+      except OSError:
+        pass
+
+  def initalize(self, address):
+    self.address = (address[0], int(address[1]))
+
+  def stateValue(self, state):
+    """last value of a shared state, 0 if unknown"""
+    if self.lastStates is None or state not in self.sharedStates:
+      return 0
+    return int(self.lastStates[self.sharedStates.index(state)][-1])
+
+  def connect(self):
+    """connect to the relay, retrying until it answers. None if stopped meanwhile"""
+    self.printSignal.emit("Waiting for relay at %s:%s" %self.address)
+    while self._isRunning:
+      try:
+        conn = socket.create_connection(self.address, timeout=self.retryEvery)
+      except OSError:
+        self.wake.wait(self.retryEvery)
+        continue
+      conn.settimeout(None)
+      conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+      return conn
+    return None
+
+  def send(self, data):
+    with self.sendLock:
+      self.conn.sendall(data)
+
+  def pinger(self, conn):
+    """sync clocks with the relay now and then, so lag can be measured across machines"""
+    while self._isRunning and self.conn is conn:
+      try:
+        self.send(frame(Kind.Ping, time.perf_counter()))
+      except OSError:
+        return
+      self.wake.wait(self.pingEvery)
+
+  def run(self):
+    while self._isRunning:
+      self.conn = self.connect()
+      if self.conn is None:
+        return
+      self.printSignal.emit(f"Connected to relay at {self.address[0]}:{self.address[1]}")
+      try:
+        self.send(encodeJson(Kind.Hello, time.perf_counter(), {'filter': self.className, 'states': self.sharedStates,
+                                                                'float32': self.float32, 'codec': self.codec}))
+        threading.Thread(target=self.pinger, args=(self.conn,), daemon=True).start()
+        self.reader = FrameReader(self.conn)
+        self.receive(self.reader)
+      except (EOFError, OSError):
+        if self._isRunning:
+          self.printSignal.emit("Lost the relay")
+          self.disconnected.emit()
+      except Exception:
+        traceback.print_exc()
+        return
+      finally:
+        conn, self.conn = self.conn, None
+        conn.close()
+    print('stopping acq thread')
+
+  def receive(self, reader):
+    lastReport = time.perf_counter()
+    lastReceived = 0
+    while self._isRunning:
+      kind, codec, stamp, payload = reader.receive()
+      if kind == Kind.Signal:
+        dtype, shape = blockHeader(payload)
+        if self.pool.shape != shape or self.pool.dtype != dtype:
+          self.pool.configure(shape, dtype)
+        data = decodeBlock(codec, payload, self.pool.acquire())
+        self.rawBytes += data.nbytes
+        synced = self.clock.roundTrip < float('inf')
+        #timed from the block's arrival at the relay once clocks are in sync
+        self.emitBlock(data, self.clock.local(stamp) if synced else time.perf_counter())
+        if synced:
+          self.lag.record(time.perf_counter() - self.clock.local(stamp))
+      elif kind == Kind.States:
+        self.lastStates = decodeBlock(codec, payload)
+        self.rawBytes += self.lastStates.nbytes
+        self.stateSignal.emit(self.lastStates)
+      elif kind == Kind.Parameter:
+        self.parameterSignal.emit(decodeParameter(payload))
+      elif kind == Kind.Properties:
+        props = decodeJson(payload)
+        self.propertiesSignal.emit(props['elements'], props['chNames'])
+      elif kind == Kind.Pong:
+        self.clock.pong(STAMP.unpack(payload)[0], stamp)
+      elif kind == Kind.Print:
+        self.printSignal.emit("Relay: " + decodeJson(payload))
+      elif kind == Kind.Disconnected:
+        self.disconnected.emit()
+
+      now = time.perf_counter()
+      if now - lastReport > self.reportEvery:
+        self.report(reader.received - lastReceived, now - lastReport)
+        lastReceived = reader.received
+        lastReport = now
+
+  def report(self, received, seconds):
+    self.rates = {'Relay bytes/s': received / seconds, 'Decoded bytes/s': self.rawBytes / seconds}
+    self.printSignal.emit(f"Relay: {received / seconds / 1e3:.1f} kB/s received, {self.rawBytes / seconds / 1e3:.1f} kB/s decoded "
+                          f"({self.rawBytes / max(received, 1):.1f}x), lag p95 {self.lag.percentile(95) * 1e3:.1f} ms")
+    self.rawBytes = 0
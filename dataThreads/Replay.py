@@ -0,0 +1,69 @@
+import time
+import traceback
+
+from dataThreads.AbstractClasses import *
+from dataThreads.streamBase.Playback import PlaybackDataThread, PlaybackWorker, choosePlayback
+from dataThreads.streamBase.Recorder import Record, readRecording
+#
+# Replays a session recording (File > Record Session...) instead of a live BCI2000,
+# in real time, faster, or as fast as possible
+#
+class Replay(AbstractCommunication):
+  def __init__(self, bciPath, file, sharedStates):
+    path, speed = choosePlayback("Replay", "Choose session recording", "Session recording (*.vbr)")
+    self._acqThr = ReplayDataThread(path, speed)
+    self._worker = PlaybackWorker()
+
+  @property
+  def worker(self):
+    return self._worker
+  @property
+  def acqThr(self):
+    return self._acqThr
+
+  def evaluate(self, state):
+    return self.acqThr.stateValue(state)
+
+class ReplayDataThread(PlaybackDataThread):
+  def __init__(self, path, speed=1.0):
+    super().__init__(speed)
+    self.path = path
+    self.sharedStates = []
+    self.lastStates = None
+
+  def stateValue(self, state):
+    """last value of a shared state, 0 if unknown"""
+    if self.lastStates is None or state not in self.sharedStates:
+      return 0
+    return int(self.lastStates[self.sharedStates.index(state)][-1])
+
+  def run(self):
+    if self.path == "":
+      self.printSignal.emit("No session recording chosen")
+      self.ended.emit()
+      return
+    self.printSignal.emit(f"Replaying {self.path}")
+    blocks = 0
+    start = time.perf_counter()
+    try:
+      self.restartClock(0)
+      for kind, t, value in readRecording(self.path):
+        if not self.waitUntil(t):
+          return
+        if kind == Record.Header:
+          self.sharedStates = value['sharedStates']
+        elif kind == Record.Properties:
+          self.propertiesSignal.emit(value['elements'], value['chNames'])
+        elif kind == Record.Parameter:
+          self.parameterSignal.emit(value)
+        elif kind == Record.Signal:
+          self.emitBlock(value, self.dueTime(t))
+          blocks += 1
+        elif kind == Record.States:
+          self.lastStates = value
+          self.stateSignal.emit(value)
+    except Exception:
+      traceback.print_exc()
+    elapsed = time.perf_counter() - start
+    self.printSignal.emit(f"Replayed {blocks} blocks in {elapsed:.2f} s ({blocks / max(elapsed, 1e-9):.0f} blocks/s)")
+    self.ended.emit()
@@ -0,0 +1,232 @@
+import importlib
+import threading
+import numpy as np
+from PyQt5.QtCore import QObject, QThread, Qt
+
+#
+# One running data stream, shared by every filter subscribed to it.
+# Each block is received and decoded once in the acquisition thread, then pushed to the
+# BlockDelivery of every subscriber. Parameters and properties are cached so a filter
+# that subscribes late is configured as if it had been there at SetConfig.
+#
+class Connection(QObject):
+  def __init__(self, comm, name, sharedStates, log=print):
+    super().__init__()
+    self.comm = comm
+    self.acqThr = comm.acqThr
+    self.name = name
+    self.sharedStates = list(sharedStates or []) #state rows the stream emits, unless the data thread says otherwise
+    self.log = log
+    self.subscribers = [] #[delivery, states the subscriber wants, {row order: rows}]
+    self.parameters = {} #name -> last parameter record
+    self.properties = None #(elements, chNames)
+    self.address = ('', 0)
+    self.lock = threading.Lock()
+
+    #data thread
+    self.t2 = QThread()
+    self.acqThr.moveToThread(self.t2)
+    self.t2.started.connect(self.acqThr.run)
+    #runs in the acquisition thread
+    self.acqThr.propertiesSignal.connect(self.pushProperties, Qt.DirectConnection)
+    self.acqThr.dataSignal.connect(self.pushData, Qt.DirectConnection)
+    self.acqThr.stateSignal.connect(self.pushStates, Qt.DirectConnection)
+    self.acqThr.parameterSignal.connect(self.pushParameter, Qt.DirectConnection)
+    self.acqThr.printSignal.connect(self.logPrint)
+    self.acqThr.disconnected.connect(self.resetConnection)
+
+    #BCI2000
+    self.t1 = QThread()
+    self.comm.worker.moveToThread(self.t1)
+    self.t1.started.connect(self.comm.worker.run)
+    self.comm.worker.initSignal.connect(self.getParameters)
+    self.comm.worker.logPrint.connect(self.logPrint)
+
+  def logPrint(self, msg):
+    self.log(msg) #queued to the GUI thread, this object lives there
+
+  def start(self):
+    print("starting BCI2000 thread")
+    self.t1.start()
+
+  def stop(self):
+    print("STOPPING")
+    with self.lock:
+      subscribers = self.subscribers
+      self.subscribers = []
+    for delivery, states, rows in subscribers:
+      delivery.discard()
+    self.comm.worker.stop()
+    self.acqThr.stop()
+    #stop BCI2000 thread
+    self.t1.quit()
+    #stop data acquisition
+    self.t2.quit()
+    #wait for both threads to exit
+    self.t1.wait()
+    self.t2.wait()
+
+  def subscribe(self, delivery, sharedStates):
+    """start pushing to delivery, beginning with the configuration received so far"""
+    with self.lock:
+      for p in self.parameters.values():
+        delivery.push('parameter', (p,))
+      if self.properties is not None:
+        delivery.push('properties', self.properties)
+      if sharedStates and hasattr(self.acqThr, 'addStates'):
+        self.acqThr.addStates(sharedStates) #recordings can decode states the first filter did not ask for
+      self.subscribers.append([delivery, list(sharedStates or []), {}])
+
+  def unsubscribe(self, delivery):
+    """stop pushing to delivery, blocks still queued in it are handed back"""
+    with self.lock:
+      self.subscribers = [s for s in self.subscribers if s[0] is not delivery]
+    delivery.discard()
+
+  def evaluate(self, state):
+    return self.comm.evaluate(state)
+
+  def seek(self, seconds):
+    """continue a recording from this time, False if the stream cannot seek"""
+    if not hasattr(self.acqThr, 'seek'):
+      return False
+    self.acqThr.seek(seconds)
+    return True
+
+  #---- acquisition thread ----#
+  def pushProperties(self, el, chNames):
+    with self.lock:
+      self.properties = (el, chNames)
+      for delivery, states, rows in self.subscribers:
+        delivery.push('properties', (el, chNames))
+
+  def pushParameter(self, p):
+    with self.lock:
+      self.parameters[p['name']] = p
+      for delivery, states, rows in self.subscribers:
+        delivery.push('parameter', (p,))
+
+  def pushStates(self, state):
+    names = getattr(self.acqThr, 'sharedStates', None) or self.sharedStates
+    with self.lock:
+      for delivery, states, rows in self.subscribers:
+        delivery.pushStates(self.selectStates(state, names, states, rows))
+
+  def pushData(self, data):
+    with self.lock:
+      if not self.subscribers:
+        self.acqThr.releaseBlock(data)
+        return
+      #every subscriber releases the block once
+      self.acqThr.retainBlock(data, len(self.subscribers) - 1)
+      for delivery, states, rows in self.subscribers:
+        delivery.pushData(data)
+
+  def selectStates(self, state, names, wanted, rows):
+    """rows of state in the order a subscriber wants, states the stream lacks read as 0"""
+    if wanted == names or np.ndim(state) != 2:
+      return state
+    key = tuple(names)
+    if key not in rows:
+      rows[key] = [names.index(s) if s in names else -1 for s in wanted]
+    out = np.zeros((len(wanted), state.shape[1]), dtype=state.dtype)
+    for i, r in enumerate(rows[key]):
+      if 0 <= r < state.shape[0]:
+        out[i] = state[r]
+    return out
+
+  #---- GUI thread ----#
+  def getParameters(self, addy):
+    newAddy = addy.split(':')
+    if newAddy != self.address:
+      self.address = newAddy
+    self.t1.quit()
+    try:
+      self.acqThr.initalize(self.address)
+    except OSError as e:
+      #only this stream stops, filters on other streams keep running
+      self.logPrint(f"Cannot listen for {self.name} at {':'.join(self.address)}: {e}")
+      self.stop()
+      return
+    print("starting data thread")
+    self.t2.start()
+
+  def resetConnection(self):
+    worker = self.comm.worker
+    if getattr(worker, 'bci', None) is None:
+      return #not talking to BCI2000
+    try: #try to reset connection to BCI2000 if we can
+      resting = worker.bci.GetSystemState() == "Resting"
+    except:
+      resting = False #operator went away
+    if not resting:
+      #the worker reconnects and waits for BCI2000 in its own thread, the GUI stays responsive
+      worker.reconnect = True
+      self.t1.quit()
+      self.t1.wait()
+      self.t1.start()
+
+#
+# Data streams of the main window, by stream and BCI2000 share point.
+# Filters subscribe instead of opening their own stream, so several can run side by side.
+# A stream is closed when its last filter leaves, freeing its threads and share port.
+#
+class AcquisitionHub(QObject):
+  firstPort = 1897 #share points after the first listen on the following ports
+
+  def __init__(self, log=print):
+    super().__init__()
+    self.log = log
+    self.connections = {} #(bciPath, path, file, share point) -> Connection
+
+  def open(self, bciPath, stream, className, sharedStates):
+    """the running connection for a filter, opened if needed"""
+    path, file = stream
+    try:
+      cls = importlib.import_module(path + "." + file).__dict__[file]
+    except:
+      self.log(f"Data stream {file} could not be loaded!")
+      raise
+    #BCI2000 shares each filter's signal separately, recordings serve every filter at once
+    key = (bciPath, path, file, className if cls.sharePerFilter else None)
+    if key not in self.connections:
+      comm = cls(bciPath, className, sharedStates)
+      if cls.sharePerFilter and hasattr(comm.worker, 'address'):
+        comm.worker.address = f'localhost:{self.freePort()}'
+      conn = Connection(comm, className, sharedStates, self.log)
+      self.connections[key] = conn
+      conn.start()
+    return self.connections[key]
+
+  def freePort(self):
+    used = set()
+    for conn in self.connections.values():
+      address = getattr(conn.comm.worker, 'address', '')
+      if address.startswith('localhost:'):
+        used.add(int(address.split(':')[1]))
+    port = self.firstPort
+    while port in used:
+      port += 1
+    return port
+
+  def seekable(self):
+    """connections playing a recording that can seek"""
+    return [conn for conn in self.connections.values() if hasattr(conn.acqThr, 'seek')]
+
+  def release(self, conn, delivery):
+    """unsubscribe delivery from conn, closing conn once nobody subscribes to it"""
+    conn.unsubscribe(delivery)
+    if not conn.subscribers:
+      self.close(conn)
+
+  def close(self, conn):
+    for key, c in list(self.connections.items()):
+      if c is conn:
+        del self.connections[key]
+    conn.stop()
+
+  def stop(self):
+    """close every connection"""
+    for conn in self.connections.values():
+      conn.stop()
+    self.connections = {}
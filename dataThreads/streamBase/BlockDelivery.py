@@ -0,0 +1,137 @@
+from collections import deque
+from enum import Enum
+import threading
+import numpy as np
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+class DeliveryPolicy(Enum):
+  Every   = 0 #deliver every data block
+  Latest  = 1 #deliver only the newest data block waiting
+  Bounded = 2 #keep at most maxQueued data blocks waiting, drop the oldest
+
+#
+# Link from an acquisition thread to a consumer in another thread.
+# Everything the acquisition thread emits is queued in order and re-emitted
+# on the consumer's thread with the same signals as AbstractDataThread.
+# Only data blocks can be dropped, and never one that follows a state block
+# with a non-zero reliable state (e.g. a CCEP trigger).
+#
+class BlockDelivery(QObject):
+  propertiesSignal = pyqtSignal(int, list)
+  dataSignal       = pyqtSignal(np.ndarray)
+  stateSignal      = pyqtSignal(object)
+  parameterSignal  = pyqtSignal(object)
+  _ready           = pyqtSignal()
+
+  def __init__(self, acqThr, policy=DeliveryPolicy.Every, maxQueued=4, reliableStates=[]):
+    super().__init__()
+    self.acqThr = acqThr
+    self.policy = policy
+    self.maxQueued = maxQueued
+    self.reliableStates = list(reliableStates) #state rows that pin the next data block
+    self.queue = deque() #[kind, args, pinned]
+    self.pinNext = False
+    self.scheduled = False
+    self.dropped = 0
+    self.lock = threading.Lock()
+    self._ready.connect(self.deliver, Qt.QueuedConnection)
+
+  def attach(self, acqThr):
+    """take blocks straight from the acquisition thread's signals, instead of having them pushed (see AcquisitionHub)"""
+    #runs in the acquisition thread
+    acqThr.propertiesSignal.connect(lambda el, chNames: self.push('properties', (el, chNames)), Qt.DirectConnection)
+    acqThr.dataSignal.connect(self.pushData, Qt.DirectConnection)
+    acqThr.stateSignal.connect(self.pushStates, Qt.DirectConnection)
+    acqThr.parameterSignal.connect(lambda p: self.push('parameter', (p,)), Qt.DirectConnection)
+
+  def pushStates(self, state):
+    if self.reliableStates and np.ndim(state) == 2 and state.shape[0] > max(self.reliableStates):
+      if np.any(state[self.reliableStates]):
+        with self.lock:
+          self.pinNext = True
+    self.push('state', (state,))
+
+  def pushData(self, data):
+    dropped = []
+    with self.lock:
+      pinned = self.pinNext
+      self.pinNext = False
+      waiting = [item for item in self.queue if item[0] == 'data' and not item[2]]
+      if self.policy == DeliveryPolicy.Latest:
+        dropped = waiting
+      elif self.policy == DeliveryPolicy.Bounded:
+        dropped = waiting[:max(len(waiting) + 1 - self.maxQueued, 0)]
+      if dropped:
+        #compare by identity, items hold arrays
+        dropIds = set(id(item) for item in dropped)
+        self.queue = deque(item for item in self.queue if id(item) not in dropIds)
+      self.dropped += len(dropped)
+    for item in dropped:
+      self.acqThr.releaseBlock(item[1][0])
+    self.push('data', (data,), pinned)
+
+  def push(self, kind, args, pinned=True):
+    with self.lock:
+      self.queue.append([kind, args, pinned])
+      schedule = not self.scheduled
+      self.scheduled = True
+    if schedule:
+      self._ready.emit()
+
+  def deliver(self):
+    """emit everything queued so far, on the consumer's thread"""
+    with self.lock:
+      items = list(self.queue)
+      self.queue.clear()
+      self.scheduled = False
+    signals = {'properties': self.propertiesSignal, 'data': self.dataSignal,
+               'state': self.stateSignal, 'parameter': self.parameterSignal}
+    for kind, args, pinned in items:
+      signals[kind].emit(*args)
+
+  def discard(self):
+    """drop everything queued, handing data blocks back"""
+    with self.lock:
+      items = list(self.queue)
+      self.queue.clear()
+    for kind, args, pinned in items:
+      if kind == 'data':
+        self.acqThr.releaseBlock(args[0])
+
+  def waiting(self):
+    """number of queued data blocks"""
+    with self.lock:
+      return sum(1 for item in self.queue if item[0] == 'data')
+
+#
+# Link to a consumer without widgets, such as a ComputeCore in a headless run.
+# Everything is emitted right away in the acquisition thread, so nothing is queued or dropped
+# and a recording plays back no faster than the consumer keeps up.
+#
+class DirectDelivery(QObject):
+  propertiesSignal = pyqtSignal(int, list)
+  dataSignal       = pyqtSignal(np.ndarray)
+  stateSignal      = pyqtSignal(object)
+  parameterSignal  = pyqtSignal(object)
+
+  def __init__(self, acqThr):
+    super().__init__()
+    self.acqThr = acqThr
+    self.dropped = 0
+    self.signals = {'properties': self.propertiesSignal, 'data': self.dataSignal,
+                    'state': self.stateSignal, 'parameter': self.parameterSignal}
+
+  def pushStates(self, state):
+    self.stateSignal.emit(state)
+
+  def pushData(self, data):
+    self.dataSignal.emit(data)
+
+  def push(self, kind, args, pinned=True):
+    self.signals[kind].emit(*args)
+
+  def discard(self):
+    pass #nothing is queued
+
+  def waiting(self):
+    return 0
@@ -0,0 +1,56 @@
+import time
+
+from dataThreads.streamBase.LatencyHistogram import LatencyHistogram
+
+#
+# Latency of data blocks on their way to the screen, by stage.
+# Each block is stamped with the time its bytes arrived (perf_counter) as it is emitted,
+# keyed by the array so every filter the block is shared with can time its own stages.
+# Recording is a dict lookup and a histogram bisect, cheap enough to leave on.
+#
+class BlockTiming():
+  keep = 256 #blocks remembered, pools hand out far fewer at once
+
+  def __init__(self):
+    self.arrivals = {} #id(block) -> arrival
+    self.stages = {} #stage name -> LatencyHistogram, in the order first recorded
+    self.current = None #arrival of the block being plotted, GUI thread
+    self.since = time.perf_counter()
+
+  def stamp(self, data, arrival):
+    """remember when the block's bytes arrived, called before it is emitted"""
+    arrivals = self.arrivals
+    arrivals.pop(id(data), None) #pooled arrays come back, keep the newest last
+    arrivals[id(data)] = arrival
+    if len(arrivals) > self.keep:
+      del arrivals[next(iter(arrivals))]
+
+  def arrival(self, data):
+    """arrival of a stamped block, None if not stamped"""
+    return self.arrivals.get(id(data))
+
+  def histogram(self, stage):
+    h = self.stages.get(stage)
+    if h is None:
+      h = self.stages.setdefault(stage, LatencyHistogram())
+    return h
+
+  def record(self, stage, arrival):
+    """time from arrival to now, for stage"""
+    if arrival is not None:
+      self.histogram(stage).record(time.perf_counter() - arrival)
+
+  def reset(self):
+    for h in list(self.stages.values()):
+      h.reset()
+    self.since = time.perf_counter()
+
+  def summary(self):
+    """stage -> LatencyHistogram.summary() and blocks/s since the last reset"""
+    seconds = max(time.perf_counter() - self.since, 1e-9)
+    out = {}
+    for stage, h in list(self.stages.items()):
+      s = h.summary()
+      s['rate'] = s['count'] / seconds
+      out[stage] = s
+    return out
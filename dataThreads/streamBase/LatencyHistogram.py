@@ -0,0 +1,49 @@
+from bisect import bisect_right
+from math import log10
+
+#
+# Log-spaced histogram of latencies in seconds.
+# Recording is a bisect and a list increment, cheap enough to leave on for every block.
+#
+class LatencyHistogram():
+  def __init__(self, low=1e-6, high=10.0, binsPerDecade=20):
+    n = int(round((log10(high) - log10(low)) * binsPerDecade))
+    self.edges = [low * 10**(i / binsPerDecade) for i in range(n + 1)]
+    self.reset()
+
+  def reset(self):
+    self.counts = [0] * (len(self.edges) + 1) #first and last bins catch values out of range
+    self.count = 0
+    self.total = 0.0
+    self.max = 0.0
+
+  def record(self, seconds):
+    self.counts[bisect_right(self.edges, seconds)] += 1
+    self.count += 1
+    self.total += seconds
+    if seconds > self.max:
+      self.max = seconds
+
+  def percentile(self, q):
+    """upper edge of the bin holding the q-th percentile (0-100)"""
+    if self.count == 0:
+      return 0.0
+    target = q / 100.0 * self.count
+    seen = 0
+    for i, c in enumerate(self.counts):
+      seen += c
+      if seen >= target and c:
+        upper = self.edges[i] if i < len(self.edges) else self.max
+        return min(upper, self.max)
+    return self.max
+
+  def summary(self):
+    """count, mean and percentiles in seconds"""
+    return {
+      'count': self.count,
+      'mean': self.total / self.count if self.count else 0.0,
+      'p50': self.percentile(50),
+      'p95': self.percentile(95),
+      'p99': self.percentile(99),
+      'max': self.max,
+    }
@@ -0,0 +1,67 @@
+import threading
+import time
+import pyqtgraph as pg
+
+from dataThreads.AbstractClasses import *
+
+#playback speeds offered to the user, 0 plays as fast as possible
+Speeds = {'1x': 1.0, '2x': 2.0, '5x': 5.0, '10x': 10.0, 'As fast as possible': 0.0}
+
+#
+# Base for data threads that play recorded blocks back.
+# Blocks are timed against the recording, scaled by speed.
+#
+class PlaybackDataThread(AbstractDataThread):
+  def __init__(self, speed=1.0):
+    super().__init__()
+    self.speed = speed
+    self._isRunning = True
+    self.wake = threading.Event() #interrupts waiting on stop()
+    self.clock = 0.0
+
+  def stop(self):
+    self._isRunning = False
+    self.wake.set()
+
+  def initalize(self, address):
+    pass #nothing to bind, the recording is opened in run
+
+  def restartClock(self, t):
+    """align recording time t with now"""
+    self.clock = time.perf_counter() - t / self.speed if self.speed > 0 else 0.0
+
+  def dueTime(self, t):
+    """perf_counter at which recording time t is played, now if playing as fast as possible"""
+    return self.clock + t / self.speed if self.speed > 0 else time.perf_counter()
+
+  def waitUntil(self, t):
+    """sleep until recording time t is due, returns False if stopped meanwhile"""
+    if self.speed > 0:
+      delay = self.clock + t / self.speed - time.perf_counter()
+      if delay > 0:
+        self.wake.wait(delay)
+    return self._isRunning
+
+#emits the start signal for the data thread, there is no operator to talk to
+class PlaybackWorker(AbstractWorker):
+  def run(self):
+    self.initSignal.emit("playback:0")
+  def stop(self):
+    pass
+
+def choosePlayback(settingsName, title, nameFilter):
+  """ask for a file and a playback speed, remembering the last choice. Returns path, speed"""
+  settings = pg.QtCore.QSettings("BCI2000", settingsName)
+  names = list(Speeds)
+  if not interactive():
+    return settings.value("path", ""), Speeds.get(settings.value("speed", names[0]), 1.0)
+  path, _ = pg.QtWidgets.QFileDialog.getOpenFileName(None, title, settings.value("path", ""), nameFilter)
+  if path == "":
+    return "", 1.0
+  last = settings.value("speed", names[0])
+  speed, ok = pg.QtWidgets.QInputDialog.getItem(None, title, "Playback speed", names, names.index(last) if last in names else 0, False)
+  if not ok:
+    speed = names[0]
+  settings.setValue("path", path)
+  settings.setValue("speed", speed)
+  return path, Speeds[speed]
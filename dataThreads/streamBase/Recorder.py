@@ -0,0 +1,126 @@
+import json
+import struct
+import threading
+import time
+import numpy as np
+from PyQt5.QtCore import Qt
+
+#
+# Session recordings: everything a data thread emits, in order, with its time.
+# File layout: MAGIC, then records of RECORD header + payload.
+#   Header     json: shared states of the recording filter
+#   Properties json: elements and channel names
+#   Parameter  json: parameter dict, as emitted by parameterSignal, its value type by name
+#   Signal     block: dtype, shape and raw samples
+#   States     block, same as Signal
+#
+MAGIC = b'VBCIREC2'
+OLDMAGIC = b'VBCIREC1' #parameters pickled, they are skipped when read
+RECORD = struct.Struct('<BdI') #kind, seconds since start, payload length
+BLOCK = struct.Struct('<8sII') #dtype string, channels, elements
+
+class Record():
+  Header     = 0
+  Properties = 1
+  Parameter  = 2
+  Signal     = 3
+  States     = 4
+
+#parameter records hold the Python type of their values, stored by name
+ValueTypes = {'float': float, 'int': int, 'str': str}
+
+def encodeParameter(param):
+  """parameter dict as json bytes"""
+  param = dict(param)
+  if 'valtype' in param:
+    param['valtype'] = param['valtype'].__name__
+  return bytes(json.dumps(param), 'utf-8')
+
+def decodeParameter(payload):
+  param = json.loads(bytes(payload))
+  if 'valtype' in param:
+    param['valtype'] = ValueTypes.get(param['valtype'], str)
+  return param
+
+class SessionRecorder():
+  def __init__(self, path, sharedStates=None):
+    self.path = path
+    self.file = open(path, 'wb', buffering=1 << 20)
+    self.file.write(MAGIC)
+    self.start = time.perf_counter()
+    self.acqThr = None
+    self.blocks = 0
+    self.lock = threading.Lock() #writes come from the acquisition thread
+    self.write(Record.Header, bytes(json.dumps({'sharedStates': sharedStates or []}), 'utf-8'))
+
+  def attach(self, acqThr):
+    """record everything acqThr emits, written from the acquisition thread"""
+    self.acqThr = acqThr
+    acqThr.propertiesSignal.connect(self.writeProperties, Qt.DirectConnection)
+    acqThr.parameterSignal.connect(self.writeParameter, Qt.DirectConnection)
+    acqThr.dataSignal.connect(self.writeSignal, Qt.DirectConnection)
+    acqThr.stateSignal.connect(self.writeStates, Qt.DirectConnection)
+
+  def close(self):
+    if self.acqThr is not None:
+      for sig, slot in [(self.acqThr.propertiesSignal, self.writeProperties), (self.acqThr.parameterSignal, self.writeParameter),
+                        (self.acqThr.dataSignal, self.writeSignal), (self.acqThr.stateSignal, self.writeStates)]:
+        try:
+          sig.disconnect(slot)
+        except TypeError:
+          pass
+      self.acqThr = None
+    with self.lock:
+      self.file.close()
+
+  def write(self, kind, *payload):
+    length = sum(len(p) for p in payload)
+    with self.lock:
+      if self.file.closed:
+        return
+      self.file.write(RECORD.pack(kind, time.perf_counter() - self.start, length))
+      for p in payload:
+        self.file.write(p)
+
+  def writeProperties(self, elements, chNames):
+    self.write(Record.Properties, bytes(json.dumps({'elements': elements, 'chNames': list(chNames)}), 'utf-8'))
+
+  def writeParameter(self, param):
+    self.write(Record.Parameter, encodeParameter(param))
+
+  def writeBlock(self, kind, data):
+    data = np.ascontiguousarray(data)
+    self.write(kind, BLOCK.pack(bytes(data.dtype.str, 'ascii'), data.shape[0], data.shape[1]), data.data.cast('B'))
+    self.blocks += 1
+
+  def writeSignal(self, data):
+    self.writeBlock(Record.Signal, data)
+
+  def writeStates(self, states):
+    self.writeBlock(Record.States, states)
+
+def readRecording(path):
+  """yield (kind, seconds, value) for each record of a recording"""
+  with open(path, 'rb') as f:
+    magic = f.read(len(MAGIC))
+    if magic != MAGIC and magic != OLDMAGIC:
+      raise RuntimeError(f'{path} is not a session recording')
+    while True:
+      head = f.read(RECORD.size)
+      if len(head) < RECORD.size:
+        return
+      kind, t, length = RECORD.unpack(head)
+      if kind == Record.Signal or kind == Record.States:
+        dtype, channels, elements = BLOCK.unpack(f.read(BLOCK.size))
+        #read into writable memory, consumers may work in place
+        buf = bytearray(length - BLOCK.size)
+        f.readinto(buf)
+        value = np.frombuffer(buf, dtype=str(dtype.rstrip(b'\x00'), 'ascii')).reshape(channels, elements)
+      elif kind == Record.Parameter and magic == OLDMAGIC:
+        f.seek(length, 1) #never unpickled, a recording could run code when loaded
+        continue
+      elif kind == Record.Parameter:
+        value = decodeParameter(f.read(length))
+      else:
+        value = json.loads(f.read(length))
+      yield kind, t, value
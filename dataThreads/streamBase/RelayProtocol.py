@@ -0,0 +1,154 @@
+import json
+import struct
+import time
+import zlib
+import numpy as np
+try:
+  import lz4.block
+except ImportError:
+  lz4 = None
+
+from dataThreads.streamBase import Recorder
+from dataThreads.streamBase.Recorder import BLOCK, Record
+
+#
+# Wire format between tools/Relay.py and the Remote data stream.
+# Frames are FRAME header + payload, the record kinds and block layout of session recordings
+# plus a few kinds of their own. Blocks may be downcast to float32 by the relay and compressed;
+# samples are byte-shuffled first (all first bytes, then all second bytes, ...) which lets
+# a fast codec find the redundancy of slowly changing signals.
+#   Hello        client -> relay, json: filter, states, float32, codec
+#   Ping         client -> relay, stamp is the client clock
+#   Pong         relay -> client, stamp is the relay clock, payload the ping stamp
+#   Print        relay -> client, json: log message
+#   Disconnected relay -> client, BCI2000 ended the connection
+# Stamps of relayed records are the relay clock when the block arrived from BCI2000.
+#
+FRAME = struct.Struct('<BBdI') #kind, codec, stamp, payload length
+STAMP = struct.Struct('<d')
+
+class Kind(Record):
+  Hello        = 16
+  Ping         = 17
+  Pong         = 18
+  Print        = 19
+  Disconnected = 20
+
+#codecs of block payloads
+Codecs = {'none': 0, 'zlib': 1, 'lz4': 2}
+
+def availableCodecs():
+  return [c for c in Codecs if c != 'lz4' or lz4 is not None]
+
+def shuffle(data):
+  """bytes of a contiguous array grouped by significance"""
+  return np.ascontiguousarray(data.reshape(-1).view(np.uint8).reshape(-1, data.dtype.itemsize).T)
+
+def unshuffle(raw, dtype, shape):
+  dtype = np.dtype(dtype)
+  planes = np.frombuffer(raw, dtype=np.uint8).reshape(dtype.itemsize, -1)
+  return np.ascontiguousarray(planes.T).view(dtype).reshape(shape)
+
+def compress(codec, raw):
+  if codec == Codecs['zlib']:
+    return zlib.compress(raw, 1)
+  if codec == Codecs['lz4']:
+    return lz4.block.compress(raw, store_size=True)
+  return raw
+
+def decompress(codec, raw):
+  if codec == Codecs['zlib']:
+    return zlib.decompress(raw)
+  if codec == Codecs['lz4']:
+    return lz4.block.decompress(raw)
+  return raw
+
+def frame(kind, stamp, payload=b'', codec=0):
+  return FRAME.pack(kind, codec, stamp, len(payload)) + payload
+
+def encodeBlock(kind, stamp, data, codec=0):
+  """frame for a signal or states block"""
+  data = np.ascontiguousarray(data)
+  head = BLOCK.pack(bytes(data.dtype.str, 'ascii'), data.shape[0], data.shape[1])
+  if codec:
+    body = compress(codec, shuffle(data).data)
+  else:
+    body = data.data.cast('B')
+  return frame(kind, stamp, head + bytes(body), codec)
+
+def blockHeader(payload):
+  """dtype and shape of the block in a frame payload"""
+  dtype, channels, elements = BLOCK.unpack_from(payload)
+  return np.dtype(str(dtype.rstrip(b'\x00'), 'ascii')), (channels, elements)
+
+def decodeBlock(codec, payload, out=None):
+  """block from a frame payload, copied into out if given"""
+  dtype, shape = blockHeader(payload)
+  raw = memoryview(payload)[BLOCK.size:]
+  if codec:
+    data = unshuffle(decompress(codec, raw), dtype, shape)
+  else:
+    data = np.frombuffer(raw, dtype=dtype).reshape(shape)
+  if out is None:
+    return data.copy() #payloads are reused by FrameReader
+  np.copyto(out, data)
+  return out
+
+def encodeJson(kind, stamp, value):
+  return frame(kind, stamp, bytes(json.dumps(value), 'utf-8'))
+
+def decodeJson(payload):
+  return json.loads(bytes(payload))
+
+#parameter records as in session recordings
+def encodeParameter(stamp, param):
+  return frame(Kind.Parameter, stamp, Recorder.encodeParameter(param))
+
+def decodeParameter(payload):
+  return Recorder.decodeParameter(payload)
+
+class FrameReader():
+  """frames from a blocking socket, one reusable buffer per frame size"""
+  def __init__(self, conn):
+    self.conn = conn
+    self.head = bytearray(FRAME.size)
+    self.buf = bytearray(1 << 16)
+    self.received = 0 #bytes read from the socket
+
+  def readInto(self, view):
+    got = 0
+    while got < len(view):
+      n = self.conn.recv_into(view[got:])
+      if n == 0:
+        raise EOFError()
+      got += n
+    self.received += got
+
+  def receive(self):
+    """kind, codec, stamp and payload of the next frame. The payload is only valid until the next call"""
+    self.readInto(memoryview(self.head))
+    kind, codec, stamp, length = FRAME.unpack(self.head)
+    if length > len(self.buf):
+      self.buf = bytearray(max(length, 2 * len(self.buf)))
+    payload = memoryview(self.buf)[:length]
+    self.readInto(payload)
+    return kind, codec, stamp, payload
+
+class ClockSync():
+  """offset of the relay clock from ours, from the ping with the shortest round trip"""
+  def __init__(self):
+    self.offset = 0.0
+    self.roundTrip = float('inf')
+
+  def pong(self, sent, relayTime, now=None):
+    now = time.perf_counter() if now is None else now
+    rtt = now - sent
+    #recent pings win over old ones once clocks drift, forget the best round trip slowly
+    self.roundTrip *= 1.05
+    if rtt <= self.roundTrip:
+      self.roundTrip = rtt
+      self.offset = relayTime - (sent + now) / 2
+
+  def local(self, relayTime):
+    """relay time in our clock"""
+    return relayTime - self.offset
@@ -0,0 +1,70 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+#
+# Ring of equally shaped blocks in shared memory, written by one process and read by another.
+# Every slot is stamped with the sequence number of the block in it. The writer clears the stamp,
+# fills the slot and stamps it again; the reader copies the block out and checks the stamp afterwards.
+# Neither side takes a lock, and a reader that fell a whole ring behind sees the stamp changed.
+#
+Writing = -1 #stamp of a slot being filled
+
+class SharedRing():
+  def __init__(self, memory, shape, dtype, slots, owned=False):
+    self.memory = memory
+    self.shape = tuple(shape)
+    self.dtype = np.dtype(dtype)
+    self.slots = slots
+    self.owned = owned
+    self.stamps = np.ndarray((slots,), dtype=np.int64, buffer=memory.buf)
+    self.blocks = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=memory.buf, offset=headerSize(slots))
+    self.written = 0 #next sequence number, writer only
+
+  @classmethod
+  def create(cls, shape, dtype, slots=32):
+    """new ring owned by the writer, unlinked when closed"""
+    size = headerSize(slots) + slots * int(np.prod(shape)) * np.dtype(dtype).itemsize
+    ring = cls(shared_memory.SharedMemory(create=True, size=size), shape, dtype, slots, owned=True)
+    ring.stamps[:] = Writing
+    return ring
+
+  @classmethod
+  def attach(cls, name, shape, dtype, slots):
+    """reader side of a ring, from the writer's describe()"""
+    #not attachSegment: writers are child processes sharing our resource tracker, unregistering would untrack their ring
+    return cls(shared_memory.SharedMemory(name), shape, dtype, slots)
+
+  def describe(self):
+    """what a reader needs to attach, picklable"""
+    return (self.memory.name, self.shape, self.dtype.str, self.slots)
+
+  def write(self, block):
+    """copy a block into the next slot, returns its sequence number"""
+    seq = self.written
+    slot = seq % self.slots
+    self.stamps[slot] = Writing
+    np.copyto(self.blocks[slot], block, casting='unsafe')
+    self.stamps[slot] = seq
+    self.written = seq + 1
+    return seq
+
+  def read(self, seq, out):
+    """copy block seq into out, False if it was overwritten before or while copying"""
+    slot = seq % self.slots
+    if self.stamps[slot] != seq:
+      return False
+    np.copyto(out, self.blocks[slot])
+    return self.stamps[slot] == seq
+
+  def close(self):
+    self.stamps = self.blocks = None #views must go before the mapping
+    self.memory.close()
+    if self.owned:
+      try:
+        self.memory.unlink()
+      except FileNotFoundError:
+        pass
+
+def headerSize(slots):
+  """stamps, padded so blocks start on a cache line"""
+  return (slots * 8 + 63) // 64 * 64
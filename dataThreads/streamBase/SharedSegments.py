@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import shared_memory, resource_tracker
+import os
+
+#
+# Cache of shared memory segments used by a data stream, keyed by segment name.
+# Segments in use are reference counted, idle ones are evicted least recently used first.
+# Call clear() whenever the producer goes away so mappings and file descriptors are released.
+#
+class SegmentCache():
+  def __init__(self, maxSegments=8):
+    self.maxSegments = maxSegments
+    self.segments = OrderedDict() #name -> Segment, least recently used first
+    self.pending = [] #segments that could not be closed yet because views still exist
+
+  def get(self, name):
+    """shared memory for name, attaching to it if needed"""
+    seg = self.segments.get(name)
+    if seg is None:
+      seg = Segment(attachSegment(name))
+      self.segments[name] = seg
+      self._evict()
+    else:
+      self.segments.move_to_end(name)
+    return seg.memory
+
+  def create(self, name, size):
+    """create a segment owned by this cache, it is unlinked when released"""
+    seg = Segment(shared_memory.SharedMemory(name, create=True, size=size), owned=True)
+    self.segments[seg.memory.name] = seg
+    _createdHere.add(seg.memory.name)
+    self._evict()
+    return seg.memory
+
+  @contextmanager
+  def use(self, name):
+    """hold a segment so it is not evicted while its memory is read"""
+    memory = self.get(name)
+    seg = self.segments[name]
+    seg.refs += 1
+    try:
+      yield memory
+    finally:
+      seg.refs -= 1
+
+  def release(self, name):
+    """close a segment now, if it is not in use"""
+    seg = self.segments.get(name)
+    if seg is not None and seg.refs == 0:
+      del self.segments[name]
+      self._close(seg)
+
+  def clear(self):
+    """close every segment, e.g. on end of transmission or disconnect"""
+    segs = list(self.segments.values())
+    self.segments.clear()
+    for seg in segs:
+      self._close(seg)
+    self._closePending()
+
+  def openSegments(self):
+    return len(self.segments) + len(self.pending)
+
+  def mappedBytes(self):
+    return sum(seg.memory.size for seg in list(self.segments.values()) + self.pending)
+
+  def _evict(self):
+    self._closePending()
+    if len(self.segments) <= self.maxSegments:
+      return
+    for name in [n for n, seg in self.segments.items() if seg.refs == 0]:
+      self.release(name)
+      if len(self.segments) <= self.maxSegments:
+        break
+
+  def _close(self, seg):
+    try:
+      seg.memory.close()
+    except BufferError:
+      #the buffer is still exported, try again later
+      self.pending.append(seg)
+      return
+    if seg.owned:
+      _createdHere.discard(seg.memory.name)
+      try:
+        seg.memory.unlink()
+      except FileNotFoundError:
+        pass
+
+  def _closePending(self):
+    pending = self.pending
+    self.pending = []
+    for seg in pending:
+      self._close(seg)
+
+class Segment():
+  def __init__(self, memory, owned=False):
+    self.memory = memory
+    self.owned = owned
+    self.refs = 0
+
+_createdHere = set() #names of segments created by caches in this process
+
+def attachSegment(name):
+  """attach to a segment created by another process, without taking ownership of it"""
+  memory = shared_memory.SharedMemory(name)
+  if os.name == 'posix' and name not in _createdHere:
+    #the resource tracker would otherwise unlink the producer's segment when we exit
+    resource_tracker.unregister(memory._name, 'shared_memory')
+  return memory
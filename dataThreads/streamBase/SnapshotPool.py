@@ -0,0 +1,68 @@
+from collections import deque
+import threading
+import numpy as np
+
+#
+# Ring of preallocated arrays that acquisition threads copy blocks into
+# before emitting them, so consumers never see shared memory being overwritten.
+# Consumers hand the arrays back with release() when they are done,
+# a block shared by several consumers is back once each of them released it (see retain).
+#
+class SnapshotPool():
+  def __init__(self, size=8):
+    self.size = size
+    self.shape = None
+    self.dtype = None
+    self.free = deque()
+    self.inUse = {} #id -> [array handed out by the pool, references]
+    self.exhausted = 0 #snapshots allocated because every buffer was in use
+    self.lock = threading.Lock()
+
+  def configure(self, shape, dtype=np.double):
+    """allocate the ring for blocks of the given shape and type"""
+    shape = tuple(shape)
+    dtype = np.dtype(dtype)
+    with self.lock:
+      if shape == self.shape and dtype == self.dtype:
+        return
+      self.shape = shape
+      self.dtype = dtype
+      #buffers still in use are dropped once released
+      self.free = deque(np.empty(shape, dtype) for i in range(self.size))
+      self.inUse = {}
+
+  def acquire(self):
+    """a free buffer to fill, allocating only if the ring is exhausted"""
+    with self.lock:
+      if self.free:
+        #oldest released buffer first, so a consumer that still draws from it has time to finish
+        buf = self.free.popleft()
+        self.inUse[id(buf)] = [buf, 1]
+        return buf
+      self.exhausted += 1
+    return np.empty(self.shape, self.dtype)
+
+  def snapshot(self, src):
+    """copy src into a free buffer"""
+    if src.shape != self.shape or src.dtype != self.dtype:
+      self.configure(src.shape, src.dtype)
+    buf = self.acquire()
+    np.copyto(buf, src)
+    return buf
+
+  def retain(self, buf, count=1):
+    """count more consumers hold the snapshot, each releases it once"""
+    with self.lock:
+      entry = self.inUse.get(id(buf))
+      if entry is not None and entry[0] is buf:
+        entry[1] += count
+
+  def release(self, buf):
+    """return a snapshot to the ring once every holder released it, ignores arrays the pool does not own"""
+    with self.lock:
+      entry = self.inUse.get(id(buf))
+      if entry is not None and entry[0] is buf:
+        entry[1] -= 1
+        if entry[1] <= 0:
+          del self.inUse[id(buf)]
+          self.free.append(buf)
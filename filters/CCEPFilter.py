@@ -7,8 +7,8 @@ from pyqtgraph.dockarea import *
 import pyqtgraph.parametertree as ptree
 from filters.filterBase.GridFilter import GridFilter
 from base.SharedVisualization import saveFigure
-from enum import Enum, IntEnum, auto
-from scipy.signal import find_peaks, butter, filtfilt
+from filters.compute.CCEPCore import CCEPCore, RefCombo
+from enum import Enum
 from math import ceil
 
 backgroundColor = (14, 14, 14)
@@ -20,21 +20,6 @@ class Column(Enum):
   Electrode = 1
   Sig = 2
   AUC = 3
-class RefCombo(Enum):
-  Average = 0
-  Maximum = 1
-class SharedStates(IntEnum):
-  CCEPTriggered        = 0
-  StimulatingChannel   = auto() # Auto-increment
-
-class Filter():
-  enabled = False
-  cutOff = None
-  b = 0
-  a = 0
-  def __init__(self, name):
-    self.type = name
-
 
 class FigureParameterItem(ptree.parameterTypes.WidgetParameterItem):
   def makeWidget(self):
@@ -68,7 +53,7 @@ class ScalableGroup(ptree.parameterTypes.GroupParameter):
     self.c = chOptionsList
     self.c.sigValueChanged.connect(self.cChanged)
     #custom fig param
-    ptree.registerParameterType("fig", FigureParameter)
+    ptree.registerParameterType("fig", FigureParameter, override=True)
     self.fig  = FigureParameter(name="Peak Detection Plot")
     self.addChild(self.fig)
 
@@ -102,18 +87,21 @@ class FilterParams(ptree.parameterTypes.GroupParameter):
     self.p = p
     ptree.parameterTypes.GroupParameter.__init__(self, **opts)
 
-    self.lp = ptree.parameterTypes.ListParameter(name="Low Pass", limits= [None, 30, 40, 70])
-    #self.lp.sigValueChanged.connect(self.p.filterChanged)
+    #cutoffs in Hz, any value, 0 for off
+    self.lp = ptree.Parameter.create(name="Low Pass", type='float', value=0, limits=(0, None), step=10, suffix='Hz', tip="0 for off")
     self.addChild(self.lp)
 
-    self.hp = ptree.parameterTypes.ListParameter(name="High Pass", limits= [None, 0.1, 1, 5])
-    #self.hp.sigValueChanged.connect(self.p.filterChanged)
+    self.hp = ptree.Parameter.create(name="High Pass", type='float', value=0, limits=(0, None), step=0.1, suffix='Hz', tip="0 for off")
     self.addChild(self.hp)
 
-    self.notch = ptree.parameterTypes.ListParameter(name="Notch", limits= [None, 50, 60])
-    #self.notch.sigValueChanged.connect(self.p.filterChanged)
+    self.notch = ptree.Parameter.create(name="Notch", type='float', value=0, limits=(0, None), step=10, suffix='Hz', tip="0 for off")
     self.addChild(self.notch)
 
+  def showCutOffs(self, cutOffs):
+    """show the cutoffs applied, without filtering again"""
+    for param in self.children():
+      param.setValue(cutOffs.get(param.name()) or 0, blockSignal=self.p.filterChanged)
+
 
 class TestBooleanParams(ptree.parameterTypes.GroupParameter):
   def __init__(self, p, **opts):
@@ -134,6 +122,11 @@ class TestBooleanParams(ptree.parameterTypes.GroupParameter):
     self.addChild({'name': 'Max Windows', 'type': 'int', 'value': 16, 'limits': [0, 100]})
     self.d = self.param('Max Windows')
     self.d.sigValueChanged.connect(self.dChanged)
+
+    self.addChild({'name': 'Memory cap (MB)', 'type': 'int', 'value': 1024, 'limits': [16, 1 << 20],
+                   'tip': 'Memory for the trials, the oldest are dropped past it'})
+    self.m = self.param('Memory cap (MB)')
+    self.m.sigValueChanged.connect(self.mChanged)
             
     self.addChild({'name': 'Save Figures on Refresh', 'type': 'bool', 'value': 0})
     self.f = self.param('Save Figures on Refresh')
@@ -147,6 +140,14 @@ class TestBooleanParams(ptree.parameterTypes.GroupParameter):
     self.h = self.param('Clear Figures')
     self.h.sigActivated.connect(self.hChanged)
 
+    self.addChild({'name': 'Exclude Last Trial', 'type': 'action', 'tip': 'Leave the newest trial still averaged out of the average'})
+    self.i = self.param('Exclude Last Trial')
+    self.i.sigActivated.connect(self.iChanged)
+
+    self.addChild({'name': 'Undo Exclusion', 'type': 'action'})
+    self.j = self.param('Undo Exclusion')
+    self.j.sigActivated.connect(self.jChanged)
+
   def aChanged(self):
     self.p.setSortChs(self.a.value())
   def bChanged(self):
@@ -155,6 +156,8 @@ class TestBooleanParams(ptree.parameterTypes.GroupParameter):
     self.p.setStdDevState(self.c.value())
   def dChanged(self):
     self.p.setMaxWindows(self.d)
+  def mChanged(self):
+    self.p.setMemoryCap(self.m.value())
   def eChanged(self):
     self.p.setMaxPlots(self.e)
   def fChanged(self):
@@ -163,16 +166,23 @@ class TestBooleanParams(ptree.parameterTypes.GroupParameter):
     self.p.saveFigures()
   def hChanged(self):
     self.p.clearFigures()
+  def iChanged(self):
+    self.p.excludeLastTrial()
+  def jChanged(self):
+    self.p.undoExclusion()
 
 class CCEPFilter(GridFilter):
   def __init__(self, area, bciPath, stream):
     super().__init__(area, bciPath, stream)
     self.aucThresh = 0
-    self.numTrigs = 0
-
 
   def publish(self):
     super().publish()
+    #trials and AUCs are computed there, this filter draws them
+    self.core = CCEPCore(self.parameters)
+    self.core.printSignal.connect(self.logPrint)
+    self.refilter = None #worker re-filtering the stored trials
+    self.refilterJobs = [] #threads and workers running, cancelled ones winding down too
 
     self.pens = [pg.mkPen(x) for x in np.linspace(0, 1, 256)] #create all the pens we could ever need
     self.gridNums = pg.GraphicsLayoutWidget(title="CCEP Aggregate")
@@ -193,10 +203,16 @@ class CCEPFilter(GridFilter):
     self.p = ptree.Parameter.create(name="Settings", type='group', children=params, title=None)
     self.t = ptree.ParameterTree()
     self.t.setParameters(self.p)
+    for param in self.filterParams.children():
+      param.sigValueChanged.connect(self.filterChanged)
 
     self.t.header().setSectionResizeMode(pg.QtWidgets.QHeaderView.Stretch)
+    self.refilterBar = QtWidgets.QProgressBar()
+    self.refilterBar.setFormat("Re-filtering trials %p%")
+    self.refilterBar.setVisible(False)
     settingsD.addWidget(settingsLab)
     settingsD.addWidget(self.t)
+    settingsD.addWidget(self.refilterBar)
 
     d2 = Dock("Table", widget=self.table)
     self.area.addDock(settingsD)
@@ -237,40 +253,24 @@ class CCEPFilter(GridFilter):
   #define shared states we need for filter
   @property
   def sharedStates(self):
-    return ["CCEPTriggered", "StimulatingChannel"]
+    return CCEPCore.sharedStates
+  @property
+  def reliableStates(self):
+    return CCEPCore.reliableStates
   
   #define abstract methods
   def receiveStates(self, state):
-    #get CCEPTriggered state to detect CCEPs
-    triggersFound = np.count_nonzero(state[SharedStates.CCEPTriggered])
-    self.numTrigs += triggersFound
-
-    #find stim ch if possible
-    if np.shape(state)[0] > 1 and triggersFound:
-      stimCh = state[SharedStates.StimulatingChannel].nonzero()[0]
-      if stimCh.any():
-        #just get first non-zero value
-        chBits = state[SharedStates.StimulatingChannel][stimCh[0]]
-        testStimChs = []
-        chBinary = '{0:08b}'.format(chBits)
-        for b in range(len(chBinary)): #32 bit state
-          if chBinary[len(chBinary) - b - 1] == '1':
-            #print(self.chNames[b] + " at " + str(b))
-            testStimChs.append(self.chNames[b]) #append ch name
-        #minimally change used array
-        if testStimChs != self.stimChs:
-          self.stimChs = testStimChs
+    self.core.receiveStates(state)
+
+  @property
+  def stimChs(self):
+    return self.core.stimChs
 
-  
   def plot(self, data):
     #if self.checkPlot():
-    if self.numTrigs > 0:
-      print(f"plotting {self.numTrigs}")
-      self.numTrigs -= 1
+    if self.core.numTrigs > 0:
+      print(f"plotting {self.core.numTrigs}")
 
-      #process data
-      aocs = []
-      chunk = False
       peaks = None
       if self.p.child('Auto Detect Options')['Enable auto-detection']:
         #get channels to use as trigger
@@ -286,21 +286,8 @@ class CCEPFilter(GridFilter):
           if len(refIndices) == 0:
             self.logPrint('Cannot auto-detect without Detection Channels specified!')
           else:
-            if self._comboOpt == RefCombo.Average:
-              self.trigData =  np.mean(data[refIndices, :],axis=0)
-            elif self._comboOpt == RefCombo.Maximum:
-              self.trigData = np.max(data[refIndices, :], axis=0)
-            #remove mean before peak detection
-            self.trigData -= np.mean(self.trigData)
-
             #get chunks by peaks
-            #hard code parameters just to test
-            peaks, properties = find_peaks(self.trigData, 200, width=(None,20), threshold=20, distance=20)
-            print(f"Found {len(peaks)} peaks")
-            if len(peaks) <= 1:
-              chunk = False
-            else:
-              chunk = True
+            self.trigData, peaks = self.core.detect(data, refIndices, self._comboOpt)
 
             #plot detection plot
             pltItem = self.autoParam.fig.value()
@@ -311,66 +298,48 @@ class CCEPFilter(GridFilter):
             self.autoParam.fig.setValue(pltItem)
       
       #compute and chunk data
-      avgPlots = self.p.child('General Options')['Average CCEPS']
-      for i, ch in enumerate(self.chTable.values()):
-        if chunk:
-          ch.chunkData(data[i], peaks, avgPlots) #chunks and computes
-        else:
-          ch.computeData(data[i], avgPlots) #compute data
-        aocs.append(ch.auc)
-      
-      #send processed data
-      self.dataProcessedSignal.emit(aocs)
+      self.core.avgPlots = self.p.child('General Options')['Average CCEPS']
+      self.core.stds = self.p.child('General Options')['Threshold (STD)']
+      result = self.core.process(data, peaks)
+      self.aucThresh = result['threshold']
 
-      #set threshold
-      stds = self.p.child('General Options')['Threshold (STD)']
-      self.aucThresh = np.std(aocs) * stds
+      #send processed data
+      self.dataProcessedSignal.emit(list(result['auc']))
 
       #plot!
       self._renderPlots()
 
   def setConfig(self):
     super().setConfig()
+    self._cancelRefilter() #its trials are gone
 
     self.gridNums.clear()
 
     self.chPlot = list(range(self.channels))
     self.tableRows = list(range(self.channels))
     #self.chPlot = {}
-    self.chTable = {}
     self.regs = list(range(self.channels))
-    #init variables
-    self.baselineLength = self.getParameterValue("BaselineEpochLength")
+    #init variables, the core redefines element size
+    self.core.configure(self.elements, self.chNames)
+    self.filterParams.showCutOffs(self.core.filters.cutOffs) #those that do not fit the sampling rate are off
+    self.chTable = self.core.chTable
+    self.baselineLength = self.core.baselineLength
+    self.ccepLength = self.core.ccepLength
+    self.sr = self.core.sr
+    self.elements = self.core.elements
+    self.x = self.core.x
     self.latStart = 0
     self.latStartSamples = self._maskStart
-    self.ccepLength = self.getParameterValue("CCEPEpochLength")
-    self.sr = self.getParameterValue("SamplingRate")
-    self.baseSamples = self.msToSamples(self.baselineLength)
-    self.ccepSamples = self.msToSamples(self.ccepLength)
     self.trigSamples = self._maskEnd 
     self.trigLatLength = self.trigSamples * 1000.0 / self.sr
-    
-    #redefine element size
-    self.elements = self.baseSamples + self.ccepSamples
-    self.x = np.linspace(-self.baselineLength, self.ccepLength, self.elements)
-
-    #to visualize stimulating channels if we can
-    self.stimChs = []
-    #for filters
-    self.filters = { 'Notch':  Filter('bandstop'), 'Low Pass': Filter('lowpass'), 'High Pass':  Filter('highpass')}
+    self.core.setMask(self.latStartSamples, self.trigSamples)
     self.filterValChanged = False
-    for param in self.filterParams.children():
-      param.sigValueChanged.connect(self.filterChanged)
 
     #go thru all channels for table
-    count = 0
     for chName in self.chNames:
       sub1 = self.gridNums.addLayout()
       sub1.addLabel("<b>%s"%(chName), size='20pt', bold=True)
-
       sub1.nextRow()
-      self.chTable[chName] = CCEPCalc(self, ch=count, title=chName)
-      count = count + 1
 
     #only initialize plots up to max number 
     for r in range(self.numRows):
@@ -418,8 +387,7 @@ class CCEPFilter(GridFilter):
     self.table.resizeColumnsToContents()
     #self.table.setSortMode(0,'index')
     self.table.sortItems(0, QtCore.Qt.DescendingOrder)
-    for i, chName in enumerate(self.chNames):
-      self.chTable[chName].setTableItem(i)
+    self.tableItems = {chName: self.table.item(i, Column.Name.value) for i, chName in enumerate(self.chNames)}
     #self.setSortChs(self._sortChs)
     #make sure user can't change sorting
     for i in range(self.table.columnCount()):
@@ -455,13 +423,15 @@ class CCEPFilter(GridFilter):
     #self.stdSpin.setToolTip(str(value/10))
   def setMaxWindows(self, spin):
     self._maxWindows = spin.value()
+  def setMemoryCap(self, megabytes):
+    self.core.setMemoryCap(megabytes)
   def setAvgPlots(self, state):
     self._avgPlots = state
   def setSortChs(self, state):
     if hasattr(self, 'chTable') and self._sortChs and not state:
       #re-initialize order
-      for ch in self.chTable.values():
-        ch.totalChanged(False)
+      for chName in self.chTable:
+        self._updateRow(chName, False)
       self.table.sortItems(Column.Name.value, QtCore.Qt.DescendingOrder)
     
     self._sortChs = state
@@ -487,6 +457,7 @@ class CCEPFilter(GridFilter):
       self.latStart = latStart
       self.latStartSamples = self.msToSamples(latStart)
       self._maskStart = self.latStartSamples
+    self.core.setMask(self.latStartSamples, self.trigSamples)
   
   def clearFigures(self):
     if self.p.child('General Options')['Save Figures on Refresh']:
@@ -497,35 +468,89 @@ class CCEPFilter(GridFilter):
         self.chPlot[i].removeItem(child)
     children[0].setPen(pg.mkPen('b')) #blend in
 
-    for t in self.chTable.values():
-      t.totalChanged(0)
-      t.database = []
-      t.rawDatabase = []
+    for chName in self.chTable:
+      self._updateRow(chName, 0)
+    self._cancelRefilter()
+    self.core.clear()
   
+  def excludeLastTrial(self):
+    """leave the newest trial still in the average out of it"""
+    included = np.flatnonzero(self.core.database.mask()) if hasattr(self, 'chTable') else []
+    if len(included) == 0:
+      self.logPrint("No trial to exclude")
+      return
+    self.core.exclude(included[-1])
+    self.logPrint(f"Trial {self.core.database.trialId(included[-1]) + 1} excluded, averaging {self.core.averaged}")
+    self._averageChanged()
+
+  def undoExclusion(self):
+    if not hasattr(self, 'chTable') or self.core.undoExclusion() is None:
+      self.logPrint("No exclusion to undo")
+      return
+    self.logPrint(f"Exclusion undone, averaging {self.core.averaged}")
+    self._averageChanged()
+
+  def _averageChanged(self):
+    self.aucThresh = self.core.aucThresh
+    self.dataProcessedSignal.emit(list(self.core.auc))
+    self.filterValChanged = True #redraw every trial
+    self._renderPlots(newData=False)
+    self.filterValChanged = False
+
   def filterChanged(self, param, val):
-    filter = self.filters[param.name()]
-    #if val != filter.cutOff:
-    filter.cutOff = val
-    filter.enabled = val != None
-    if filter.enabled:
-      print("filter enabled")
-      if filter.type == 'bandstop':
-        f = np.array([filter.cutOff - 5, filter.cutOff + 5])
-      else:
-        f = filter.cutOff
-      filter.b, filter.a = butter(2, f * 2 / self.sr , btype=filter.type)
-
-    #change past data
-    for ch in self.chTable.values():
-      for i in range(np.size(ch.rawDatabase, 0)):
-        ch.database[i] = ch.filterData(ch.rawDatabase[i])
-      ch.data = np.mean(ch.database, axis=0)
+    #new trials use it now, past trials are re-filtered in the background
+    try:
+      self.core.setFilter(param.name(), val or None, refilter=False)
+    except ValueError as e:
+      self.logPrint(f"{param.name()} not changed: {e}")
+      #once the settings tree is done with this value
+      QtCore.QTimer.singleShot(0, lambda: self.filterParams.showCutOffs(self.core.filters.cutOffs))
+      return
+    if not hasattr(self, 'chTable'):
+      return #applied to the trials to come
+    self._startRefilter()
+
+  def _startRefilter(self):
+    self._cancelRefilter()
+    self.refilter = self.core.refilterJob()
+    if self.refilter is None:
+      return
+    thread = QtCore.QThread()
+    self.refilter.moveToThread(thread)
+    thread.started.connect(self.refilter.run)
+    self.refilter.finished.connect(thread.quit)
+    self.refilter.progress.connect(self.refilterBar.setValue)
+    self.refilter.done.connect(self._refilterDone)
+    job = (thread, self.refilter)
+    thread.finished.connect(lambda: self.refilterJobs.remove(job))
+    self.refilterJobs.append(job)
+    self.refilterBar.setValue(0)
+    self.refilterBar.setVisible(True)
+    thread.start()
+
+  def _cancelRefilter(self):
+    if self.refilter is not None:
+      self.refilter.cancel()
+      self.refilter = None
+      self.refilterBar.setVisible(False)
+
+  def _refilterDone(self, worker):
+    if worker is not self.refilter:
+      return #cancelled after it was done
+    self.refilter = None
+    self.refilterBar.setVisible(False)
+    self.core.applyRefilter(worker)
     #display changes
-    print("changing data")
     self.filterValChanged = True
     self._renderPlots()
     self.filterValChanged = False
 
+  def stop(self):
+    self._cancelRefilter()
+    for thread, worker in list(self.refilterJobs):
+      thread.wait()
+    super().stop()
+
   def lpChanged(self, p, val):
     print(val)
   def hpChanged(self, p, val):
@@ -557,8 +582,8 @@ class CCEPFilter(GridFilter):
     
   def _renderPlots(self, newData=True):
     #update table with new data
-    for ch in self.chTable.values():
-      ch.totalChanged(ch.auc > self.aucThresh)
+    for chName, ch in self.chTable.items():
+      self._updateRow(chName, ch.significant)
     
     #sort table with updated numbers, if toggled
     if self._sortChs:
@@ -577,6 +602,22 @@ class CCEPFilter(GridFilter):
         self.chPlot[i].plotData(newData)
         i+=1
 
+  #t = boolean, if significant or not
+  def _updateRow(self, chName, t):
+    empColor = pg.QtGui.QColor(56,50,0)
+    calc = self.chTable[chName]
+    tableItem = self.tableItems[chName]
+    tableItem.p.sig = t
+    r = self.table.row(tableItem) #find new row we are at
+    self.table.item(r,Column.Sig.value).setData(QtCore.Qt.DisplayRole, int(t))
+    self.table.item(r,Column.AUC.value).setData(QtCore.Qt.DisplayRole, int(calc.auc))
+    calc.significant = t
+
+    if calc.significant and tableItem.background() != empColor:
+      tableItem.setBackground(empColor)
+    elif not calc.significant and tableItem.background() == empColor:
+      tableItem.setBackground(pg.QtGui.QColor(0,0,0,0)) #transparent
+
   def _changeBackgroundColor(self, row, emph):
     if row >= self.windows:
       return
@@ -605,7 +646,7 @@ class CCEPFilter(GridFilter):
     super().acceptElecNames(elecDict)
     if hasattr(self, 'chTable'):
       for name in self.chNames:
-        r = self.table.row(self.chTable[name].tableItem)
+        r = self.table.row(self.tableItems[name])
         self.table.item(r,Column.Electrode.value).setData(QtCore.Qt.DisplayRole, self.elecDict[name])
       self.table.setColumnHidden(Column.Electrode.value, False)
       self._hideNonElectrodes()
@@ -717,8 +758,9 @@ class CCEPPlot(pg.PlotItem):
   def changePlot(self):
     if len(self.link.database) > 0:
       #change data of all plots but average
-      for f, d in zip(self.listDataItems()[1:], self.link.database):
+      for f, d, included in zip(self.listDataItems()[1:], self.link.database, self.link.included):
         f.setData(x=self.p.x, y=d, useCache=True)
+        f.setVisible(bool(included)) #excluded trials are hidden
       self.updateAveragePlot()
 
     #change background based on selected
@@ -749,6 +791,11 @@ class CCEPPlot(pg.PlotItem):
       p2 = 255*(1-2.5**(-1*(1-1/(len(self.link.database)+1))))
       self.plot(x=self.p.x, y=self.link.database[-1], useCache=True, pen=self.p.pens[int(p2)], _callSync='off')
 
+      #trials given up to the memory cap leave the plot too
+      children = self.listDataItems()
+      for child in children[1:len(children) - len(self.link.database)]:
+        self.removeItem(child)
+
       self.updateAveragePlot()
     
   def updateAveragePlot(self):
@@ -760,88 +807,3 @@ class CCEPPlot(pg.PlotItem):
     if self.name in self.p.stimChs:
       p = pg.mkPen('c', width=1.5)
     self.avg.setData(x=self.p.x, y=self.link.data, useCache=True, pen=p)
-
-class CCEPCalc():
-  def __init__(self, parent, ch, title):
-    self.p = parent
-    self.ch = ch
-    self.name = title
-
-    self.significant = False
-    self.selected = False
-    self.database = []
-    self.rawDatabase = []
-    self.auc = 0
-    self.data = np.zeros(self.p.elements)
-
-  def getActiveData(self, data):
-    p1 = data[:self.p.baseSamples+self.p.latStartSamples]
-    p2 = data[self.p.baseSamples+self.p.trigSamples:]
-    d = np.concatenate((p1, p2))
-    #print(np.shape(d))
-    return p2
-
-  def setTableItem(self, ch):
-    self.tableItem = self.p.table.item(ch,Column.Name.value)
-
-  #t = boolean, if significant or not
-  def totalChanged(self, t):
-    empColor = pg.QtGui.QColor(56,50,0)
-    self.tableItem.p.sig = t
-    r = self.p.table.row(self.tableItem) #find new row we are at
-    self.p.table.item(r,Column.Sig.value).setData(QtCore.Qt.DisplayRole, int(t))
-    self.p.table.item(r,Column.AUC.value).setData(QtCore.Qt.DisplayRole, int(self.auc))
-    self.significant = t
-
-    if self.significant and self.tableItem.background() != empColor:
-      self.tableItem.setBackground(empColor)
-    elif not self.significant and self.tableItem.background() == empColor:
-      self.tableItem.setBackground(pg.QtGui.QColor(0,0,0,0)) #transparent
-
-  def computeData(self, newData, avgPlots=True):        
-    #new data, normalize amplitude with baseline data
-    if self.p.baseSamples == 0:
-      self.data = newData
-      #stdBase = 0
-    else:
-      #avBase = np.mean(newData[:self.p.baseSamples])
-      avBase = np.median(newData[:self.p.baseSamples])
-      #stdBase = np.std(self.rawData[:self.p.baseSamples], dtype=np.float64)
-      self.data = np.subtract(newData, avBase)
-
-
-    if np.shape(self.data) != np.shape(self.p.x):
-      self.p.logPrint(f"Expected: {np.shape(self.p.x)}, received: {np.shape(self.data)}")
-    else:
-      #store data
-      self.rawDatabase.append(self.data.copy())
-
-      #filter if enabled
-      self.data = self.filterData(self.data)
-      # for filter in self.p.filters:
-      #   if filter.enabled:
-      #     self.data = filtfilt(filter.b, filter.a, self.data)
-
-      self.database.append(self.data.copy())
-
-    #possibly change to average, before we detect ccep
-    if avgPlots:
-      #calculate average of plots
-      self.data = np.mean(self.database, axis=0)
-    
-    #get area under the curve
-    ccepData = self.getActiveData(self.data)
-    normData = ccepData - np.mean(ccepData)
-    self.auc = np.trapz(abs(normData))/1e3
-
-  def filterData(self, data):
-    for filter in self.p.filters.values():
-      if filter.enabled:
-        data = filtfilt(filter.b, filter.a, data)
-    return data
-
-  def chunkData(self, newData, peaks, avgPlots=True):
-    for peak in peaks:
-      data = newData[peak - self.p.baseSamples : peak + self.p.ccepSamples]
-      self.computeData(data, avgPlots)
-
@@ -7,9 +7,9 @@ import pyqtgraph.exporters
 import traceback
 
 import numpy as np
-from scipy import stats
 from base.SharedVisualization import saveFigure
 from filters.filterBase.GridFilter import GridFilter
+from filters.compute.PACCore import PACCore
 #
 # Uses PyQtGraph to visualize phase-amplitude coupling real-time
 #
@@ -45,7 +45,11 @@ class PolarPlot(pg.PlotItem):
   def plot(self, zData):
     #zData = self.rawData #stats.zscore(self.rawData)
     a = np.multiply(zData, np.exp(1j*self.phis))
-    self.zMod = np.sum(a)/(2*len(a))
+    self.setVector(np.sum(a)/(2*len(a)))
+
+  def setVector(self, zMod):
+    """show a modulation vector, as computed by PACCore"""
+    self.zMod = zMod
     if not np.isnan(self.zMod):
       self.polarPlot.setData(x=[self.zMod.real], y=[self.zMod.imag])
       self.line.setData(x=[0, self.zMod.real], y=[0, self.zMod.imag])
@@ -109,6 +113,9 @@ class PACFilter(GridFilter):
 
   def publish(self):
     super().publish()
+    #modulation vectors are computed there, this filter draws them
+    self.core = PACCore(self.parameters)
+    self.core.printSignal.connect(self.logPrint)
     self.win.setWindowTitle("Phase-Amplitude Coupling")
     self.maxTrials = 5
     self.cm = range(0, 360, round(360/(self.maxTrials+1)))
@@ -138,6 +145,8 @@ class PACFilter(GridFilter):
     titleD.addWidget(spinLab, row=1, col=1)
     titleD.addWidget(spinWin, row=1, col=2)
     titleD.addWidget(saveButton, row=1, col=3)
+    #only the title depends on the filter settings
+    self.parameters.subscribe(["HighPassCorner", "LowPassCorner", "OutputSignal"], self.updateTitle)
     titleD.hideTitleBar()
     
     self.polarD = Dock(polarTitle, widget=self.polarGrid)
@@ -148,8 +157,8 @@ class PACFilter(GridFilter):
 
   def setConfig(self):
     super().setConfig()
-    elWidth = np.pi/self.elements
-    phis = np.linspace(-np.pi+elWidth, np.pi-elWidth, self.elements)
+    self.core.configure(self.elements, self.chNames)
+    phis = self.core.phis
 
     pastBinsPlot = None
     pastPolarPlot = None
@@ -180,11 +189,11 @@ class PACFilter(GridFilter):
       self.polarGrid.nextRow()
       self.binsGrid.nextRow()
     self.setTrialNum(None, 0)
-    self.titleLab.setText(self.configureTitle())
 
   def plot(self, data):
+    self.core.process(data)
     for i, p in enumerate(self.polarPlots):
-      p.plot(data[i,:])
+      p.setVector(self.core.zMod[i])
     for i, p in enumerate(self.binPlots):
       p.plotBins(data[i,:])
     #self.saveImages = True #only save images if there is data to be shown
@@ -231,18 +240,24 @@ class PACFilter(GridFilter):
   #     h = f.split(" ")[3]
   #     ans.append(h) 
   #   return ans
+  def updateTitle(self, name, value):
+    title = self.configureTitle()
+    if title is not None:
+      self.titleLab.setText(title)
+
   def configureTitle(self):
+    if not all(p in self.parameters for p in ["HighPassCorner", "LowPassCorner", "OutputSignal"]):
+      return None
     try:
       #get parameters
-      hP = self.getParameterValue("HighPassCorner")
-      lP = self.getParameterValue("LowPassCorner")
-      outType = self.getParameterValue("OutputSignal")
-      outType = [int(numeric_string) for numeric_string in outType] #convert to int
+      hP = self.parameters.value("HighPassCorner")
+      lP = self.parameters.value("LowPassCorner")
+      outType = self.parameters.value("OutputSignal")
 
-      angleI = outType[0] != 2
-      magI = not angleI
+      angleI = int(outType[0] != 2) #index, NumPy reads a bool as a mask
+      magI = 1 - angleI
 
-      figTitle = "Phase-Amplitude coupling- Phase: %s - %s, Amplitude: %s - %s" %(hP[angleI], lP[angleI], hP[magI], lP[magI])
+      figTitle = "Phase-Amplitude coupling- Phase: %g - %g, Amplitude: %g - %g" %(hP[angleI], lP[angleI], hP[magI], lP[magI])
       return figTitle
     except:
       traceback.print_exc()
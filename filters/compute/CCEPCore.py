@@ -0,0 +1,357 @@
+import numpy as np
+from enum import Enum, IntEnum, auto
+from math import ceil
+from scipy.signal import find_peaks
+
+from filters.compute.FilterBank import FilterBank
+from filters.compute.Refilter import RefilterWorker
+from filters.compute.TrialStore import TrialStore
+from filters.filterBase.ComputeCore import ComputeCore
+#np.trapz was renamed in NumPy 2.0 and later removed
+trapezoid = np.trapezoid if hasattr(np, 'trapezoid') else np.trapz
+
+class RefCombo(Enum):
+  Average = 0
+  Maximum = 1
+class SharedStates(IntEnum):
+  CCEPTriggered        = 0
+  StimulatingChannel   = auto() # Auto-increment
+
+#
+# Cortico-cortical evoked potentials, without the plots: each trial is baseline-corrected,
+# filtered and kept as one (channels, samples) array, giving an area under the curve per channel
+# and the channels above threshold. The average is kept as running sums, so it costs the same
+# however many trials there are, and trials can be left out of it and put back.
+# CCEPFilter draws it, main.py --headless writes it to disk
+#
+class CCEPCore(ComputeCore):
+  filterName = "CCEPFilter"
+  sharedStates = ["CCEPTriggered", "StimulatingChannel"]
+  reliableStates = ["CCEPTriggered"] #the block after a trigger holds the CCEP, never drop it
+
+  def __init__(self, parameters=None):
+    super().__init__(parameters)
+    self.numTrigs = 0
+    self.stimChs = [] #to visualize stimulating channels if we can
+    self.latStartSamples = -5 #stimulation artifact, samples around the trigger left out of the AUC
+    self.trigSamples = 15
+    self.avgPlots = False #AUC of the average of all trials instead of the last one
+    self.stds = 2 #threshold, standard deviations of the AUCs over channels
+    self.aucThresh = 0
+    self.filters = FilterBank({'Notch': 'bandstop', 'Low Pass': 'lowpass', 'High Pass': 'highpass'})
+    self.sos = None #enabled filters as one cascade, for the sampling rate
+    self.memoryCap = 1024 #MB for the trials, raw and filtered, the oldest are given up past it
+    self.chTable = {}
+    self.rawDatabase = TrialStore(0, 0) #trials, (channels, elements) each
+    self.database = TrialStore(0, 0) #the same, filtered, in the same slots
+    self.clearAverage()
+
+  def configure(self, elements, chNames):
+    super().configure(elements, chNames)
+    self.baselineLength = self.getParameterValue("BaselineEpochLength")
+    self.ccepLength = self.getParameterValue("CCEPEpochLength")
+    self.sr = self.getParameterValue("SamplingRate")
+    self.baseSamples = self.msToSamples(self.baselineLength)
+    self.ccepSamples = self.msToSamples(self.ccepLength)
+
+    #redefine element size
+    self.elements = self.baseSamples + self.ccepSamples
+    self.x = np.linspace(-self.baselineLength, self.ccepLength, self.elements)
+    self.stimChs = []
+    self.designFilters() #for the new sampling rate
+    self.rawDatabase = TrialStore(self.channels, self.elements, self.storeBytes())
+    self.database = TrialStore(self.channels, self.elements, self.storeBytes())
+    self.data = np.zeros((self.channels, self.elements)) #last trial or average, as plotted
+    self.auc = np.zeros(self.channels)
+    self.clearAverage()
+    self.chTable = {chName: CCEPCalc(self, ch, chName) for ch, chName in enumerate(self.chNames)}
+
+  def msToSamples(self, lengthMs):
+    return int(ceil(lengthMs * self.sr/1000.0))
+
+  def receiveStates(self, state):
+    #get CCEPTriggered state to detect CCEPs
+    triggersFound = np.count_nonzero(state[SharedStates.CCEPTriggered])
+    self.numTrigs += triggersFound
+
+    #find stim ch if possible
+    if np.shape(state)[0] > 1 and triggersFound:
+      stimCh = state[SharedStates.StimulatingChannel].nonzero()[0]
+      if stimCh.any():
+        #just get first non-zero value
+        chBits = state[SharedStates.StimulatingChannel][stimCh[0]]
+        testStimChs = []
+        chBinary = '{0:08b}'.format(chBits)
+        for b in range(len(chBinary)): #32 bit state
+          if chBinary[len(chBinary) - b - 1] == '1':
+            testStimChs.append(self.chNames[b]) #append ch name
+        #minimally change used array
+        if testStimChs != self.stimChs:
+          self.stimChs = testStimChs
+
+  def detect(self, data, refIndices, combo):
+    """detection channels combined as combo, and the stimulation peaks found in them"""
+    if combo == RefCombo.Average:
+      trigData = np.mean(data[refIndices, :], axis=0)
+    else:
+      trigData = np.max(data[refIndices, :], axis=0)
+    #remove mean before peak detection
+    trigData -= np.mean(trigData)
+
+    #hard code parameters just to test
+    peaks, properties = find_peaks(trigData, 200, width=(None,20), threshold=20, distance=20)
+    print(f"Found {len(peaks)} peaks")
+    return trigData, peaks
+
+  def process(self, data, peaks=None):
+    """the block after a trigger, chunked at peaks if several were detected. None without a trigger"""
+    if self.numTrigs == 0:
+      return None
+    self.numTrigs -= 1
+    if peaks is not None and len(peaks) > 1:
+      self.chunkData(data, peaks) #chunks and computes
+    else:
+      self.computeData(data)
+    aucs = self.auc.copy()
+    significant = self.threshold()
+
+    result = {'stimulating': " ".join(self.stimChs), 'threshold': self.aucThresh, 'averaged': self.averaged,
+              'auc': aucs, 'significant': significant.astype(int)}
+    if self.keepEpochs and len(self.database):
+      result['epoch'] = self.database[-1]
+    return self.publish(result)
+
+  def computeData(self, newData):
+    """one trial of every channel, (channels, elements)"""
+    #new data, normalize amplitude with baseline data
+    if self.baseSamples == 0:
+      data = newData.copy() #newData is a pooled block that gets reused
+    else:
+      data = newData - np.median(newData[:, :self.baseSamples], axis=1, keepdims=True)
+
+    if np.shape(data)[1] != len(self.x):
+      self.logPrint(f"Expected: {np.shape(self.x)}, received: {np.shape(data)[1:]}")
+    else:
+      #filter if enabled
+      filtered = self.filterData(data)
+      if self.database.full() and self.database.included[self.database.slot(0)]:
+        self.addToAverage(self.database[0], -1) #about to be given up
+      #store data
+      self.rawDatabase.append(data)
+      self.database.append(filtered)
+      self.addToAverage(filtered)
+      if self.database.dropped == 1:
+        self.logPrint(f"Memory cap of {self.memoryCap} MB reached, keeping the last {len(self.database)} trials")
+      data = filtered
+
+    #possibly change to average, before we detect ccep
+    if self.avgPlots and self.averaged:
+      data = self.average()
+    self.data = data
+    self.computeAUC()
+
+  def computeAUC(self):
+    """area under the curve of each channel"""
+    ccepData = self.data[:, self.baseSamples+self.trigSamples:]
+    normData = ccepData - np.mean(ccepData, axis=1, keepdims=True)
+    self.auc = trapezoid(np.abs(normData), axis=1)/1e3
+
+  def threshold(self):
+    """channels whose AUC is more than stds standard deviations of all AUCs"""
+    self.aucThresh = np.std(self.auc) * self.stds
+    significant = self.auc > self.aucThresh
+    for ch, sig in zip(self.chTable.values(), significant):
+      ch.significant = bool(sig)
+    return significant
+
+  #---- average of the included trials ----#
+  def clearAverage(self):
+    self.sum = np.zeros((self.channels, self.elements))
+    self.sumSq = np.zeros((self.channels, self.elements))
+    self.averaged = 0 #trials in the sums
+    self.exclusions = [] #ids of excluded trials, last excluded last
+
+  def addToAverage(self, trial, sign=1):
+    self.sum += sign * trial
+    self.sumSq += sign * trial * trial
+    self.averaged += sign
+
+  def recomputeAverage(self):
+    """sums from the stored trials, after they were all changed"""
+    trials = self.database.filled()
+    included = trials[self.database.included[:len(trials)]]
+    self.sum, self.sumSq = self.sums(included)
+    self.averaged = len(included)
+
+  @staticmethod
+  def sums(trials):
+    """sum and sum of squares over trials"""
+    return np.sum(trials, axis=0), np.sum(trials * trials, axis=0)
+
+  def average(self):
+    """mean of the included trials, (channels, elements)"""
+    return self.sum / max(self.averaged, 1)
+
+  def sem(self):
+    """standard error of the mean of the included trials"""
+    n = self.averaged
+    if n < 2:
+      return np.zeros_like(self.sum)
+    var = np.maximum(self.sumSq - self.sum * self.sum / n, 0) / (n - 1)
+    return np.sqrt(var / n)
+
+  def exclude(self, i=-1):
+    """leave trial i out of the average, oldest first or negative from the newest. False if it already was"""
+    if not len(self.database) or not self.database.setIncluded(i, False):
+      return False
+    self.addToAverage(self.database[i], -1)
+    self.exclusions.append(self.database.trialId(i))
+    self.updateAverage()
+    return True
+
+  def include(self, i):
+    """put trial i back into the average. False if it was in it"""
+    if self.database.setIncluded(i, True):
+      return False
+    self.addToAverage(self.database[i])
+    trialId = self.database.trialId(i)
+    self.exclusions = [e for e in self.exclusions if e != trialId]
+    self.updateAverage()
+    return True
+
+  def undoExclusion(self):
+    """put the trial excluded last back, if it is still stored. Returns its index, or None"""
+    while self.exclusions:
+      i = self.database.position(self.exclusions[-1])
+      if i is not None and self.include(i):
+        return i
+      self.exclusions.pop() #given up to the memory cap
+    return None
+
+  def updateAverage(self):
+    """AUCs and significance after the average changed"""
+    if self.avgPlots:
+      self.data = self.average()
+      self.computeAUC()
+      self.threshold()
+
+  def filterData(self, data):
+    """enabled filters along the samples, of one or more channels and trials"""
+    return FilterBank.apply(self.sos, data)
+
+  def chunkData(self, newData, peaks):
+    for peak in peaks:
+      self.computeData(newData[:, peak - self.baseSamples : peak + self.ccepSamples])
+
+  def designFilters(self):
+    """cascade of the enabled filters, turning off those that do not fit the sampling rate"""
+    for name, cutOff in self.filters.enabled().items():
+      try:
+        self.filters.design(self.filters.types[name], cutOff, self.sr)
+      except ValueError as e:
+        self.logPrint(f"{name} turned off: {e}")
+        self.filters.set(name, None)
+    self.sos = self.filters.cascade(self.sr)
+
+  def setFilter(self, name, cutOff, refilter=True):
+    """enable a filter at cutOff Hz, or disable it with None. New trials are filtered with it,
+    the trials so far now, or later through refilterJob.
+    ValueError if cutOff does not fit the sampling rate, nothing is changed then"""
+    if cutOff is not None and hasattr(self, 'sr'):
+      self.filters.design(self.filters.types[name], cutOff, self.sr)
+    self.filters.set(name, cutOff)
+    if hasattr(self, 'sr'):
+      self.designFilters()
+
+    #change past data, all trials at once
+    if refilter and len(self.rawDatabase):
+      filtered = self.database.filled()
+      filtered[:] = self.filterData(self.rawDatabase.filled())
+      self.recomputeAverage()
+      self.data = self.average()
+
+  def refilterJob(self):
+    """worker re-filtering the stored trials with the current filters, reading them from the store.
+    None without trials. Run it in another thread, then hand it to applyRefilter"""
+    if not len(self.rawDatabase):
+      return None
+    sos = self.sos
+    included = self.database.included[:self.database.count].copy()
+    worker = RefilterWorker(self.rawDatabase.filled(), self.rawDatabase.ids(), lambda data: FilterBank.apply(sos, data),
+                            lambda filtered: self.sums(filtered[included]))
+    worker.appended, worker.included = self.database.appended, included #to tell if the store changed since
+    return worker
+
+  def applyRefilter(self, worker):
+    """swap in the trials a RefilterWorker filtered, those given up meanwhile are skipped"""
+    unchanged = worker.appended == self.database.appended and len(worker.ids) == len(self.database)
+    if unchanged:
+      self.database.filled()[:] = worker.filtered
+    else:
+      positions = self.database.positions(worker.ids)
+      kept = positions >= 0
+      slots = [self.database.slot(i) for i in positions[kept]]
+      self.database.buffer[slots] = worker.filtered[kept]
+
+    #sums from the worker, unless trials came, went, or were excluded meanwhile
+    if unchanged and np.array_equal(worker.included, self.database.included[:self.database.count]):
+      self.sum, self.sumSq = worker.summary
+      self.averaged = np.count_nonzero(worker.included)
+    else:
+      self.recomputeAverage()
+    self.data = self.average()
+
+  def setMask(self, latStartSamples, trigSamples):
+    """samples from the trigger to leave out of the AUC, for the stimulation artifact"""
+    self.latStartSamples = latStartSamples
+    self.trigSamples = trigSamples
+
+  def storeBytes(self):
+    return self.memoryCap * 2**20 // 2 #raw and filtered
+
+  def setMemoryCap(self, megabytes):
+    """memory for the trials, raw and filtered. Past it the oldest trials are given up"""
+    self.memoryCap = megabytes
+    for store in (self.rawDatabase, self.database):
+      store.setMaxBytes(self.storeBytes())
+    if len(self.database):
+      self.recomputeAverage()
+
+  def clear(self):
+    """forget all trials"""
+    self.rawDatabase.clear()
+    self.database.clear()
+    self.clearAverage()
+    for ch in self.chTable.values():
+      ch.significant = False
+
+  def finish(self):
+    if not self.averaged:
+      return {}
+    return {'average': self.average(), 'sem': self.sem(), 'time': self.x}
+
+#one channel of the core's trials, for its plot and table row
+class CCEPCalc():
+  def __init__(self, parent, ch, title):
+    self.p = parent
+    self.ch = ch
+    self.name = title
+    self.significant = False
+    self.selected = False
+
+  #trials x samples, oldest first
+  @property
+  def database(self):
+    return self.p.database.last()[:, self.ch]
+  @property
+  def rawDatabase(self):
+    return self.p.rawDatabase.last()[:, self.ch]
+  @property
+  def included(self):
+    return self.p.database.mask()
+  @property
+  def data(self):
+    return self.p.data[self.ch]
+  @property
+  def auc(self):
+    return self.p.auc[self.ch]
@@ -0,0 +1,44 @@
+import numpy as np
+from scipy.signal import butter, sosfiltfilt
+
+#
+# Butterworth filters by name, at any cutoff. Designs are second-order sections cached by
+# (type, cutoff, sampling rate), so going back to a cutoff costs nothing, and the enabled
+# filters are cascaded into one chain, run forward and backward in a single pass
+#
+class FilterBank():
+  order = 2
+  notchWidth = 5 #Hz either side of a notch
+  padType = 'even' #odd extension of a whole cascade leaves larger edge transients on short epochs
+
+  def __init__(self, types):
+    self.types = dict(types) #name: butter btype
+    self.cutOffs = {name: None for name in self.types} #Hz, None when off
+    self.cache = {}
+
+  def design(self, btype, cutOff, sr):
+    """second-order sections of one filter, ValueError if cutOff does not fit sr"""
+    key = (btype, cutOff, sr)
+    if key not in self.cache:
+      nyquist = sr / 2
+      f = np.array([cutOff - self.notchWidth, cutOff + self.notchWidth]) if btype == 'bandstop' else np.array(cutOff)
+      if np.any(f <= 0) or np.any(f >= nyquist):
+        raise ValueError(f"{cutOff} Hz does not fit a {sr} Hz sampling rate")
+      self.cache[key] = butter(self.order, f / nyquist, btype=btype, output='sos')
+    return self.cache[key]
+
+  def set(self, name, cutOff):
+    self.cutOffs[name] = cutOff
+
+  def enabled(self):
+    return {name: cutOff for name, cutOff in self.cutOffs.items() if cutOff is not None}
+
+  def cascade(self, sr):
+    """sections of every enabled filter as one chain, None if none are"""
+    sections = [self.design(self.types[name], cutOff, sr) for name, cutOff in self.enabled().items()]
+    return np.vstack(sections) if sections else None
+
+  @staticmethod
+  def apply(sos, data):
+    """a cascade forward and backward along the samples, of one or more channels and trials"""
+    return data if sos is None else sosfiltfilt(sos, data, axis=-1, padtype=FilterBank.padType)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from filters.filterBase.ComputeCore import ComputeCore
+
+#
+# Phase-amplitude coupling, without the plots: each block holds amplitude by phase bin per channel,
+# its modulation vector is the amplitude weighted mean of the bin phases.
+# PACFilter draws it, main.py --headless writes it to disk
+#
+class PACCore(ComputeCore):
+  filterName = "PACFilter"
+
+  def configure(self, elements, chNames):
+    super().configure(elements, chNames)
+    elWidth = np.pi/self.elements
+    self.phis = np.linspace(-np.pi+elWidth, np.pi-elWidth, self.elements)
+    self.bins = np.exp(1j*self.phis)
+    self.zMod = np.zeros(self.channels, dtype=complex)
+    self.sum = np.zeros(self.channels, dtype=complex)
+
+  def process(self, data):
+    """modulation vector of every channel for one block"""
+    self.zMod = data @ self.bins / (2*self.elements)
+    self.sum += self.zMod
+    return self.publish({'modulus': np.abs(self.zMod), 'phase': np.angle(self.zMod)})
+
+  def finish(self):
+    if self.trials == 0:
+      return {}
+    mean = self.sum / self.trials
+    return {'meanModulus': np.abs(mean), 'meanPhase': np.angle(mean)}
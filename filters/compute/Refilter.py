@@ -0,0 +1,56 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+#
+# Re-filters stored trials in the background when a filter changes.
+# Chunks of trials are filtered along their samples on a pool of threads, while the plots
+# keep showing the old trials. Progress is reported per chunk, and the job stops early
+# when cancelled, e.g. by the next filter change.
+# raw is read as it is stored, not copied: trials given up and overwritten meanwhile are
+# filtered too, and left out when the results are swapped in (see CCEPCore.applyRefilter)
+#
+class RefilterWorker(QObject):
+  progress = pyqtSignal(int) #0-100
+  done     = pyqtSignal(object) #this worker, with filtered and summary set. Not emitted if cancelled
+  finished = pyqtSignal()
+
+  def __init__(self, raw, ids, filterData, summarize=None, workers=None, chunkTrials=8):
+    super().__init__()
+    self.raw = raw #trials, (channels, samples) each, a view of the store
+    self.ids = ids #trial id of each
+    self.filterData = filterData #designs of the filters when the job was made
+    self.summarize = summarize #of the filtered trials, also off the caller's thread
+    self.workers = workers or os.cpu_count() or 1
+    self.chunkTrials = chunkTrials
+    self.cancelled = False
+    self.filtered = None
+    self.summary = None
+
+  def cancel(self):
+    self.cancelled = True
+
+  def filterChunk(self, out, start, stop):
+    if not self.cancelled:
+      out[start:stop] = self.filterData(self.raw[start:stop])
+
+  def run(self):
+    try:
+      out = np.empty(self.raw.shape, self.raw.dtype)
+      chunks = [(s, min(s + self.chunkTrials, len(self.raw))) for s in range(0, len(self.raw), self.chunkTrials)]
+      with ThreadPoolExecutor(self.workers) as pool:
+        jobs = [pool.submit(self.filterChunk, out, start, stop) for start, stop in chunks]
+        for i, job in enumerate(jobs):
+          job.result()
+          if self.cancelled:
+            for j in jobs:
+              j.cancel()
+            return
+          self.progress.emit(int(100 * (i + 1) / len(jobs)))
+      if self.summarize is not None:
+        self.summary = self.summarize(out)
+      self.filtered = out
+      self.done.emit(self)
+    finally:
+      self.finished.emit()
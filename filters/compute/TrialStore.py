@@ -0,0 +1,136 @@
+import numpy as np
+
+#
+# Trials of every channel in one preallocated (trials, channels, samples) array.
+# Capacity doubles when full, so appending is amortized O(1). Once the buffer reaches maxBytes
+# it is used as a ring: each new trial takes the place of the oldest, and memory stays flat
+# through long sessions. Trials can be left out of averages without being removed
+#
+class TrialStore():
+  def __init__(self, channels, samples, maxBytes=512 * 2**20, dtype=np.float64, capacity=8):
+    self.shape = (channels, samples)
+    self.dtype = np.dtype(dtype)
+    self.trialBytes = max(channels * samples * self.dtype.itemsize, 1)
+    self.maxBytes = maxBytes
+    self.initial = capacity
+    self.buffer = np.empty((min(capacity, self.maxTrials),) + self.shape, self.dtype)
+    self.included = np.ones(len(self.buffer), dtype=bool) #by slot
+    self.start = 0 #slot of the oldest trial
+    self.count = 0
+    self.appended = 0 #trials ever appended, ids count from 0
+    self.dropped = 0 #oldest trials given up to the memory cap since the last clear
+
+  @property
+  def maxTrials(self):
+    return max(int(self.maxBytes // self.trialBytes), 1)
+
+  @property
+  def nbytes(self):
+    return self.buffer.nbytes
+
+  def __len__(self):
+    return self.count
+
+  def __getitem__(self, i):
+    """trial i, oldest first, negative from the newest"""
+    return self.buffer[self.slot(i)]
+
+  def slot(self, i):
+    if i < 0:
+      i += self.count
+    if not 0 <= i < self.count:
+      raise IndexError(f"trial {i} of {self.count}")
+    return (self.start + i) % len(self.buffer)
+
+  def full(self):
+    """True if the next trial takes the place of the oldest"""
+    return self.count == len(self.buffer) >= self.maxTrials
+
+  def trialId(self, i):
+    """id of trial i, kept while it is stored"""
+    self.slot(i) #in range
+    return self.appended - self.count + (i + self.count if i < 0 else i)
+
+  def position(self, trialId):
+    """index of a trial by id, oldest first, None if it was given up"""
+    i = trialId - (self.appended - self.count)
+    return i if 0 <= i < self.count else None
+
+  def ids(self):
+    """trial ids of filled(), slot by slot"""
+    return self.appended - self.count + (np.arange(self.count) - self.start) % len(self.buffer)
+
+  def positions(self, ids):
+    """indices of trials by id, oldest first, -1 for those given up"""
+    i = np.asarray(ids) - (self.appended - self.count)
+    return np.where((i >= 0) & (i < self.count), i, -1)
+
+  def setIncluded(self, i, included):
+    """include trial i in averages or not, returns whether it was"""
+    slot = self.slot(i)
+    was = bool(self.included[slot])
+    self.included[slot] = included
+    return was
+
+  def mask(self):
+    """included flags, oldest first"""
+    return self.included[self.slots(self.count)]
+
+  def slots(self, n):
+    """slots of the newest n trials, oldest first"""
+    return (self.start + np.arange(self.count - n, self.count)) % len(self.buffer)
+
+  def append(self, trial):
+    """copy a (channels, samples) trial in, returns the slot it went to"""
+    capacity = len(self.buffer)
+    if self.count == capacity:
+      if capacity < self.maxTrials:
+        self.resize(min(2 * capacity, self.maxTrials))
+      else:
+        #full, the oldest trial makes room
+        self.start = (self.start + 1) % capacity
+        self.count -= 1
+        self.dropped += 1
+    slot = (self.start + self.count) % len(self.buffer)
+    self.buffer[slot] = trial
+    self.included[slot] = True
+    self.count += 1
+    self.appended += 1
+    return slot
+
+  def last(self, n=None):
+    """the newest n trials, all by default, oldest first. A view unless they wrap around the buffer end"""
+    n = self.count if n is None else max(min(n, self.count), 0)
+    first = (self.start + self.count - n) % len(self.buffer)
+    if first + n <= len(self.buffer):
+      return self.buffer[first:first + n]
+    return np.concatenate((self.buffer[first:], self.buffer[:first + n - len(self.buffer)]))
+
+  def filled(self):
+    """every trial, in buffer order rather than by age: a view for reductions over trials and in-place updates,
+    included[:len(store)] flags them. Stores appended to together keep their trials in the same slots"""
+    #trials only wrap around once the buffer is full
+    return self.buffer[:self.count]
+
+  def resize(self, capacity):
+    """move the trials to a buffer of capacity, oldest first, keeping the newest if they do not fit"""
+    keep = min(self.count, capacity)
+    buffer = np.empty((capacity,) + self.shape, self.dtype)
+    buffer[:keep] = self.last(keep)
+    included = np.ones(capacity, dtype=bool)
+    included[:keep] = self.included[self.slots(keep)]
+    self.dropped += self.count - keep
+    self.buffer, self.included, self.start, self.count = buffer, included, 0, keep
+
+  def setMaxBytes(self, maxBytes):
+    self.maxBytes = maxBytes
+    if len(self.buffer) > self.maxTrials:
+      self.resize(self.maxTrials)
+
+  def clear(self):
+    """forget every trial and give the memory back"""
+    self.buffer = np.empty((min(self.initial, self.maxTrials),) + self.shape, self.dtype)
+    self.included = np.ones(len(self.buffer), dtype=bool)
+    self.start = 0
+    self.count = 0
+    self.dropped = 0 #counts again, appended stays monotonic as trial ids depend on it
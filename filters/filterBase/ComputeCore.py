@@ -0,0 +1,62 @@
+from abc import abstractmethod
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from filters.filterBase.ParameterStore import ParameterStore
+
+#
+# Signal processing of a filter, without widgets.
+# The filter feeds it blocks and draws its results; a headless run (main.py --headless)
+# feeds it straight from the data stream and writes its results to disk (see ResultWriter).
+# Results are dicts holding 'trial' and named values: scalars, per-channel vectors,
+# or (channels, samples) arrays
+#
+class ComputeCore(QObject):
+  resultSignal = pyqtSignal(object) #dict, once per trial
+  printSignal  = pyqtSignal(str)
+  filterName = "" #filter the core computes for, its BCI2000 share point
+  sharedStates = []
+  reliableStates = []
+
+  def __init__(self, parameters=None):
+    super().__init__()
+    #shared with the filter, if there is one
+    self.parameters = ParameterStore() if parameters is None else parameters
+    self.chNames = []
+    self.channels = 0
+    self.elements = 0
+    self.trials = 0
+    self.keepEpochs = False #add each trial's epochs to its result, not only what is computed from them
+
+  def configure(self, elements, chNames):
+    """new signal properties, parameters of the same SetConfig are known by now"""
+    self.elements = elements
+    self.chNames = list(chNames)
+    self.channels = len(self.chNames)
+
+  @abstractmethod
+  def process(self, data):
+    """one block, (channels, elements). Returns the result it published, or None"""
+    pass
+
+  def receiveStates(self, state):
+    pass
+
+  def finish(self):
+    """results once the stream ended, written next to the trial results"""
+    return {}
+
+  def publish(self, result):
+    self.trials += 1
+    result = {'trial': self.trials, **result}
+    self.resultSignal.emit(result)
+    return result
+
+  def logPrint(self, msg):
+    self.printSignal.emit(msg)
+
+  def getParameterValue(self, pName):
+    """float for scalars, NumPy array for numeric lists and matrices"""
+    v = self.parameters.value(pName)
+    if isinstance(v, (int, float)):
+      return float(v)
+    return v
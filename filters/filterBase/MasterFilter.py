@@ -1,9 +1,10 @@
 
-from PyQt5.QtCore import QThread, pyqtSignal
 import pyqtgraph as pg
 from PyQt5.QtCore import pyqtSignal
 from base.SharedVisualization import Group
-import importlib
+from dataThreads.streamBase.AcquisitionHub import AcquisitionHub
+from dataThreads.streamBase.BlockDelivery import BlockDelivery, DeliveryPolicy
+from filters.filterBase.ParameterStore import ParameterStore
 import traceback
 from abc import abstractmethod
 
@@ -12,6 +13,8 @@ from abc import abstractmethod
 class MasterFilter(Group):
   chNamesSignal = pyqtSignal(list)
   dataProcessedSignal = pyqtSignal(object) #1D array: size=channels
+  #how data blocks reach plot when it is slower than the block rate, saved per filter
+  deliveryPolicy = DeliveryPolicy.Every #filters that only show the newest data may opt in to dropping blocks
 
   @abstractmethod
   def plot(self, data):
@@ -28,102 +31,83 @@ class MasterFilter(Group):
   def sharedStates(self):
     pass
 
+  #shared states that mark the next data block as one that must not be dropped
+  @property
+  def reliableStates(self):
+    return []
+
   def __init__(self, area, bciPath, stream):
     self.bciPath = bciPath
     self.streamName = stream
     super().__init__(area)
     self.elecDict = {}
   def publish(self):
-    #initialize desired communication
-    self.comm = self.setDataStream(self.bciPath, self.streamName[0], self.streamName[1])
-
-    #data thread
-    self.t2 = QThread()
-    self.comm.acqThr.moveToThread(self.t2)
-    self.t2.started.connect(self.comm.acqThr.run)
-    self.comm.acqThr.propertiesSignal.connect(self.propertiesAcquired)
-    self.comm.acqThr.dataSignal.connect(self.plot)
-    self.comm.acqThr.stateSignal.connect(self.receiveStates)
-    self.comm.acqThr.parameterSignal.connect(self.parameterReceived)
-    self.comm.acqThr.printSignal.connect(self.logPrint)
-    self.comm.acqThr.disconnected.connect(self.resetConnection)
-
-    #BCI2000
-    self.t1 = QThread()
-    self.comm.worker.moveToThread(self.t1)
-    self.t1.started.connect(self.comm.worker.run)
-    self.comm.worker.initSignal.connect(self.getParameters)
-    self.comm.worker.logPrint.connect(self.logPrint)
-    print("starting BCI2000 thread")
-    self.t1.start()
-
-    #holds all parameters sent by signal sharing
-    self.parameters = {}
-
-    self.address = ('', 0) #default address if none provided
+    #holds all parameters sent by signal sharing, decoded. Filters may subscribe to changes
+    self.parameters = ParameterStore()
+
+    #data comes through the window's acquisition hub, shared with filters on the same stream
+    self.hub = getattr(self.win, 'hub', None)
+    if self.hub is None:
+      self.hub = AcquisitionHub(self.logPrint)
+    self.connection = self.hub.open(self.bciPath, self.streamName, self.__class__.__name__, self.sharedStates)
+    self.comm = self.connection.comm
+    self.timing = self.comm.acqThr.timing
+    self.plotStages = (self.__class__.__name__ + ' plot start', self.__class__.__name__ + ' plot end')
+
+    reliable = [self.sharedStates.index(s) for s in self.reliableStates]
+    self.delivery = BlockDelivery(self.comm.acqThr, self.deliveryPolicy, reliableStates=reliable)
+    self.delivery.propertiesSignal.connect(self.propertiesAcquired)
+    self.delivery.dataSignal.connect(self.receiveData)
+    self.delivery.stateSignal.connect(self.receiveStates)
+    self.delivery.parameterSignal.connect(self.parameterReceived)
+    self.connection.subscribe(self.delivery, self.sharedStates)
+  def loadSettings(self):
+    super().loadSettings()
+    self.delivery.policy = DeliveryPolicy[self.settings.value("blockDelivery", self.deliveryPolicy.name)]
+  def saveSettings(self):
+    super().saveSettings()
+    self.settings.setValue("blockDelivery", self.delivery.policy.name)
   def setConfig(self):
     self.logPrint(f'Acquiring {self.channels} channels')
     self.chNamesSignal.emit(self.chNames)
     pass
 
-  def resetConnection(self):
-    try: #try to reset connection to BCI2000 if we can
-      if not self.comm.worker.bci.GetSystemState() == "Resting":
-        self.t1.sleep(1)
-        self.comm.worker.startRemote()
-        self.t1.quit()
-        self.t1.wait()
-        self.t1.start()
-    except:
-      pass
-
   def stop(self):
-    print("STOPPING")
-    self.comm.worker.stop()
-    self.comm.acqThr.stop()
-    #stop BCI2000 thread
-    self.t1.quit()
-    #stop data acquisition
-    self.t2.quit()
-    #wait for both threads to exit
-    self.t1.wait()
-    self.t2.wait()
-  
-  def getParameters(self, addy):
-    newAddy = addy.split(':')
-    if newAddy != self.address:
-      self.address = newAddy
-    self.t1.quit()
-    self.comm.acqThr.initalize(self.address)
-    print("starting data thread")
-    self.t2.start()
+    #the connection stays open while other filters use it
+    self.hub.release(self.connection, self.delivery)
   
+  def receiveData(self, data):
+    arrival = self.timing.arrival(data)
+    self.timing.current = arrival #for the brain window, plotted from here
+    self.timing.record(self.plotStages[0], arrival)
+    try:
+      self.plot(data)
+    finally:
+      self.timing.record(self.plotStages[1], arrival)
+      #data is a pooled snapshot, hand it back to the acquisition thread
+      self.comm.acqThr.releaseBlock(data)
+
   def propertiesAcquired(self, el, chNames):
     print("props acquired")
+    self.properties = (el, chNames) #as received, filters may redefine elements
     self.channels = len(chNames)
     self.elements = el
     self.chNames = chNames
     self.setConfig()
 
   def parameterReceived(self, param):
-    self.parameters[param['name']] = param
+    self.parameters.update(param)
 
   def getParameterValue(self, pName):
-    p = self.parameters[pName]
-    return float(p['val'])
+    """float for scalars, NumPy array for numeric lists and matrices"""
+    v = self.parameters.value(pName)
+    if isinstance(v, (int, float)):
+      return float(v)
+    return v
 
   def logPrint(self, msg):
     self.win.output.append(">>" + msg)
     self.win.output.moveCursor(pg.QtGui.QTextCursor.End)
 
-  def setDataStream(self, bciPath, path, file):
-    try:
-      mod = importlib.import_module(path + "." + file)
-      return mod.__dict__[file](bciPath, self.__class__.__name__, self.sharedStates)
-    except:
-      #self.logPrint(f"Data thread could not be loaded! Chosen stream: {file}")
-      traceback.print_exc()
-
-  ##--slots, inherited by filters--##
   def acceptElecNames(self, elecDict):
     self.elecDict = elecDict
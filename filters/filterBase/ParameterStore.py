@@ -0,0 +1,89 @@
+import numpy as np
+
+#
+# BCI2000 parameters received through signal sharing, by name.
+# Values are decoded once on arrival: int and float parameters to numbers,
+# numeric lists and matrices to NumPy arrays, everything else is kept as strings.
+# Reads like a dict of the raw records from ParseParam, and tells subscribers when a value changes.
+#
+class Parameter():
+  def __init__(self, rec):
+    self.rec = rec #raw record, as parsed
+    self.name = rec['name']
+    self.type = rec['type']
+    self.value = decodeValue(rec, 'val')
+    self.scaled = decodeValue(rec, 'scaled') #DecodeUnits scaling: times in ms, frequencies in Hz, voltages in muV
+    self.units = rec.get('units', None)
+
+def decodeValue(rec, key):
+  """typed value of a parsed parameter: scalar, NumPy array for numeric lists/matrices, strings otherwise"""
+  val = rec[key]
+  #lists of strings stay strings (channel names may look like numbers), matrices are untyped in BCI2000
+  numeric = rec['type'].endswith('matrix') or (rec['type'].endswith('list') and rec.get('valtype', str) is not str)
+  if numeric:
+    try:
+      return np.array(val, dtype=float)
+    except (TypeError, ValueError):
+      return val #e.g., "auto" entries
+  return val
+
+class ParameterStore():
+  def __init__(self):
+    self.params = {}
+    self.subscribers = {} #parameter name -> callbacks
+
+  #dict of raw records, as MasterFilter.parameters used to be
+  def __getitem__(self, name):
+    return self.params[name].rec
+  def __contains__(self, name):
+    return name in self.params
+  def __iter__(self):
+    return iter(self.params)
+  def __len__(self):
+    return len(self.params)
+  def keys(self):
+    return self.params.keys()
+  def values(self):
+    return [p.rec for p in self.params.values()]
+  def items(self):
+    return [(n, p.rec) for n, p in self.params.items()]
+
+  def update(self, rec):
+    """store a parsed parameter, notifying subscribers if its value changed. Returns True if it did"""
+    name = rec['name']
+    old = self.params.get(name)
+    if old is not None and old.rec['valstr'] == rec['valstr']:
+      old.rec = rec #BCI2000 sends every parameter at each SetConfig, mostly unchanged
+      return False
+    param = Parameter(rec)
+    self.params[name] = param
+    for callback in list(self.subscribers.get(name, [])):
+      callback(name, param.value)
+    return True
+
+  def value(self, name):
+    """decoded value"""
+    return self.params[name].value
+  def scaled(self, name):
+    """decoded value in the units DecodeUnits scales to"""
+    return self.params[name].scaled
+  def units(self, name):
+    return self.params[name].units
+  def parameter(self, name):
+    return self.params[name]
+
+  def subscribe(self, names, callback):
+    """call callback(name, value) whenever one of the parameters changes, now for those already known"""
+    for name in names:
+      self.subscribers.setdefault(name, []).append(callback)
+    for name in names:
+      if name in self.params:
+        callback(name, self.params[name].value)
+
+  def unsubscribe(self, callback):
+    for callbacks in self.subscribers.values():
+      while callback in callbacks:
+        callbacks.remove(callback)
+
+  def clear(self):
+    self.params.clear()
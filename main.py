@@ -1,16 +1,26 @@
 import pyqtgraph as pg
+import argparse
+import ast
 import os
+import sys
+import time
 import importlib
+import threading
 import traceback
+from PyQt5.QtCore import pyqtSignal
 
-from base.Brain import BrainWindow
+from base.LazyBrain import LazyBrain
+from base.Performance import PerformanceWindow
 from base.SharedVisualization import Window, MyDockArea, TextOutput
 from pyqtgraph.dockarea import *
 from base.SharedVisualization import Group
+from dataThreads.streamBase.AcquisitionHub import AcquisitionHub
+from dataThreads.streamBase.Recorder import SessionRecorder
 
 #class to initialize filters and 3d visualizations
-protectedDocks = ["Load", "Log", "Brain"]
+protectedDocks = ["Load", "Log", "Brain", "Performance"]
 class MainWindow(Window):
+  warmedUp = pyqtSignal(list) #saved filters, imported in the background
   def __init__(self):
     self.area = MyDockArea()
     super().__init__()
@@ -28,45 +38,70 @@ class MainWindow(Window):
     button_action = pg.QtWidgets.QAction("Choose BCI2000 Location...", self)
     button_action.setStatusTip("BCI2000 directory location")
     file_menu.addAction(button_action)
+    self.recordAction = pg.QtWidgets.QAction("Record Session...", self)
+    self.recordAction.setStatusTip("Record the data stream to a file for the Replay data stream")
+    self.recordAction.setCheckable(True)
+    self.recordAction.triggered.connect(self.toggleRecording)
+    file_menu.addAction(self.recordAction)
+    self.recorder = None
+    seekAction = pg.QtWidgets.QAction("Seek Playback...", self)
+    seekAction.setStatusTip("Continue the data file being played from another time")
+    seekAction.triggered.connect(self.seekPlayback)
+    file_menu.addAction(seekAction)
+    #data streams, shared by all running filters
+    self.hub = AcquisitionHub(self.logPrint)
+    self.mods = {} #running filters by name
+    self.mod = None #filter shown on the brain and recorded, the last one started
+    self.filterDocks = {} #docks each running filter added
     self.filters = {}
     self.streams = {}
     self.selStream = ['dataThreads', ''] #path, data stream name
 
-    #initialize 3d window
-    self.b = BrainWindow(self)
+    #initialize 3d window, OpenGL is loaded with the first brain
+    self.b = LazyBrain(self)
 
     #connect windows to toolbar
     button_action.triggered.connect(self.loadOperatorPath)
     #add filters to toolbar
     filterMenu = menu.addMenu("&Filters")
     filterNames = getFiles(self.fPath, ["filterBase"])
-    for fName in filterNames:
+    for fName, tip in filterNames.items():
       filterBut = pg.QtWidgets.QAction(fName, self)
+      filterBut.setStatusTip(tip)
       filterBut.setCheckable(True)
-      filterBut.triggered.connect(lambda checked, i=fName: self.runFilter(i))
+      filterBut.triggered.connect(lambda checked, i=fName: self.toggleFilter(i, checked))
 
       filterMenu.addAction(filterBut)
       self.filters[fName] = filterBut
 
     #add data stream options to toolbar
     dataMenu = menu.addMenu("&Data Streams")
-    streamNames = getFiles(self.selStream[0], ["AbstractClasses.py"])
-    for sName in streamNames:
+    streamNames = getFiles(self.selStream[0], ["AbstractClasses.py", "streamBase"])
+    for sName, tip in streamNames.items():
       s = pg.QtWidgets.QAction(sName, self)
+      s.setStatusTip(tip)
       s.setCheckable(True)
       s.triggered.connect(lambda checked, i=sName: self.setDataThread(i))
 
       dataMenu.addAction(s)
       self.streams[sName] = s
 
+    #latency of blocks on their way to the screen
+    self.perf = PerformanceWindow(self, self.b.dock)
+
     #add log last
     self.area.addDock(Dock("Log", widget=self.output), position='above', relativeTo=self.b.dock)
+    self.warmedUp.connect(self.startSaved)
   def connectSetConfig(self, chNames):
     self.b.setConfig(chNames)
   def closeEvent(self, event): #overrides QMainWindow closeEvent
     #self.f.saveSettings()
+    self.stopRecording()
     self.b.saveSettings()
     super().closeEvent(event)
+    for name in list(self.mods):
+      self.stopFilter(name)
+    self.hub.stop()
   def setDataThread(self, stream):
     self.selStream[1] = stream
     #reset selection
@@ -74,34 +109,31 @@ class MainWindow(Window):
       s.setChecked(False)
     self.streams[stream].setChecked(True)
 
+  def toggleFilter(self, file, checked):
+    if checked:
+      self.runFilter(file)
+    else:
+      self.stopFilter(file)
+
   def runFilter(self, file):
+    """start a filter next to the ones running, it becomes the one shown on the brain"""
     if self.bciPath == "":
       #no operator path set
       self.logPrint("BCI2000 IS NOT SET. Choose the path first.")
       self.filters[file].setChecked(False)
       return False
+    if file in self.mods:
+      self.filters[file].setChecked(True)
+      return True
     mod = self.fPath + "." + file
     try:
-      if hasattr(self, "mod"):
-        #close past connection
-        self.mod.stop()
-        #attempt to delete all docks but protected ones
-        docks = self.area.findAll()[1]
-        for d in docks:
-          if d not in protectedDocks:
-            docks[d].close()
-        self.area.apoptose()
-      
+      before = set(id(d) for d in self.area.findAll()[1].values())
       filterModule = importlib.import_module(mod) #in filters folder
-      self.mod = filterModule.__dict__[file](self.win, self.bciPath, self.selStream) #assumes class is same name as file
-
-      #connect windows
-      self.mod.chNamesSignal.connect(self.b.setConfig)
-      self.mod.dataProcessedSignal.connect(self.b.plot)
-      self.b.emitElectrodeNames.connect(self.mod.acceptElecNames)
+      newMod = filterModule.__dict__[file](self.win, self.bciPath, self.selStream) #assumes class is same name as file
+      self.filterDocks[file] = [d for d in self.area.findAll()[1].values() if id(d) not in before]
+      self.mods[file] = newMod
+      self.showOnBrain(newMod)
 
-      for b in self.filters.values():
-        b.setChecked(False)
       self.filters[file].setChecked(True)
       return True
     except:
@@ -110,6 +142,78 @@ class MainWindow(Window):
       self.filters[file].setChecked(False)
       return False
 
+  def stopFilter(self, file):
+    """stop a running filter and close its docks, the data stream stays open"""
+    if file not in self.mods:
+      return
+    oldMod = self.mods.pop(file)
+    if oldMod is self.mod:
+      #recording follows the filter it was started for
+      self.stopRecording()
+      self.showOnBrain(next(reversed(self.mods.values()), None))
+    oldMod.stop()
+    for d in self.filterDocks.pop(file, []):
+      if d.name() not in protectedDocks:
+        d.close()
+    self.area.apoptose()
+    self.filters[file].setChecked(False)
+
+  def showOnBrain(self, newMod):
+    """connect the brain window to one filter"""
+    if self.mod is not None:
+      self.mod.chNamesSignal.disconnect(self.b.setConfig)
+      self.mod.dataProcessedSignal.disconnect(self.b.plot)
+      self.b.emitElectrodeNames.disconnect(self.mod.acceptElecNames)
+    self.mod = newMod
+    if newMod is not None:
+      #connect windows
+      newMod.chNamesSignal.connect(self.b.setConfig)
+      newMod.dataProcessedSignal.connect(self.b.plot)
+      self.b.emitElectrodeNames.connect(newMod.acceptElecNames)
+    self.b.timing = newMod.timing if newMod is not None else None
+
+  def toggleRecording(self, checked):
+    if not checked:
+      self.stopRecording()
+      return
+    if self.mod is None:
+      self.logPrint("Choose a filter before recording")
+      self.recordAction.setChecked(False)
+      return
+    path, _ = pg.QtWidgets.QFileDialog.getSaveFileName(self, "Record Session", "", "Session recording (*.vbr)")
+    if path == "":
+      self.recordAction.setChecked(False)
+      return
+    self.recorder = SessionRecorder(path, self.mod.sharedStates)
+    #a recording started mid-session begins with the configuration received so far
+    for param in self.mod.parameters.values():
+      self.recorder.writeParameter(param)
+    if hasattr(self.mod, "properties"):
+      self.recorder.writeProperties(*self.mod.properties)
+    self.recorder.attach(self.mod.comm.acqThr)
+    self.logPrint(f"Recording session to {path}")
+
+  def seekPlayback(self):
+    conns = self.hub.seekable()
+    if not conns:
+      self.logPrint("No data file is playing")
+      return
+    acqThr = conns[0].acqThr
+    seconds, ok = pg.QtWidgets.QInputDialog.getDouble(self, "Seek Playback", f"Play from (s), {acqThr.duration:.1f} s in the file",
+                                                      acqThr.position, 0.0, max(acqThr.duration, 0.0), 1)
+    if not ok:
+      return
+    for conn in conns:
+      conn.seek(seconds)
+    self.logPrint(f"Playback continues at {seconds:.1f} s")
+
+  def stopRecording(self):
+    if self.recorder is not None:
+      self.recorder.close()
+      self.logPrint(f"Recorded {self.recorder.blocks} blocks to {self.recorder.path}")
+      self.recorder = None
+    self.recordAction.setChecked(False)
+
   def loadOperatorPath(self):
     #ask for file name
     file_dialog = pg.QtWidgets.QFileDialog()
@@ -126,9 +230,13 @@ class MainWindow(Window):
       #self.bciName.setText(p)
       if p != self.bciPath:
         self.bciPath = p
-        if hasattr(self, 'mod'):
-          #path has changed, reset filter with new operator
-          self.runFilter(self.mod.__class__.__name__)
+        #path has changed, reset filters with new operator
+        running = list(self.mods)
+        for name in running:
+          self.stopFilter(name)
+        self.hub.stop()
+        for name in running:
+          self.runFilter(name)
     else:
       #file not chosen
       return
@@ -146,41 +254,107 @@ class MainWindow(Window):
     self.selStream[1] = self.settings.value("stream", "BCI2000") #set BCI2000 as default
     self.streams[self.selStream[1]].setChecked(True)
 
-    filter = self.settings.value("filter", "")
-    if filter != "":
+    running = self.settings.value("filters", None)
+    if running is None:
+      running = [self.settings.value("filter", "")] #saved before filters could run side by side
+    elif isinstance(running, str):
+      running = [running]
+    running = [f for f in running if f in self.filters]
+    Window.loadSettings(self)
+    if running and self.bciPath != "":
+      #import in the background so the window shows first, filters start once imported
+      threading.Thread(target=self.warmUp, args=(running,), daemon=True).start()
+
+  def warmUp(self, running):
+    modules = ["dataThreads." + self.selStream[1]] + [self.fPath + "." + f for f in running]
+    for mod in modules:
+      try:
+        importlib.import_module(mod)
+      except:
+        pass #reported when the filter is started
+    self.warmedUp.emit(running)
+
+  def startSaved(self, running):
+    for filter in running:
       self.runFilter(filter)
-    
-    #load geometry after filter is in place
+    #load dock layout again now that the filters' docks are in place
     Window.loadSettings(self)
 
   def saveSettings(self):
     super().saveSettings()
     self.settings.setValue("bciPath", self.bciPath)
     self.settings.setValue("stream", self.selStream[1])
-    if hasattr(self, "mod"):
-      self.settings.setValue("filter", self.mod.__class__.__name__)
-      self.mod.saveSettings()
+    #started in this order next time, the last one is shown on the brain
+    running = [n for n in self.mods if self.mods[n] is not self.mod]
+    if self.mod is not None:
+      running.append(self.mod.__class__.__name__)
+    self.settings.setValue("filters", running)
+    self.settings.remove("filter")
+    for m in self.mods.values():
+      m.saveSettings()
 
 def getFiles(path, ignore):
-  fileNames = []
-  files = os.listdir(path)
-  try:
-    for f in ignore:
-      files.remove(f)
-    files.remove("__pycache__") #always try to remove pychache last
-  except:
-    pass
-  for file in files:
+  """modules of a folder that define a class of their own name, with the comment above it.
+  Read with ast, so the modules are only imported once chosen"""
+  fileNames = {}
+  for file in sorted(os.listdir(path)):
     fName = file.replace(".py", "")
-    fileNames.append(fName)
+    if file in ignore or not file.endswith(".py"):
+      continue
+    try:
+      with open(os.path.join(path, file)) as f:
+        source = f.read()
+      tree = ast.parse(source)
+    except (OSError, SyntaxError):
+      continue
+    lines = source.splitlines()
+    for node in tree.body:
+      if isinstance(node, ast.ClassDef) and node.name == fName:
+        fileNames[fName] = ast.get_docstring(node) or describe(lines, node.lineno - 1)
   return fileNames
 
+def describe(lines, row):
+  """comment block right above a line"""
+  comment = []
+  while row > 0 and lines[row - 1].startswith("#"):
+    row -= 1
+    text = lines[row].strip("# ")
+    if text != "":
+      comment.insert(0, text)
+  return " ".join(comment)
+
 if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Visualize BCI2000 data as it is acquired")
+  parser.add_argument('--headless', metavar='FILTER', help="compute a filter's results without windows and write them to disk, e.g. CCEPFilter")
+  parser.add_argument('--stream', help="data stream, the one chosen last by default")
+  parser.add_argument('--source', help="recording for DatFile and Replay, host:port of the relay for Remote")
+  parser.add_argument('--speed', default='As fast as possible', help="playback speed: 1x, 2x, 5x, 10x, or As fast as possible (default)")
+  parser.add_argument('--start', type=float, default=0.0, help="seconds into a .dat file to start at")
+  parser.add_argument('--bci', help="BCI2000 location, the one chosen last by default")
+  parser.add_argument('--out', help="results folder, <filter>-<date> by default")
+  parser.add_argument('--epochs', action='store_true', help="also write each trial's epochs")
+  args = parser.parse_args()
+
   #change current directory to file location
   abspath = os.path.abspath(__file__)
   dname = os.path.dirname(abspath)
+  if args.headless:
+    #paths given relative to where we were started
+    out = os.path.abspath(args.out or f"{args.headless}-{time.strftime('%Y%m%d-%H%M%S')}")
+    source = os.path.abspath(args.source) if args.source and os.path.exists(args.source) else args.source
   os.chdir(dname)
 
+  if args.headless:
+    from base.Headless import available, run
+    if args.headless not in available():
+      parser.error(f"{args.headless} cannot run headless, choose one of: {', '.join(available())}")
+    saved = pg.QtCore.QSettings("BCI2000", "MainWindow")
+    stream = ['dataThreads', args.stream or saved.value("stream", "BCI2000")]
+    choices = {'speed': args.speed, 'start': args.start}
+    if source:
+      choices['relay' if stream[1] == 'Remote' else 'path'] = source
+    sys.exit(run(args.headless, args.bci or saved.value("bciPath", ""), stream, out, choices, args.epochs))
+
   #start gui
   pg.mkQApp("VisualizeBCI2000")
   main = MainWindow()
@@ -0,0 +1,128 @@
+#Local stand-in for BCI2000 signal sharing, for load testing without an operator.
+#Connects to a listening BCI2000DataThread and streams synthetic blocks through shared memory
+#exactly like BCI2000 does. Run from the repository root:
+#  python -m tools.MockSource --port 1897 --channels 256 --elements 40 --rate 1000
+import argparse
+import socket
+import threading
+import time
+import numpy as np
+
+from dataThreads.BCI2000 import writeBciParameterMessage, writeBciSharedSignalMessage, writeBciSignalPropertiesMessage, writeBciSysCommandMessage
+from dataThreads.streamBase.SharedSegments import SegmentCache
+
+class MockSource():
+  def __init__(self, address, channels=64, elements=40, rate=1000.0, states=["CCEPTriggered", "StimulatingChannel"],
+               triggerEvery=0, sigType='float32'):
+    self.address = address
+    self.channels = channels
+    self.elements = elements
+    self.rate = rate
+    self.states = states
+    self.triggerEvery = triggerEvery #blocks between CCEPTriggered pulses, 0 for none
+    #announced in the messages only, BCI2000 keeps doubles in shared memory whatever the signal type
+    self.sigType = sigType
+    self.dtype = np.dtype(np.double)
+    self.chNames = [f'Ch{c + 1}' for c in range(channels)]
+    self._isRunning = True
+    self.wake = threading.Event()
+    self.blocksSent = 0
+
+    self.segments = SegmentCache()
+    self.signalMem = self.segments.create(None, channels * elements * self.dtype.itemsize)
+    self.statesMem = self.segments.create(None, max(len(states), 1) * elements * 8)
+    self.signal = np.ndarray((channels, elements), dtype=self.dtype, buffer=self.signalMem.buf)
+    self.stateValues = np.ndarray((max(len(states), 1), elements), dtype=np.double, buffer=self.statesMem.buf)
+    #one sine per channel, evaluated for a whole block at once
+    self.freqs = np.linspace(1, 40, channels)[:, None] * 2 * np.pi / rate
+    self.phase = np.arange(elements)[None, :]
+
+  def parameters(self):
+    """parameter lines the filters in this repository expect at SetConfig"""
+    ms = self.elements * 1000.0 / self.rate
+    lines = [
+      f'Source:Signal%20Properties int SourceCh= {self.channels} 16 1 % // number of channels',
+      f'Source:Signal%20Properties int SampleBlockSize= {self.elements} 32 1 % // samples per block',
+      f'Source:Signal%20Properties float SamplingRate= {self.rate}Hz 256Hz 0.0% % // sample rate',
+      f'Filtering:CCEP float BaselineEpochLength= {ms / 4}ms 10ms % % // baseline before the trigger',
+      f'Filtering:CCEP float CCEPEpochLength= {ms - ms / 4}ms 100ms % % // epoch after the trigger',
+      f'Filtering:CCEP float PreStimLength= {ms / 4}ms 10ms % % // detection window before the trigger',
+      f'Filtering:CCEP float PostStimLength= {ms - ms / 4}ms 100ms % % // detection window after the trigger',
+    ]
+    return lines
+
+  def stop(self):
+    self._isRunning = False
+    self.wake.set()
+
+  def connect(self, timeout=10.0):
+    """connect to the visualizer, retrying until it listens"""
+    deadline = time.perf_counter() + timeout
+    while True:
+      try:
+        return socket.create_connection(self.address)
+      except ConnectionRefusedError:
+        if time.perf_counter() > deadline or not self._isRunning:
+          raise
+        self.wake.wait(0.05)
+
+  def fillBlock(self, b):
+    t = self.phase + b * self.elements
+    np.multiply(np.sin(self.freqs * t), 100, out=self.signal, casting='unsafe')
+    self.stateValues[:] = 0
+    if self.triggerEvery and b % self.triggerEvery == 0:
+      self.stateValues[0, 0] = 1
+
+  def run(self, blocks=0):
+    """stream blocks in real time, forever if blocks is 0"""
+    conn = self.connect()
+    stream = conn.makefile('wb')
+    try:
+      for line in self.parameters():
+        writeBciParameterMessage(stream, line)
+      writeBciSignalPropertiesMessage(stream, 'Signal', 'Signal', self.chNames, self.elements, self.sigType)
+      writeBciSignalPropertiesMessage(stream, 'States', 'States', self.states, self.elements)
+      start = time.perf_counter()
+      interval = self.elements / self.rate
+      b = 0
+      while self._isRunning and (blocks == 0 or b < blocks):
+        self.fillBlock(b)
+        writeBciSharedSignalMessage(stream, 'States', self.statesMem.name, self.stateValues.shape[0], self.elements)
+        writeBciSharedSignalMessage(stream, 'Signal', self.signalMem.name, self.channels, self.elements, self.sigType)
+        b += 1
+        self.blocksSent = b
+        delay = start + b * interval - time.perf_counter()
+        if delay > 0:
+          self.wake.wait(delay)
+      writeBciSysCommandMessage(stream, 'EndOfTransmission')
+    except (BrokenPipeError, ConnectionResetError):
+      pass
+    finally:
+      stream.close()
+      conn.close()
+
+  def close(self):
+    self.signal = self.stateValues = None
+    self.segments.clear()
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Stream synthetic BCI2000 signal sharing data")
+  parser.add_argument('--host', default='localhost')
+  parser.add_argument('--port', type=int, default=1897)
+  parser.add_argument('--channels', type=int, default=64)
+  parser.add_argument('--elements', type=int, default=40, help="samples per block")
+  parser.add_argument('--rate', type=float, default=1000.0, help="sampling rate in Hz")
+  parser.add_argument('--blocks', type=int, default=0, help="blocks to send, 0 streams until interrupted")
+  parser.add_argument('--trigger-every', type=int, default=0, help="blocks between CCEPTriggered pulses")
+  args = parser.parse_args()
+
+  source = MockSource((args.host, args.port), args.channels, args.elements, args.rate,
+                      triggerEvery=args.trigger_every)
+  print(f"Streaming {args.channels} channels x {args.elements} samples at {args.rate} Hz to {args.host}:{args.port}")
+  try:
+    source.run(args.blocks)
+  except KeyboardInterrupt:
+    pass
+  finally:
+    source.close()
+  print(f"Sent {source.blocksSent} blocks")
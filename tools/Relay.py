@@ -0,0 +1,259 @@
+#Relay for viewing BCI2000 from another workstation. Runs on the acquisition PC, receives signal sharing
+#through shared memory like BCI2000DataThread and forwards it over TCP to the Remote data stream.
+#Each visualizer that connects gets its own share point, set up with the operator if --bci is given.
+#Run from the repository root:
+#  python -m tools.Relay --bci C:/BCI2000 --port 1900 --codec zlib --float32
+import argparse
+import queue
+import socket
+import threading
+import time
+import traceback
+import numpy as np
+from PyQt5.QtCore import Qt
+
+from dataThreads.BCI2000 import BCI2000DataThread, BCI2000Worker
+from dataThreads.streamBase.LatencyHistogram import LatencyHistogram
+from dataThreads.streamBase.RelayProtocol import (Codecs, FrameReader, Kind, STAMP, availableCodecs, decodeJson,
+                                                  encodeBlock, encodeJson, encodeParameter, frame)
+
+class RelaySession():
+  """one visualizer: its share point, handshake, and the frames sent to it"""
+  queueSize = 1024 #frames buffered for a slow network before BCI2000 is held up
+  reportEvery = 5.0 #seconds between throughput reports
+
+  def __init__(self, conn, sharePort, bciPath="", float32=None, codec=None, log=print):
+    self.conn = conn
+    self.peer = conn.getpeername()
+    self.sharePort = sharePort
+    self.bciPath = bciPath
+    self.float32 = float32 #None: as the visualizer asks
+    self.codec = codec
+    self.log = log
+    self._isRunning = True
+    self.frames = queue.Queue(self.queueSize)
+    self.sendLock = threading.Lock() #blocks from the sender, pongs from the reader
+    self.acq = None
+    self.worker = None #operator connection, if we have one
+    #throughput since the last report
+    self.rawBytes = 0
+    self.wireBytes = 0
+    self.blocks = 0
+    self.queued = LatencyHistogram() #block arrival -> sent
+
+  def send(self, data):
+    with self.sendLock:
+      self.conn.sendall(data)
+    self.wireBytes += len(data)
+
+  def enqueue(self, item):
+    """called from the acquisition thread, waits while the network is behind"""
+    while self._isRunning:
+      try:
+        self.frames.put(item, timeout=0.1)
+        return
+      except queue.Full:
+        pass
+    if item[0] == Kind.Signal:
+      self.acq.releaseBlock(item[2])
+
+  def handshake(self, hello):
+    """share point for the visualizer's filter, set with the operator if we have one"""
+    address = f'localhost:{self.sharePort}'
+    if self.bciPath == "":
+      self.log(f"{self.peer}: set Share{hello['filter']} to {address}")
+      return address
+    self.worker = BCI2000Worker(self.bciPath, hello['filter'], hello.get('states', []))
+    self.worker.address = address
+    self.worker.logPrint.connect(self.forwardPrint, Qt.DirectConnection)
+    self.worker.run()
+    return self.worker.address if self.worker.startedDataThread else None
+
+  def reconnect(self):
+    """BCI2000 went away, share again once it is back, as the acquisition hub does for local streams"""
+    try:
+      resting = self.worker.bci.GetSystemState() == "Resting"
+    except:
+      resting = False #operator went away
+    if not resting:
+      self.worker.reconnect = True
+      self.worker.run()
+
+  def run(self):
+    reader = FrameReader(self.conn)
+    acqThread = sender = None
+    try:
+      kind, codec, stamp, payload = reader.receive()
+      if kind != Kind.Hello:
+        raise RuntimeError('Expected hello')
+      hello = decodeJson(payload)
+      if self.float32 is None:
+        self.float32 = bool(hello.get('float32', False))
+      if self.codec is None:
+        self.codec = hello.get('codec', 'none') if hello.get('codec') in availableCodecs() else 'zlib'
+      self.log(f"{self.peer}: {hello['filter']}, {self.codec}{', float32' if self.float32 else ''}")
+      address = self.handshake(hello)
+      if address is None:
+        self.send(encodeJson(Kind.Print, time.perf_counter(), "Relay could not set up BCI2000 sharing"))
+        return
+
+      self.acq = BCI2000DataThread()
+      self.acq.initalize(address.split(':'))
+      self.acq.propertiesSignal.connect(self.forwardProperties, Qt.DirectConnection)
+      self.acq.parameterSignal.connect(self.forwardParameter, Qt.DirectConnection)
+      self.acq.dataSignal.connect(self.forwardSignal, Qt.DirectConnection)
+      self.acq.stateSignal.connect(self.forwardStates, Qt.DirectConnection)
+      self.acq.printSignal.connect(self.forwardPrint, Qt.DirectConnection)
+      self.acq.disconnected.connect(self.forwardDisconnected, Qt.DirectConnection)
+      acqThread = threading.Thread(target=self.acq.run, daemon=True)
+      sender = threading.Thread(target=self.sendFrames, daemon=True)
+      acqThread.start()
+      sender.start()
+
+      #answer pings until the visualizer goes away
+      while self._isRunning:
+        kind, codec, stamp, payload = reader.receive()
+        if kind == Kind.Ping:
+          self.send(frame(Kind.Pong, time.perf_counter(), STAMP.pack(stamp)))
+    except (EOFError, ConnectionError, OSError):
+      pass
+    except Exception:
+      traceback.print_exc()
+    finally:
+      self._isRunning = False
+      if self.acq is not None:
+        self.acq.stop()
+      for t in [acqThread, sender]:
+        if t is not None:
+          t.join()
+      self.conn.close()
+      self.log(f"{self.peer}: disconnected")
+
+  #---- acquisition thread ----#
+  def forwardProperties(self, elements, chNames):
+    self.enqueue((Kind.Properties, time.perf_counter(), {'elements': elements, 'chNames': list(chNames)}))
+  def forwardParameter(self, param):
+    self.enqueue((Kind.Parameter, time.perf_counter(), param))
+  def forwardSignal(self, data):
+    self.enqueue((Kind.Signal, time.perf_counter(), data))
+  def forwardStates(self, states):
+    self.enqueue((Kind.States, time.perf_counter(), states))
+  def forwardPrint(self, msg):
+    self.log(f"{self.peer}: {msg}")
+    self.enqueue((Kind.Print, time.perf_counter(), msg))
+  def forwardDisconnected(self):
+    self.enqueue((Kind.Disconnected, time.perf_counter(), None))
+    if self.worker is not None:
+      threading.Thread(target=self.reconnect, daemon=True).start()
+
+  #---- sender thread ----#
+  def encode(self, kind, stamp, value):
+    if kind == Kind.Signal:
+      self.rawBytes += value.nbytes
+      data = value.astype(np.float32) if self.float32 and value.dtype != np.float32 else value
+      out = encodeBlock(kind, stamp, data, Codecs[self.codec])
+      self.acq.releaseBlock(value)
+      self.blocks += 1
+      return out
+    if kind == Kind.States:
+      self.rawBytes += value.nbytes
+      return encodeBlock(kind, stamp, value, Codecs[self.codec])
+    if kind == Kind.Parameter:
+      return encodeParameter(stamp, value)
+    if kind == Kind.Disconnected:
+      return frame(kind, stamp)
+    return encodeJson(kind, stamp, value)
+
+  def sendFrames(self):
+    lastReport = time.perf_counter()
+    try:
+      while self._isRunning:
+        try:
+          kind, stamp, value = self.frames.get(timeout=0.1)
+        except queue.Empty:
+          continue
+        self.send(self.encode(kind, stamp, value))
+        now = time.perf_counter()
+        if kind == Kind.Signal:
+          self.queued.record(now - stamp)
+        if now - lastReport > self.reportEvery:
+          self.report(now - lastReport)
+          lastReport = now
+    except (ConnectionError, OSError):
+      self._isRunning = False
+      self.conn.close() #ends the reader too
+
+  def report(self, seconds):
+    ratio = self.rawBytes / max(self.wireBytes, 1)
+    self.log(f"{self.peer}: {self.wireBytes / seconds / 1e3:.1f} kB/s sent, {self.rawBytes / seconds / 1e3:.1f} kB/s raw "
+             f"({ratio:.1f}x), {self.blocks / seconds:.0f} blocks/s, queued p95 {self.queued.percentile(95) * 1e3:.1f} ms, "
+             f"{self.frames.qsize()} frames waiting")
+    self.rawBytes = self.wireBytes = self.blocks = 0
+    self.queued.reset()
+
+class Relay():
+  """accepts visualizers and runs a session for each, on consecutive share ports"""
+  def __init__(self, address=('', 1900), sharePort=1897, bciPath="", float32=None, codec=None, log=print):
+    self.sharePort = sharePort
+    self.bciPath = bciPath
+    self.float32 = float32
+    self.codec = codec
+    self.log = log
+    self.sessions = {} #share port -> session
+    self.lock = threading.Lock()
+    self.s = socket.create_server(address)
+    self.s.settimeout(0.1)
+    self._isRunning = True
+
+  def address(self):
+    return self.s.getsockname()
+
+  def stop(self):
+    self._isRunning = False
+
+  def serve(self):
+    self.log(f"Relay listening at {self.address()[0]}:{self.address()[1]}")
+    try:
+      while self._isRunning:
+        try:
+          conn, addr = self.s.accept()
+        except socket.timeout:
+          continue
+        conn.settimeout(None)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.lock:
+          port = self.sharePort
+          while port in self.sessions:
+            port += 1
+          session = RelaySession(conn, port, self.bciPath, self.float32, self.codec, self.log)
+          self.sessions[port] = session
+        threading.Thread(target=self.runSession, args=(port, session), daemon=True).start()
+    finally:
+      with self.lock:
+        sessions = list(self.sessions.values())
+      for session in sessions:
+        session._isRunning = False
+      self.s.close()
+
+  def runSession(self, port, session):
+    try:
+      session.run()
+    finally:
+      with self.lock:
+        del self.sessions[port]
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Forward BCI2000 signal sharing to visualizers on other machines")
+  parser.add_argument('--host', default='', help="interface to accept visualizers on, all by default")
+  parser.add_argument('--port', type=int, default=1900, help="port visualizers connect to")
+  parser.add_argument('--share-port', type=int, default=1897, help="first port BCI2000 shares to")
+  parser.add_argument('--bci', default="", help="BCI2000 folder, to set the sharing parameters with the operator")
+  parser.add_argument('--codec', choices=availableCodecs(), help="compression, as each visualizer asks by default")
+  parser.add_argument('--float32', action='store_true', default=None, help="send samples as float32")
+  args = parser.parse_args()
+
+  relay = Relay((args.host, args.port), args.share_port, args.bci, args.float32, args.codec)
+  try:
+    relay.serve()
+  except KeyboardInterrupt:
+    pass
@@ -0,0 +1,256 @@
+#Stand-in for BCI2000's prog/BCI2000Remote.py, for handshake and reconnect testing without an installation.
+#Choose tools/fakeBCI2000 as the BCI2000 location (or pass it as bciPath) and BCI2000Worker loads this module.
+#All BCI2000Remote instances talk to one in-process Operator, like remotes talking to one operator process.
+#The operator's behavior is scripted, either from code:
+#  import BCI2000Remote; BCI2000Remote.operator.reset(parameterDelay=0.2, failures={'GetParameter': 2})
+#or, when started from the GUI, with a JSON script in the FAKE_BCI2000 environment variable:
+#  FAKE_BCI2000='{"startupDelay": 2, "autoStart": true}' python main.py
+import json
+import os
+import sys
+import threading
+import time
+
+#scripted behavior, see Operator.reset
+DefaultScript = {
+  'initialState': 'Resting',  #system state once started up, e.g. 'Suspended' or 'Running'
+  'startupDelay': 0.0,        #seconds spent in 'Idle' after start or restart
+  'parameterDelay': 0.0,      #seconds before a SET PARAMETER is visible to GetParameter
+  'roundTrip': 0.001,         #seconds each call to the operator takes
+  'failures': {},             #method name -> number of initial calls that raise
+  'parameters': {},           #extra parameters the system knows, name -> value
+  'states': {},               #state values returned by GetStateVariable
+  'autoStart': False,         #stream from tools.MockSource once Share<Filter> is set, like SetConfig and Start
+  'streamDelay': 0.0,         #seconds between Share<Filter> being set and the source connecting
+  'source': {},               #MockSource arguments, e.g. {'channels': 64, 'rate': 1000}
+}
+
+class StateVariable():
+  def __init__(self, value):
+    self.value = value
+
+#
+# In-process state machine standing in for the BCI2000 operator
+#
+class Operator():
+  def __init__(self):
+    self.lock = threading.Condition()
+    self.source = None
+    self.sourceThread = None
+    self.cancel = threading.Event()
+    self.reset(**json.loads(os.environ.get('FAKE_BCI2000', '{}')))
+
+  def reset(self, **script):
+    """apply a script (see DefaultScript) and start the system from scratch"""
+    unknown = set(script) - set(DefaultScript)
+    if unknown:
+      raise ValueError(f"Unknown script entries: {', '.join(sorted(unknown))}")
+    with self.lock:
+      self.script = {k: (dict(v) if isinstance(v, dict) else v) for k, v in dict(DefaultScript, **script).items()}
+      self.failures = dict(self.script['failures'])
+      self.commands = [] #(time, command) for every command executed
+      self.calls = 0 #round trips to the operator
+    self.restart()
+
+  def restart(self):
+    """simulate quitting and relaunching BCI2000: parameters are lost, sharing connections close"""
+    self.stopSource()
+    with self.lock:
+      self.parameters = {} #name -> (visible at, value)
+      self.state = 'Idle'
+      self.readyAt = time.perf_counter() + self.script['startupDelay']
+      self.lock.notify_all()
+
+  #---- state machine ----#
+  def systemState(self):
+    with self.lock:
+      if self.state == 'Idle' and time.perf_counter() >= self.readyAt:
+        self.state = self.script['initialState']
+      return self.state
+
+  def call(self, name):
+    """one round trip, raising if the script says this call fails"""
+    self.calls += 1
+    if self.script['roundTrip'] > 0:
+      time.sleep(self.script['roundTrip'])
+    with self.lock:
+      if self.failures.get(name, 0) > 0:
+        self.failures[name] -= 1
+        raise RuntimeError(f"Scripted failure of {name}")
+
+  def setParameter(self, name, value):
+    with self.lock:
+      if self.parameters.get(name, (0, None))[1] == value:
+        return #setting the same value again changes nothing
+      self.parameters[name] = (time.perf_counter() + self.script['parameterDelay'], value)
+    if self.script['autoStart'] and name.startswith('Share') and not name.endswith('States'):
+      self.startSource(name)
+
+  def parameter(self, name):
+    """value if set and visible, None otherwise. Raises for parameters the system does not know"""
+    with self.lock:
+      if name in self.parameters:
+        visibleAt, value = self.parameters[name]
+        if time.perf_counter() >= visibleAt:
+          return value
+        return None
+      if name in self.script['parameters']:
+        return self.script['parameters'][name]
+      if not name.startswith('Share'):
+        raise RuntimeError(f"Parameter {name} does not exist")
+      return None
+
+  def execute(self, command):
+    """runs one operator scripting command, returns its result"""
+    self.commands.append((time.perf_counter(), command))
+    words = command.split()
+    if not words:
+      return ''
+    verb = words[0].upper()
+    if verb == 'WAIT' and len(words) >= 4 and words[1].upper() == 'FOR':
+      return self.waitFor(words[2].split('|'), float(words[3]))
+    if verb == 'SET' and len(words) >= 3 and words[1].upper() == 'PARAMETER':
+      if words[2] == '%' and len(words) >= 5: #list parameter: % list Name= n values...
+        name = words[4].rstrip('=')
+        self.setParameter(name, " ".join(words[6:]))
+      else:
+        self.setParameter(words[2], " ".join(words[3:]))
+      return ''
+    if verb == 'SET' and len(words) >= 3:
+      with self.lock:
+        self.script['parameters'][words[1]] = words[2] #LogLevel, AbortOnError, ...
+      return ''
+    if verb == 'SETCONFIG':
+      with self.lock:
+        if self.state in ('Idle', 'Suspended'):
+          self.state = 'Resting'
+        self.lock.notify_all()
+      return 'true'
+    if verb == 'START':
+      with self.lock:
+        self.state = 'Running'
+        self.lock.notify_all()
+      return 'true'
+    if verb == 'STOP':
+      self.stopSource()
+      with self.lock:
+        self.state = 'Resting'
+        self.lock.notify_all()
+      return 'true'
+    if verb in ('QUIT', 'RESET'):
+      self.restart()
+      return 'true'
+    return ''
+
+  def waitFor(self, states, timeout):
+    deadline = time.perf_counter() + timeout
+    states = [s.upper() for s in states]
+    while True:
+      st = self.systemState().upper()
+      if st in states or (st == 'RESTING' and 'CONNECTED' in states):
+        return 'true'
+      now = time.perf_counter()
+      if now >= deadline:
+        return 'false'
+      remaining = deadline - now
+      if st == 'IDLE':
+        remaining = min(remaining, max(self.readyAt - now, 0.001))
+      with self.lock:
+        self.lock.wait(remaining)
+
+  #---- signal sharing ----#
+  def startSource(self, shareParameter):
+    self.stopSource()
+    self.cancel = threading.Event()
+    self.sourceThread = threading.Thread(target=self.stream, args=(shareParameter, self.cancel), daemon=True)
+    self.sourceThread.start()
+
+  def stopSource(self):
+    with self.lock:
+      source, thread = self.source, self.sourceThread
+      self.source = self.sourceThread = None
+      if thread is not None:
+        self.cancel.set()
+    if source is not None:
+      source.stop()
+    if thread is not None and thread is not threading.current_thread():
+      thread.join()
+
+  def stream(self, shareParameter, cancel):
+    """what SetConfig and Start do: connect to the share address and send blocks until stopped"""
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+    if root not in sys.path:
+      sys.path.append(root)
+    from tools.MockSource import MockSource
+
+    if cancel.wait(self.script['streamDelay']):
+      return
+    address = self.parameter(shareParameter)
+    while address is None:
+      if cancel.wait(0.001):
+        return
+      address = self.parameter(shareParameter)
+    host, port = address.split(':')
+    kargs = dict(self.script['source'])
+    states = self.parameter(shareParameter + 'States')
+    if states and 'states' not in kargs:
+      kargs['states'] = states.split()
+    source = MockSource((host, int(port)), **kargs)
+    with self.lock:
+      if cancel.is_set():
+        source.close()
+        return
+      self.source = source
+      self.state = 'Running'
+      self.lock.notify_all()
+    try:
+      source.run()
+    except OSError:
+      pass #nobody listened
+    finally:
+      source.close()
+
+operator = Operator()
+
+#
+# Same interface as BCI2000's BCI2000Remote, as far as this repository uses it
+#
+class BCI2000Remote():
+  def __init__(self):
+    self.Result = ''
+    self.connected = False
+
+  def Connect(self):
+    operator.call('Connect')
+    self.connected = True
+    return True
+
+  def Disconnect(self):
+    self.connected = False
+    return True
+
+  def Execute(self, command):
+    """runs ';' separated commands, Result holds the result of the last one"""
+    operator.call('Execute')
+    for c in command.split(';'):
+      self.Result = operator.execute(c.strip())
+    return 0
+
+  def GetParameter(self, name):
+    operator.call('GetParameter')
+    value = operator.parameter(name)
+    if value is None:
+      return f"Parameter {name} is empty" if name.endswith('States') else ""
+    return value
+
+  def SetParameter(self, name, value):
+    operator.call('SetParameter')
+    operator.setParameter(name, value)
+
+  def GetSystemState(self):
+    operator.call('GetSystemState')
+    return operator.systemState()
+
+  def GetStateVariable(self, name):
+    operator.call('GetStateVariable')
+    return StateVariable(operator.script['states'].get(name, 0))